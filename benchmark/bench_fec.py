@@ -0,0 +1,74 @@
+"""
+FEC基准测试：不同丢包率下，XOR校验组大小K对帧完整率和额外带宽的影响
+
+用法(在项目根目录运行):
+    python -m benchmark.bench_fec
+    python -m benchmark.bench_fec --frames 200 --loss 0 0.01 0.05 --groups 0 4 8
+    python -m benchmark.bench_fec --burst 0.3   # Gilbert-Elliott突发丢包，坏->好概率0.3
+"""
+import argparse
+import random
+
+import numpy as np
+
+from esp32_udp_header import ESP32UDPHeader
+from sender.netem import make_loss_model
+from sender.receiver import ESP32UDPReceiver
+from sender.udp_sender import ESP32UDPSender
+
+
+def run(loss: dict, fec_group: int, frames: int, width: int = 240,
+        color_mode: int = ESP32UDPHeader.COLOR_RGB565, lines_per_packet: int = 3, seed: int = 0):
+    """按loss配置的丢包模型模拟发送frames帧，返回 (额外开销, 帧完整率, 恢复的行带数)"""
+    rng = random.Random(seed)
+    loss_model = make_loss_model(loss)
+    sender = ESP32UDPSender("127.0.0.1", 9, width=width, color_mode=color_mode,
+                            lines_per_packet=lines_per_packet, fec_group=fec_group)
+    receiver = ESP32UDPReceiver("127.0.0.1", 0, fec=fec_group > 0)
+    image = np.random.default_rng(seed).integers(0, 256, (width, width, 3), dtype=np.uint8)
+
+    data_bytes = 0
+    parity_bytes = 0
+    try:
+        for _ in range(frames):
+            frame = sender.packetize(image)
+            for y_start, packet in sender.packet_sequence(frame):
+                if y_start is None:
+                    parity_bytes += len(packet)
+                else:
+                    data_bytes += len(packet)
+                if not loss_model.drop(rng):
+                    receiver.handle_packet(packet)
+        receiver.finish()
+        stats = receiver.get_stats()
+    finally:
+        sender.close()
+        receiver.close()
+    return parity_bytes / data_bytes, stats['completeness'], stats['bands_recovered']
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XOR校验FEC基准测试")
+    parser.add_argument('--frames', type=int, default=100)
+    parser.add_argument('--loss', type=float, nargs='+', default=[0.0, 0.005, 0.01, 0.02, 0.05, 0.1])
+    parser.add_argument('--groups', type=int, nargs='+', default=[0, 4, 8, 16])
+    parser.add_argument('--lines-per-packet', type=int, default=3)
+    parser.add_argument('--burst', type=float, default=None, metavar='R',
+                        help="改用Gilbert-Elliott突发丢包，R为坏->好概率，平均丢包率仍为--loss")
+    args = parser.parse_args()
+
+    print(f"{'丢包率':>8} {'K':>4} {'额外开销':>10} {'帧完整率':>10} {'恢复行带':>10}")
+    for loss_rate in args.loss:
+        loss = {'model': 'bernoulli', 'p': loss_rate}
+        if args.burst:
+            # 坏状态全丢，按平均丢包率反推 好->坏 概率
+            loss = {'model': 'gilbert_elliott', 'p': args.burst * loss_rate / max(1e-9, 1 - loss_rate),
+                    'r': args.burst}
+        for fec_group in args.groups:
+            overhead, completeness, recovered = run(loss, fec_group, args.frames,
+                                                    lines_per_packet=args.lines_per_packet)
+            print(f"{loss_rate:>8.3f} {fec_group or '-':>4} {overhead:>10.1%} {completeness:>10.1%} {recovered:>10}")
+
+
+if __name__ == '__main__':
+    main()
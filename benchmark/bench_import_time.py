@@ -0,0 +1,58 @@
+"""
+导入开销检查
+
+在全新的子进程中导入推流相关模块，检查导入耗时是否超出预算，以及是否提前导入了只有某些图像源才需要的重量级库。
+用法: python benchmark/bench_import_time.py [--budget-ms 300]
+超出预算或导入了不该导入的库时退出码为1，可以直接放进CI。
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 导入这些模块时不应该被拉进来的库(只有对应的图像源才需要)
+HEAVY_MODULES = ['cv2', 'sounddevice', 'mss', 'win32gui', 'Xlib']
+
+PROBE = r'''
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"ms": elapsed * 1000, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+'''
+
+
+def measure(module: str, repeat: int = 3) -> dict:
+    """在新进程中导入module，返回最快一次的耗时和被导入的重量级库"""
+    best = None
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(module=module, heavy=HEAVY_MODULES)],
+                             cwd=ROOT, capture_output=True, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        if best is None or result['ms'] < best['ms']:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查图像源模块的导入开销')
+    parser.add_argument('--budget-ms', type=float, default=300.0, help='每个模块的导入耗时预算(毫秒)')
+    parser.add_argument('--modules', nargs='+',
+                        default=['capture.interface', 'capture.registry', 'capture.source_manager', 'capture.streamer'])
+    args = parser.parse_args()
+
+    failed = False
+    for module in args.modules:
+        result = measure(module)
+        ok = result['ms'] <= args.budget_ms and not result['loaded']
+        failed |= not ok
+        print(f"{'OK  ' if ok else 'FAIL'} {module:<28} {result['ms']:7.1f} ms"
+              + (f"  提前导入了: {', '.join(result['loaded'])}" if result['loaded'] else ''))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
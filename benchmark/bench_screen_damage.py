@@ -0,0 +1,103 @@
+"""
+XDamage截图基准测试：用一个脚本绘图客户端在屏幕上周期性地画小方块，
+比较开启和关闭damage时截图的CPU占用、实际读取的行数比例
+
+用法(在项目根目录运行，需要支持DAMAGE扩展的X服务器，如Xvfb):
+    xvfb-run -s "-screen 0 1280x720x24" python -m benchmark.bench_screen_damage
+    python -m benchmark.bench_screen_damage --seconds 5 --draw-interval 0.2
+"""
+import argparse
+import ctypes
+import threading
+import time
+
+from capture.screen_source.screenshot_linux import LinuxScreenCapture, X11Connection
+
+
+class DrawingClient:
+    """在自己的X连接上创建窗口，每隔interval秒在随机位置画一个size大小的方块"""
+
+    def __init__(self, interval: float, size: int = 32):
+        self.conn = X11Connection()
+        x11 = self.conn.libs.x11
+        x11.XCreateSimpleWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int,
+                                            ctypes.c_uint, ctypes.c_uint, ctypes.c_uint,
+                                            ctypes.c_ulong, ctypes.c_ulong]
+        x11.XCreateSimpleWindow.restype = ctypes.c_ulong
+        x11.XMapWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XCreateGC.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_void_p]
+        x11.XCreateGC.restype = ctypes.c_void_p
+        x11.XSetForeground.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulong]
+        x11.XFillRectangle.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_void_p,
+                                       ctypes.c_int, ctypes.c_int, ctypes.c_uint, ctypes.c_uint]
+        self.x11 = x11
+        self.width, self.height = self.conn.width, self.conn.height
+        self.window = x11.XCreateSimpleWindow(self.conn.display, self.conn.root, 0, 0,
+                                              self.width, self.height, 0, 0, 0)
+        x11.XMapWindow(self.conn.display, self.window)
+        self.gc = x11.XCreateGC(self.conn.display, self.window, 0, None)
+        self.conn.sync()
+        self.interval = interval
+        self.size = size
+        self.draws = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        import random
+        rng = random.Random(0)
+        while not self._stop.wait(self.interval):
+            self.x11.XSetForeground(self.conn.display, self.gc, rng.randrange(1 << 24))
+            self.x11.XFillRectangle(self.conn.display, self.window, self.gc,
+                                    rng.randrange(self.width - self.size), rng.randrange(self.height - self.size),
+                                    self.size, self.size)
+            self.conn.sync()
+            self.draws += 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.conn.close()
+
+
+def run(damage: bool, seconds: float, draw_interval: float, fps: float):
+    """返回 (帧数, 读取的行数比例, 每秒CPU时间ms)"""
+    client = DrawingClient(draw_interval)
+    source = LinuxScreenCapture()
+    source.initialize(fps=fps, damage=damage, share_grab=False)
+    client.start()
+    try:
+        frames = 0
+        cpu = time.process_time()
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            if source.capture() is not None:
+                frames += 1
+            time.sleep(1 / fps / 4)
+        cpu = time.process_time() - cpu
+        stats = source.get_info().get('damage_stats')
+        rows = stats['grabbed_rows'] / max(1, stats['total_rows']) if stats and stats['total_rows'] else 1.0
+        return frames, rows, cpu / seconds * 1000
+    finally:
+        client.stop()
+        source.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XDamage截图基准测试")
+    parser.add_argument('--seconds', type=float, default=3.0)
+    parser.add_argument('--draw-interval', type=float, default=0.5, help="绘图客户端画方块的间隔(秒)")
+    parser.add_argument('--fps', type=float, default=30.0)
+    args = parser.parse_args()
+
+    print(f"{'damage':>8} {'帧数':>6} {'读取行比例':>10} {'CPU(ms/s)':>10}")
+    for damage in (False, True):
+        frames, rows, cpu = run(damage, args.seconds, args.draw_interval, args.fps)
+        print(f"{str(damage):>8} {frames:>6} {rows:>10.3f} {cpu:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""
+Linux截图基准测试：X11 MIT-SHM后端在全屏和不同区域大小下的截图帧率
+
+用法(在项目根目录运行，需要X服务器，没有显示器时可以用Xvfb):
+    python -m benchmark.bench_screen_linux
+    xvfb-run -s "-screen 0 1920x1080x24" python -m benchmark.bench_screen_linux --seconds 3
+    python -m benchmark.bench_screen_linux --sizes 240x240 1280x720
+"""
+import argparse
+import time
+
+from capture.screen_source.screenshot_linux import LinuxScreenCapture
+
+
+def run(region, seconds: float, display_idx: int = 0):
+    """连续截图seconds秒，返回 (实际区域, 帧率, 每帧耗时ms)"""
+    source = LinuxScreenCapture(display_idx=display_idx)
+    # 关闭XDamage和共享截图，每次capture都完整截图，否则静止的画面只有第一帧
+    kwargs = {'fps': 120, 'damage': False, 'share_grab': False}
+    if region:
+        kwargs['region'] = region
+    source.initialize(**kwargs)
+    # 不限制帧率，测量截图本身的速度
+    source._fps = float('inf')
+    try:
+        frames = 0
+        grab_time = 0.0
+        end = time.perf_counter() + seconds
+        while time.perf_counter() < end:
+            start = time.perf_counter()
+            frame = source.capture()
+            grab_time += time.perf_counter() - start
+            if frame is not None:
+                frames += 1
+        return source.get_info()['resolution'], frames / seconds, grab_time / max(1, frames) * 1000
+    finally:
+        source.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="X11 MIT-SHM截图基准测试")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--display-idx', type=int, default=0)
+    parser.add_argument('--sizes', nargs='+', default=['240x240', '640x480', '1280x720'],
+                        help="区域大小(从屏幕左上角开始)，全屏总是会测试")
+    args = parser.parse_args()
+
+    regions = [None] + [[0, 0] + [int(v) for v in size.split('x')] for size in args.sizes]
+    print(f"{'区域':>12} {'帧率':>10} {'每帧耗时':>10}")
+    for region in regions:
+        resolution, fps, ms = run(region, args.seconds, args.display_idx)
+        name = f"{resolution[0]}x{resolution[1]}" + ("" if region else "(全屏)")
+        print(f"{name:>12} {fps:>10.1f} {ms:>8.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+共享截图基准测试：同一个显示器上配置多个截图源(全屏和几个区域)，
+比较每个源单独截图和通过SharedScreenGrabber共享截图时，每轮取完所有源的帧的耗时
+
+用法(在项目根目录运行，需要X服务器，没有显示器时可以用Xvfb):
+    xvfb-run -s "-screen 0 1920x1080x24" python -m benchmark.bench_screen_shared
+    python -m benchmark.bench_screen_shared --seconds 3 --damage
+"""
+import argparse
+import time
+
+from capture.screen_source.screenshot_linux import LinuxScreenCapture
+
+REGIONS = [None, [0, 0, 640, 480], [320, 240, 640, 480], [800, 400, 480, 320]]
+
+
+def run(share: bool, seconds: float, damage: bool):
+    """返回 (每轮耗时ms, 实际截图次数)"""
+    sources = []
+    for i, region in enumerate(REGIONS):
+        source = LinuxScreenCapture(f"screen_{i}")
+        kwargs = {'fps': 120, 'share_grab': share, 'damage': damage}
+        if region:
+            kwargs['region'] = region
+        source.initialize(**kwargs)
+        sources.append(source)
+    try:
+        rounds = 0
+        end = time.perf_counter() + seconds
+        start = time.perf_counter()
+        while time.perf_counter() < end:
+            for source in sources:
+                # 不限制帧率，每轮每个源都取一帧
+                source._last_capture_time = 0
+                source.capture()
+            rounds += 1
+        elapsed = time.perf_counter() - start
+        shared = sources[0].get_info().get('shared_grab')
+        grabs = shared['grabs'] if shared else rounds * len(sources)
+        return elapsed / rounds * 1000, grabs
+    finally:
+        for source in sources:
+            source.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共享截图基准测试")
+    parser.add_argument('--seconds', type=float, default=2.0)
+    parser.add_argument('--damage', action='store_true', help="开启XDamage(默认关闭，测量每轮都截图的情况)")
+    args = parser.parse_args()
+
+    print(f"{len(REGIONS)}个截图源")
+    print(f"{'共享':>6} {'每轮耗时':>10} {'截图次数':>8}")
+    for share in (False, True):
+        ms, grabs = run(share, args.seconds, args.damage)
+        print(f"{str(share):>6} {ms:>8.2f}ms {grabs:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -52,6 +52,9 @@ class AudioVisualizer:
         self.particles = []
         self.max_particles = 200
 
+        # 每处理一块音频调用一次(用于统计挂起期间的开销)
+        self.on_block = None
+
         # 音频流
         self.stream = None
         self.device_id = self._find_audio_device(target_device)
@@ -81,6 +84,9 @@ class AudioVisualizer:
         if status:
             print(f"音频流状态: {status}")
 
+        if self.on_block is not None:
+            self.on_block()
+
         # 取左声道数据
         mono = indata[:, 0].copy()
         energy = np.mean(mono ** 2)
@@ -504,6 +510,17 @@ class AudioVisualizer:
         # print(time.time() - t)
         return img
 
+    def pause(self) -> None:
+        """暂停音频流，回调和FFT随之停止，设备保持打开以便快速恢复"""
+        if self.stream is not None and self.stream.active:
+            self.stream.stop()
+        self.particles.clear()
+
+    def resume(self) -> None:
+        """恢复音频流"""
+        if self.stream is not None and not self.stream.active:
+            self.stream.start()
+
     def release(self) -> None:
         """释放资源"""
         if self.stream is not None:
@@ -9,6 +9,7 @@ class AudioVisualizationSource(ImageSourceInterface):
     def __init__(self, source_type: SourceType, source_id: str = ""):
         super().__init__(source_type, source_id)
         self.audio_spectrum = AudioVisualizer(block_size=512,width=240,height=240)
+        self.audio_spectrum.on_block = self._record_background_work
         self.draw_waveform = True
         self.draw_spectrum_bar = True
         self.draw_spectrum_circular1 = False
@@ -37,6 +38,15 @@ class AudioVisualizationSource(ImageSourceInterface):
         )
 
 
+    def suspend(self):
+        """挂起：停止音频流，不再计算FFT"""
+        super().suspend()
+        self.audio_spectrum.pause()
+
+    def resume(self):
+        self.audio_spectrum.resume()
+        super().resume()
+
     def get_info(self) -> Dict[str, Any]:pass
     def get_available_configs(self) -> List[Dict[str, Any]]: pass
 
@@ -15,9 +15,11 @@ class CameraSource(ImageSourceInterface):
         self._cap = None  # OpenCV VideoCapture对象
         self._resolution = (1920, 1080)
         self._last_capture_time = 0
+        self._init_kwargs = {}
 
     def initialize(self, **kwargs) -> bool:
         """初始化摄像头"""
+        self._init_kwargs = dict(kwargs)
         try:
             import cv2
 
@@ -75,6 +77,17 @@ class CameraSource(ImageSourceInterface):
             print(f"Camera capture failed: {e}")
             return None
 
+    def suspend(self):
+        """挂起：关闭摄像头，驱动停止采集"""
+        super().suspend()
+        self.release()
+
+    def resume(self):
+        """按原来的参数重新打开摄像头"""
+        if self._cap is None and not self.initialize(**self._init_kwargs):
+            print(f"Camera resume failed: {self.camera_idx}")
+        super().resume()
+
     def get_info(self) -> Dict[str, Any]:
         if not self._cap:
             return {}
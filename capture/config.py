@@ -45,13 +45,25 @@ elif __file__:
 # cfg = resource_path("config.yaml")
 
 __streamer:Streamer = None
+__config = None
+
+def load_config() -> dict:
+    """读取config_stream.yaml（只读一次）"""
+    global __config
+    if __config is None:
+        with open(os.path.join(application_path,'config_stream.yaml'), encoding="utf-8",mode='r') as f:
+            __config = yaml.safe_load(f) or {}
+    return __config
+
+def get_sender_config() -> dict:
+    """发送端的高级配置（config_stream.yaml中的sender部分）"""
+    return load_config().get('sender', None) or {}
 
 def get_streamer() -> Streamer:
     global  __streamer
     # 加载配置
     if __streamer is None:
-        with open(os.path.join(application_path,'config_stream.yaml'), encoding="utf-8",mode='r') as f:
-            config = yaml.safe_load(f)
+        config = load_config()
         # 创建推流器
         __streamer = Streamer(config.get('streamer', {}))
         # 初始化
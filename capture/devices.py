@@ -0,0 +1,265 @@
+import glob
+import os
+import platform
+import threading
+import time
+from typing import Optional, List, Dict, Any, Callable, Tuple
+
+from capture.interface import SourceType
+
+
+def _read_text(path: str) -> Optional[str]:
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _linux_cameras() -> List[Dict[str, Any]]:
+    """通过/dev/video*和sysfs列出摄像头，不打开设备"""
+    cameras = []
+    for path in sorted(glob.glob('/dev/video*'), key=lambda p: int(p[10:]) if p[10:].isdigit() else 0):
+        node = os.path.basename(path)
+        if not node[5:].isdigit():
+            continue
+        sysfs = f'/sys/class/video4linux/{node}'
+        # 一个摄像头通常有多个节点，index不为0的是元数据节点
+        index = _read_text(f'{sysfs}/index')
+        if index not in (None, '0'):
+            continue
+        cameras.append({
+            'index': int(node[5:]),
+            'name': _read_text(f'{sysfs}/name') or node,
+            'path': path,
+        })
+    return cameras
+
+
+def _linux_displays() -> List[Dict[str, Any]]:
+    """通过DRM connector的状态列出已连接的显示器"""
+    displays = []
+    for status_path in sorted(glob.glob('/sys/class/drm/card*-*/status')):
+        if _read_text(status_path) != 'connected':
+            continue
+        connector = os.path.basename(os.path.dirname(status_path))
+        mode = (_read_text(os.path.join(os.path.dirname(status_path), 'modes')) or '').split('\n')[0]
+        display = {'name': connector.split('-', 1)[1]}
+        if 'x' in mode:
+            width, height = mode.split('x', 1)
+            if width.isdigit() and height.rstrip('ip').isdigit():
+                display['resolution'] = (int(width), int(height.rstrip('ip')))
+        displays.append(display)
+    return displays
+
+
+def _x11_displays() -> List[Dict[str, Any]]:
+    """从X11截图后端列出显示器，顺序与LinuxScreenCapture的display_idx一致"""
+    from capture.screen_source.screenshot_linux import X11Connection
+
+    conn = X11Connection()
+    try:
+        return [{'name': f'显示器 {i + 1}', 'resolution': (width, height), 'position': (x, y)}
+                for i, (x, y, width, height) in enumerate(conn.monitors())]
+    finally:
+        conn.close()
+
+
+def _windows_displays() -> List[Dict[str, Any]]:
+    """EnumDisplayMonitors列出显示器(与mss的monitors顺序一致)"""
+    import ctypes
+    from ctypes import wintypes
+
+    displays = []
+    proc_type = ctypes.WINFUNCTYPE(ctypes.c_int, wintypes.HMONITOR, wintypes.HDC,
+                                   ctypes.POINTER(wintypes.RECT), wintypes.LPARAM)
+
+    def callback(monitor, dc, rect, data):
+        r = rect.contents
+        displays.append({
+            'name': f'显示器 {len(displays) + 1}',
+            'resolution': (r.right - r.left, r.bottom - r.top),
+            'position': (r.left, r.top),
+        })
+        return 1
+
+    ctypes.windll.user32.EnumDisplayMonitors(0, 0, proc_type(callback), 0)
+    return displays
+
+
+def _probe_cameras(limit: int = 10, misses: int = 2) -> List[Dict[str, Any]]:
+    """
+    没有更便宜的枚举方式时逐个打开摄像头，连续misses个打不开就停止
+
+    只在后台线程中调用
+    """
+    import cv2
+
+    cameras = []
+    missed = 0
+    for i in range(limit):
+        cap = cv2.VideoCapture(i)
+        if cap.isOpened():
+            cameras.append({'index': i, 'name': f'摄像头 {i}'})
+            missed = 0
+        else:
+            missed += 1
+        cap.release()
+        if missed >= misses:
+            break
+    return cameras
+
+
+class DeviceEnumerator:
+    """
+    设备枚举服务
+
+    在后台线程中发现摄像头和显示器：Linux上读取/dev/video*、sysfs和DRM connector状态，
+    不需要打开设备；其它平台摄像头只能逐个打开探测。
+    结果缓存在内存中，list()直接返回缓存。后台线程每隔poll_interval秒检查一次设备签名
+    (Linux上是设备节点列表和显示器连接状态，Windows上是显示器数量)，发生变化时重新枚举；
+    无法计算签名的平台每隔rescan_interval秒重新枚举。Windows上摄像头的插拔需要调用invalidate()。
+    """
+
+    def __init__(self, poll_interval: float = 2.0, rescan_interval: float = 60.0):
+        self.poll_interval = poll_interval
+        self.rescan_interval = rescan_interval
+        self.system = platform.system()
+        self.on_change: Optional[Callable[[List[Dict[str, Any]]], None]] = None
+
+        self._devices: List[Dict[str, Any]] = []
+        self._signature = None
+        self._last_scan = 0.0
+        self._scanned = threading.Event()
+        self._invalid = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            'scans': 0,
+            'hotplug': 0,
+            'last_scan_ms': 0.0,
+        }
+
+    def signature(self) -> Optional[Tuple]:
+        """便宜的设备签名，发生变化说明有设备插拔；无法计算时返回None"""
+        if self.system == 'Linux':
+            video = tuple(sorted(glob.glob('/dev/video*')))
+            drm = tuple(_read_text(path) for path in sorted(glob.glob('/sys/class/drm/card*-*/status')))
+            return video, drm
+        if self.system == 'Windows':
+            try:
+                import ctypes
+                # SM_CMONITORS
+                return ctypes.windll.user32.GetSystemMetrics(80),
+            except Exception:
+                return None
+        return None
+
+    def scan(self) -> List[Dict[str, Any]]:
+        """枚举一次设备并更新缓存(在调用线程中执行)"""
+        start = time.perf_counter()
+        self._signature = self.signature()
+        displays, cameras = [], []
+        try:
+            if self.system == 'Linux':
+                cameras = _linux_cameras()
+                try:
+                    displays = _x11_displays() if os.environ.get('DISPLAY') else []
+                except Exception as e:
+                    print(f"通过X11枚举显示器失败: {e}")
+                displays = displays or _linux_displays()
+            elif self.system == 'Windows':
+                displays, cameras = _windows_displays(), _probe_cameras()
+            else:
+                cameras = _probe_cameras()
+        except Exception as e:
+            print(f"枚举设备失败: {e}")
+        if not displays:
+            # 无法枚举显示器时(如没有DRM的虚拟机)至少提供主显示器
+            displays = [{'name': '显示器 1'}]
+
+        devices = []
+        for i, display in enumerate(displays):
+            info = {
+                'type': SourceType.SCREEN,
+                'id': f'screen_{i}',
+                'name': display['name'],
+                'available': True,
+                'params': {'display_idx': i},
+            }
+            if 'resolution' in display:
+                info['resolution'] = display['resolution']
+            devices.append(info)
+        for camera in cameras:
+            info = {
+                'type': SourceType.CAMERA,
+                'id': f"camera_{camera['index']}",
+                'name': camera['name'],
+                'available': True,
+                'params': {'camera_idx': camera['index']},
+            }
+            if 'path' in camera:
+                info['path'] = camera['path']
+            devices.append(info)
+
+        changed = devices != self._devices
+        self._devices = devices
+        self._last_scan = time.time()
+        self.stats['scans'] += 1
+        self.stats['last_scan_ms'] = round((time.perf_counter() - start) * 1000, 1)
+        self._scanned.set()
+        if changed and self.on_change is not None:
+            self.on_change(devices)
+        return devices
+
+    def list(self, wait: float = 0) -> List[Dict[str, Any]]:
+        """
+        返回缓存的设备列表
+
+        Args:
+            wait: 还没有完成第一次枚举时最多等待多久(秒)，0表示立即返回(可能为空)
+        """
+        if wait and not self._scanned.is_set():
+            self.start()
+            self._scanned.wait(wait)
+        return list(self._devices)
+
+    def invalidate(self):
+        """让后台线程尽快重新枚举"""
+        self._invalid.set()
+
+    def _run(self):
+        self.scan()
+        while True:
+            invalid = self._invalid.wait(self.poll_interval)
+            if self._stop.is_set():
+                return
+            if invalid:
+                self._invalid.clear()
+                self.scan()
+                continue
+            signature = self.signature()
+            if signature is None:
+                if time.time() - self._last_scan >= self.rescan_interval:
+                    self.scan()
+            elif signature != self._signature:
+                self.stats['hotplug'] += 1
+                self.scan()
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="device-enumerator")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._invalid.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+# 进程内共享的枚举服务
+device_enumerator = DeviceEnumerator()
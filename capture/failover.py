@@ -0,0 +1,222 @@
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+
+
+class SourceHealth:
+    """
+    单个图像源的健康状况
+
+    记录最近一次拿到新帧的时间(返回同一个数组对象的旧帧不算新帧)和最近window次capture的出错率。
+    源报告画面没有变化(如XDamage没有变化区域)时返回的None也说明源仍在正常工作，同样刷新存活时间，
+    静止的桌面不会被当作卡住
+    """
+
+    def __init__(self, window: int = 50):
+        self._outcomes = deque(maxlen=window)  # 1表示出错
+        self._last = None
+        self.last_new_frame_time = 0.0
+        self.last_alive_time = 0.0  # 最近一次新帧或者确认画面没有变化的时间
+        self.captures = 0
+        self.new_frames = 0
+        self.unchanged = 0
+        self.errors = 0
+
+    def record(self, frame: Optional[np.ndarray], now: float = None, unchanged: bool = False):
+        """记录一次capture的返回值，unchanged表示源确认画面没有变化才返回None"""
+        self.captures += 1
+        self._outcomes.append(0)
+        if frame is not None and frame is not self._last:
+            self._last = frame
+            self.new_frames += 1
+            self.last_new_frame_time = self.last_alive_time = now or time.time()
+        elif frame is None and unchanged:
+            self.unchanged += 1
+            self.last_alive_time = now or time.time()
+
+    def record_error(self):
+        """记录一次capture抛出的异常"""
+        self.captures += 1
+        self.errors += 1
+        self._outcomes.append(1)
+
+    def error_rate(self, min_samples: int = 10) -> float:
+        """最近window次capture的出错率，样本不足时返回0"""
+        if len(self._outcomes) < min_samples:
+            return 0.0
+        return sum(self._outcomes) / len(self._outcomes)
+
+    def frame_age(self, now: float = None, since: float = 0.0) -> float:
+        """距离最近一次新帧或画面没有变化的报告(或开始观察的时间since)过了多久"""
+        return (now or time.time()) - max(self.last_alive_time, since)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'captures': self.captures,
+            'new_frames': self.new_frames,
+            'unchanged': self.unchanged,
+            'errors': self.errors,
+            'error_rate': round(self.error_rate(), 2),
+            'frame_age': round(self.frame_age(), 1) if self.last_alive_time else None,
+        }
+
+
+class FailoverController:
+    """
+    活动源故障切换
+
+    chains中列出的源(主源)作为活动源时，超过stall_timeout秒没有新帧或出错率超过max_error_rate，
+    就按顺序切换到第一个可用的备用源，主源不挂起，继续在后台重连；
+    之后在后台线程中探测主源，连续recover_after秒有新帧时切换回主源。备用源也失效时换下一个备用源。
+    其它地方(手动、播放列表)切换了活动源时，以新的活动源为主源重新开始。
+    """
+
+    def __init__(self, streamer, chains: Dict[str, List[str]], stall_timeout: float = 5.0,
+                 max_error_rate: float = 0.5, recover_after: float = 3.0,
+                 check_interval: float = 0.5, recover_interval: float = 10.0):
+        """
+        Args:
+            streamer: 推流程序(Streamer)
+            chains: 主源 -> 备用源列表
+            stall_timeout: 多久没有新帧认为源失效
+            max_error_rate: 最近的capture出错率超过该值认为源失效
+            recover_after: 主源连续出帧多久后切换回去
+            check_interval: 检查间隔(秒)，也是探测主源的间隔
+            recover_interval: 主源失效期间每隔多久调用一次它的recover()
+        """
+        self.streamer = streamer
+        self.manager = streamer.source_manager
+        self.chains = chains
+        self.stall_timeout = stall_timeout
+        self.max_error_rate = max_error_rate
+        self.recover_after = recover_after
+        self.check_interval = check_interval
+        self.recover_interval = recover_interval
+
+        self._primary = None
+        self._fallback = None
+        self._watch_since = 0.0  # 开始观察当前源的时间，刚切换过去的源有stall_timeout的宽限
+        self._recovering_since = None
+        self._last_recover = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            'failovers': 0,
+            'switchbacks': 0,
+            'exhausted': 0,
+        }
+
+    @classmethod
+    def from_config(cls, streamer, config: Optional[Dict[str, Any]]) -> Optional['FailoverController']:
+        """从config_stream.yaml的streamer.failover部分创建，未配置chains时返回None"""
+        if not config or not config.get('chains'):
+            return None
+        return cls(
+            streamer,
+            chains=config['chains'],
+            stall_timeout=config.get('stall_timeout', 5.0),
+            max_error_rate=config.get('max_error_rate', 0.5),
+            recover_after=config.get('recover_after', 3.0),
+            check_interval=config.get('check_interval', 0.5),
+            recover_interval=config.get('recover_interval', 10.0),
+        )
+
+    def _unhealthy(self, source_id: str, now: float) -> bool:
+        health = self.manager.get_health(source_id)
+        return (health.frame_age(now, self._watch_since) > self.stall_timeout
+                or health.error_rate() > self.max_error_rate)
+
+    def step(self, now: float = None):
+        """检查一次活动源和主源的状况"""
+        now = now or time.time()
+        active = self.manager.active_source_id
+        if active is None:
+            return
+        if active != self._primary and active != self._fallback:
+            # 活动源被其它地方切换
+            if self._fallback is not None:
+                self.manager.suspend_inactive()
+            self._primary = active
+            self._fallback = None
+            self._recovering_since = None
+            self._watch_since = now
+
+        if self._primary not in self.chains:
+            return
+
+        if self._fallback is None:
+            if self._unhealthy(self._primary, now):
+                print(f"图像源{self._primary}没有新帧，切换到备用源")
+                self._fail_over(now)
+            return
+
+        # 探测主源
+        self.manager.capture_frame(self._primary)
+        health = self.manager.get_health(self._primary)
+        if health.frame_age(now) <= self.check_interval * 2 and health.error_rate() <= self.max_error_rate:
+            self._recovering_since = self._recovering_since or now
+            if now - self._recovering_since >= self.recover_after:
+                if self.manager.switch_source(self._primary):
+                    print(f"图像源{self._primary}已恢复，切换回去")
+                    self.stats['switchbacks'] += 1
+                    self._fallback = None
+                    self._recovering_since = None
+                    self._watch_since = now
+                return
+        else:
+            self._recovering_since = None
+            if now - self._last_recover >= self.recover_interval:
+                self._last_recover = now
+                source = self.manager.get_source(self._primary)
+                if source is not None:
+                    source.recover()
+
+        if self._unhealthy(self._fallback, now):
+            print(f"备用源{self._fallback}没有新帧，切换到下一个备用源")
+            self._fail_over(now)
+
+    def _fail_over(self, now: float):
+        """切换到备用链中当前位置之后第一个可用的源"""
+        chain = self.chains[self._primary]
+        start = chain.index(self._fallback) + 1 if self._fallback in chain else 0
+        for candidate in chain[start:]:
+            # 离开主源时不挂起它，让它继续重连；离开失效的备用源时挂起
+            if self.manager.switch_source(candidate, suspend_old=self._fallback is not None):
+                self.stats['failovers'] += 1
+                self._fallback = candidate
+                self._watch_since = now
+                self._last_recover = now
+                return
+        self.stats['exhausted'] += 1
+        # 备用源都不可用，等stall_timeout之后再试
+        self._watch_since = now
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                print(f"故障切换出错: {e}")
+            self._stop.wait(self.check_interval)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="source-failover")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['primary'] = self._primary
+        stats['fallback'] = self._fallback
+        return stats
@@ -1,3 +1,4 @@
+import asyncio
 from abc import ABC, abstractmethod
 from typing import Optional, Tuple, List, Dict, Any
 from enum import Enum
@@ -16,6 +17,38 @@ class SourceType(Enum):
     RTSP = "rtsp"  # 新增RTSP类型
     AUDIO_VISUALIZATION = "audio_visualization"  # 音频可视化
 
+class Frame(np.ndarray):
+    """
+    带元数据的帧，用法与普通numpy数组相同
+
+    damage_bbox为与这个源的上一帧相比发生变化的区域 (x, y, width, height)，None表示未知(按整帧都变化处理)；
+    damage_rects可以进一步给出变化区域的矩形列表，发送端据此只发送变化的行带。
+    对它切片、缩放等得到的新数组不再带有元数据
+    """
+
+    damage_bbox: Optional[Tuple[int, int, int, int]] = None
+    damage_rects: Optional[List[Tuple[int, int, int, int]]] = None
+
+    @classmethod
+    def wrap(cls, array: np.ndarray, damage_bbox: Optional[Tuple[int, int, int, int]] = None,
+             damage_rects: Optional[List[Tuple[int, int, int, int]]] = None) -> 'Frame':
+        """不复制数据，返回带有元数据的视图"""
+        frame = array.view(cls)
+        frame.damage_bbox = damage_bbox
+        frame.damage_rects = damage_rects
+        return frame
+
+    def damage_rows(self) -> Optional[List[Tuple[int, int]]]:
+        """发生变化的行区间 [(起始行, 结束行)]，未知时返回None"""
+        if self.damage_rects:
+            rects = self.damage_rects
+        elif self.damage_bbox is not None:
+            rects = [self.damage_bbox]
+        else:
+            return None
+        return [(y, y + height) for _, y, _, height in rects]
+
+
 class ImageSourceInterface(ABC):
     """图像源接口抽象基类"""
 
@@ -24,6 +57,13 @@ class ImageSourceInterface(ABC):
         self.source_id = source_id
         self._fps = 30  # 默认帧率
         self._is_running = False
+        # 挂起状态及挂起期间仍在后台做的工作量(理想情况下为0)
+        self._suspended = False
+        self._suspended_since = 0.0
+        self._suspended_seconds = 0.0
+        self._suspended_work = 0
+        # 上一次capture返回None是因为确认画面没有变化(源仍在正常工作)
+        self._unchanged = False
 
     @property
     def fps(self) -> float:
@@ -53,9 +93,22 @@ class ImageSourceInterface(ABC):
         Returns:
             RGB888格式的numpy数组，形状为 (height, width, 3)
             如果失败则返回None
+            返回的数组可能是源内部缓冲区(如共享内存截图)的视图，只保证在下一次capture之前有效，
+            需要跨capture保留帧的调用方必须自己复制；会被覆盖的帧必须以视图形式返回(base不为None)，
+            新分配的数组(base为None)调用方可以直接保留；
+            知道哪些区域发生了变化的源可以返回Frame，附带相对这个源上一帧的变化区域；
+            确认画面没有变化而返回None时调用_report_unchanged()，故障切换不会把这个源当作卡住
         """
         pass
 
+    async def capture_async(self) -> Optional[np.ndarray]:
+        """
+        在asyncio事件循环中捕获一帧
+
+        默认在线程池中调用capture，避免阻塞事件循环；自带事件通知的源可以重写为直接等待新帧
+        """
+        return await asyncio.get_running_loop().run_in_executor(None, self.capture)
+
     @abstractmethod
     def get_info(self) -> Dict[str, Any]:
         """
@@ -102,6 +155,62 @@ class ImageSourceInterface(ABC):
         """停止图像源"""
         self._is_running = False
 
+    @property
+    def suspended(self) -> bool:
+        return self._suspended
+
+    def suspend(self):
+        """
+        挂起图像源(不再是活动源时调用)
+
+        停止解码线程、音频流等后台工作并释放大缓冲区，挂起期间不应消耗CPU；
+        resume()后尽快恢复出帧。默认实现只调用stop()，有后台工作的源需要重写并调用super().suspend()
+        """
+        self.stop()
+        if not self._suspended:
+            self._suspended = True
+            self._suspended_since = time.time()
+
+    def resume(self):
+        """从挂起状态恢复并启动"""
+        if self._suspended:
+            self._suspended = False
+            self._suspended_seconds += time.time() - self._suspended_since
+        self.start()
+
+    def recover(self):
+        """
+        源长时间没有新帧时由故障切换定期调用，尝试重新连接
+
+        默认什么都不做，会自动重连的源可以在这里重置重连状态
+        """
+        pass
+
+    def _report_unchanged(self):
+        """capture确认画面没有变化而返回None时调用"""
+        self._unchanged = True
+
+    def take_unchanged(self) -> bool:
+        """上一次capture是否因为画面没有变化才返回None，读取后清除"""
+        unchanged, self._unchanged = self._unchanged, False
+        return unchanged
+
+    def _record_background_work(self, amount: int = 1):
+        """源在后台做了一次工作(解码一帧、处理一块音频)时调用，用于统计挂起期间的开销"""
+        if self._suspended:
+            self._suspended_work += amount
+
+    def get_suspend_stats(self) -> Dict[str, Any]:
+        """挂起统计：挂起总时长，以及挂起期间后台仍然做了多少次工作"""
+        seconds = self._suspended_seconds
+        if self._suspended:
+            seconds += time.time() - self._suspended_since
+        return {
+            'suspended': self._suspended,
+            'suspended_seconds': round(seconds, 1),
+            'work_while_suspended': self._suspended_work,
+        }
+
     def __enter__(self):
         if self.initialize():
             self.start()
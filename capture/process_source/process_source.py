@@ -0,0 +1,279 @@
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+from typing import Optional, List, Dict, Any
+
+import cv2
+import numpy as np
+
+from capture.interface import ImageSourceInterface, SourceType
+from capture.registry import resolve_type, type_name
+
+
+class FrameRing:
+    """
+    共享内存中的帧环形缓冲区
+
+    布局: slots个uint64槽序号 + slots个 (height, width, 3) 的uint8帧。
+    每个槽是一个顺序锁：写端先把槽序号置0(正在写)，写完像素再写入新的序号，然后发布最新序号；
+    读端拷贝前后各核对一次槽序号，序号为0或者前后不一致说明拷贝期间写端在改这个槽，
+    重试几次仍然读不到完整的帧时丢弃，不需要跨进程加锁。帧序号从1开始。
+    """
+
+    def __init__(self, width: int, height: int, slots: int = 3, name: str = None):
+        self.width = width
+        self.height = height
+        self.slots = slots
+        frame_bytes = width * height * 3
+        header_bytes = slots * 8
+        create = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=create,
+                                              size=header_bytes + slots * frame_bytes)
+        self.slot_seq = np.ndarray((slots,), dtype=np.uint64, buffer=self.shm.buf)
+        self.frames = np.ndarray((slots, height, width, 3), dtype=np.uint8,
+                                 buffer=self.shm.buf, offset=header_bytes)
+        if create:
+            self.slot_seq[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, seq: int, frame: np.ndarray):
+        """把第seq帧缩放写入对应的槽(写端)"""
+        slot = seq % self.slots
+        target = self.frames[slot]
+        # 标记正在写，读端不会把写了一半的槽当成完整的帧
+        self.slot_seq[slot] = 0
+        if frame.shape[:2] == (self.height, self.width):
+            target[...] = frame[:, :, :3]
+        else:
+            cv2.resize(frame[:, :, :3], (self.width, self.height), dst=target)
+        self.slot_seq[slot] = seq
+
+    def read(self, seq: int, retries: int = 3) -> Optional[np.ndarray]:
+        """拷贝第seq帧(读端)，正在被写或已被覆盖时返回None"""
+        slot = seq % self.slots
+        for _ in range(retries):
+            before = int(self.slot_seq[slot])
+            if before != seq:
+                if before != 0:
+                    # 已经被更新的帧覆盖
+                    return None
+                # 写端正在写这个槽
+                time.sleep(0)
+                continue
+            frame = self.frames[slot].copy()
+            if int(self.slot_seq[slot]) == seq:
+                return frame
+        return None
+
+    def close(self, unlink: bool = False):
+        # 先释放numpy视图，否则共享内存无法关闭
+        self.slot_seq = None
+        self.frames = None
+        self.shm.close()
+        if unlink:
+            self.shm.unlink()
+
+
+def _worker_main(source_type_value: str, source_id: str, params: Dict[str, Any],
+                 shm_name: str, width: int, height: int, slots: int,
+                 latest_seq, alive, active, suspend, stop, ready, max_fps: float):
+    """子进程入口：创建真正的图像源，把采集到的帧写入共享内存"""
+    from capture.source_manager import SourceManager
+
+    manager = SourceManager()
+    ring = FrameRing(width, height, slots, name=shm_name)
+    try:
+        created = manager.create_source(resolve_type(source_type_value), source_id, **params)
+        if created is None:
+            ready.send(False)
+            return
+        manager.switch_source(created)
+        ready.send(True)
+
+        source = manager.get_source(created)
+        health = manager.get_health(created)
+        interval = 1.0 / max_fps
+        seq = 0
+        while not stop.is_set():
+            # 主进程挂起代理时，同时挂起子进程中的真实图像源
+            if suspend.is_set() != source.suspended:
+                if suspend.is_set():
+                    source.suspend()
+                else:
+                    source.resume()
+            if not active.is_set():
+                active.wait(0.1)
+                continue
+            start = time.perf_counter()
+            frame = manager.capture_frame()
+            if frame is not None:
+                seq += 1
+                ring.write(seq, frame)
+                latest_seq.value = seq
+            # 画面没有变化时没有新帧，把存活时间告诉主进程，故障切换不会把它当作卡住
+            alive.value = health.last_alive_time
+            elapsed = time.perf_counter() - start
+            time.sleep(max(0.001, interval - elapsed))
+    except Exception as e:
+        print(f"[ProcessSource] 子进程异常 {source_id}: {e}")
+        try:
+            ready.send(False)
+        except Exception:
+            pass
+    finally:
+        manager.cleanup()
+        ring.close()
+
+
+class ProcessSource(ImageSourceInterface):
+    """
+    在子进程中运行任意图像源
+
+    解码、绘图等重活放在独立进程(独立的GIL和CPU核)里，帧按输出尺寸写入共享内存环形缓冲区，
+    跨进程传递的只有序号，主进程中的发包节奏不再受采集线程的GIL争用影响。
+    """
+
+    def __init__(self, source_type: SourceType, source_id: str = "",
+                 output_size=(240, 240), slots: int = 3, start_timeout: float = 15.0):
+        super().__init__(source_type, source_id)
+        self.output_size = tuple(output_size)
+        self.slots = max(2, slots)
+        self.start_timeout = start_timeout
+        self._params: Dict[str, Any] = {}
+        self._ring: Optional[FrameRing] = None
+        self._process = None
+        self._latest_seq = None
+        self._alive = None
+        self._last_alive = 0.0
+        self._active = None
+        self._suspend = None
+        self._stop = None
+        self._last_seq = 0
+        self._suspend_seq = 0
+        self._frames = 0
+
+    def initialize(self, **kwargs) -> bool:
+        self._params = dict(kwargs)
+        self.fps = kwargs.get('fps', self._fps)
+        width, height = self.output_size
+        ctx = mp.get_context('spawn')
+
+        self._ring = FrameRing(width, height, self.slots)
+        self._latest_seq = ctx.Value('Q', 0, lock=False)
+        self._alive = ctx.Value('d', 0.0, lock=False)
+        self._active = ctx.Event()
+        self._suspend = ctx.Event()
+        self._stop = ctx.Event()
+        ready_recv, ready_send = ctx.Pipe(duplex=False)
+
+        self._process = ctx.Process(
+            target=_worker_main,
+            args=(type_name(self.source_type), self.source_id, self._params,
+                  self._ring.name, width, height, self.slots,
+                  self._latest_seq, self._alive, self._active, self._suspend, self._stop, ready_send, self.fps),
+            daemon=True,
+            name=f"source-{self.source_id}"
+        )
+        self._process.start()
+
+        if not ready_recv.poll(self.start_timeout) or not ready_recv.recv():
+            print(f"[ProcessSource] 子进程中的图像源初始化失败: {self.source_id}")
+            self.release()
+            return False
+        return True
+
+    def capture(self) -> Optional[np.ndarray]:
+        """返回子进程写入的最新一帧，没有新帧时返回None"""
+        if not self._is_running or self._ring is None:
+            return None
+        seq = self._latest_seq.value
+        if seq == self._last_seq:
+            alive = self._alive.value
+            if alive > self._last_alive:
+                self._last_alive = alive
+                self._report_unchanged()
+            return None
+        frame = self._ring.read(seq)
+        if frame is None:
+            return None
+        self._last_seq = seq
+        self._frames += 1
+        return frame
+
+    def start(self):
+        super().start()
+        if self._active is not None:
+            self._active.set()
+
+    def stop(self):
+        super().stop()
+        if self._active is not None:
+            self._active.clear()
+
+    def suspend(self):
+        super().suspend()
+        if self._suspend is not None:
+            self._suspend.set()
+            self._suspend_seq = self._latest_seq.value
+
+    def resume(self):
+        if self._suspend is not None:
+            self._suspend.clear()
+        super().resume()
+
+    def get_suspend_stats(self) -> Dict[str, Any]:
+        stats = super().get_suspend_stats()
+        if self._suspended and self._latest_seq is not None:
+            # 挂起后子进程仍然写入的帧数
+            stats['work_while_suspended'] += self._latest_seq.value - self._suspend_seq
+        return stats
+
+    def get_info(self) -> Dict[str, Any]:
+        return {
+            'source_type': type_name(self.source_type),
+            'source_id': self.source_id,
+            'process': True,
+            'pid': self._process.pid if self._process else None,
+            'alive': bool(self._process and self._process.is_alive()),
+            'output_size': self.output_size,
+            'slots': self.slots,
+            'latest_seq': self._latest_seq.value if self._latest_seq is not None else 0,
+            'frames_delivered': self._frames,
+        }
+
+    def get_available_configs(self) -> List[Dict[str, Any]]:
+        return [
+            {'name': 'output_size', 'type': 'tuple', 'description': '共享内存中帧的尺寸 (width, height)',
+             'default': (240, 240)},
+            {'name': 'slots', 'type': 'int', 'description': '环形缓冲区槽数', 'default': 3, 'range': (2, 16)},
+        ]
+
+    def set_config(self, config: Dict[str, Any]) -> bool:
+        # 参数属于子进程里的真实图像源，需要重新启动子进程
+        params = dict(self._params)
+        params.update(config)
+        was_running = self._is_running
+        self.release()
+        if not self.initialize(**params):
+            return False
+        if was_running:
+            self.start()
+        return True
+
+    def release(self):
+        self._is_running = False
+        if self._stop is not None:
+            self._stop.set()
+        if self._active is not None:
+            self._active.set()
+        if self._process is not None:
+            self._process.join(timeout=3)
+            if self._process.is_alive():
+                self._process.terminate()
+            self._process = None
+        if self._ring is not None:
+            self._ring.close(unlink=True)
+            self._ring = None
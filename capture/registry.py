@@ -0,0 +1,125 @@
+from typing import Any, Callable, Dict, Optional, Union, List
+
+from capture.interface import SourceType, ImageSourceInterface
+
+# 第三方图像源通过这个entry point组注册，名称为源类型字符串，值为工厂函数
+ENTRY_POINT_GROUP = 'esp32_screen_share.sources'
+
+# 工厂函数: (source_type, source_id, **kwargs) -> ImageSourceInterface
+SourceFactory = Callable[..., ImageSourceInterface]
+
+
+def resolve_type(value: Union[SourceType, str]) -> Union[SourceType, str]:
+    """配置中的类型字符串转换为SourceType，第三方源的类型保持为字符串"""
+    if isinstance(value, SourceType):
+        return value
+    try:
+        return SourceType(value)
+    except ValueError:
+        return value
+
+
+def type_name(source_type: Union[SourceType, str]) -> str:
+    """源类型的字符串形式"""
+    return source_type.value if isinstance(source_type, SourceType) else str(source_type)
+
+
+class SourceRegistry:
+    """
+    图像源注册表
+
+    按源类型登记工厂函数，内置源的模块(以及它们依赖的OpenCV、sounddevice、Windows截图库)
+    在第一次创建该类型的源时才导入；遇到未登记的类型时再扫描entry point中的第三方源，
+    第三方源的模块同样在第一次创建该类型的源时才导入。
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, SourceFactory] = {}
+        self._entry_points: Dict[str, Any] = {}  # 类型 -> 尚未加载的EntryPoint
+        self._entry_points_loaded = False
+
+    def register(self, source_type: Union[SourceType, str], factory: SourceFactory):
+        """登记(或覆盖)一个源类型的工厂函数"""
+        self._factories[type_name(source_type)] = factory
+
+    def is_registered(self, source_type: Union[SourceType, str]) -> bool:
+        """类型是否可用，第三方源只检查entry point是否存在，不导入插件"""
+        key = type_name(source_type)
+        if key not in self._factories and not self._entry_points_loaded:
+            self.load_entry_points()
+        return key in self._factories or key in self._entry_points
+
+    def get_factory(self, source_type: Union[SourceType, str]) -> Optional[SourceFactory]:
+        key = type_name(source_type)
+        if key not in self._factories and not self._entry_points_loaded:
+            self.load_entry_points()
+        ep = self._entry_points.pop(key, None)
+        if ep is not None and key not in self._factories:
+            try:
+                self._factories[key] = ep.load()
+            except Exception as e:
+                print(f"加载图像源插件{key}失败: {e}")
+        return self._factories.get(key)
+
+    def create(self, source_type: Union[SourceType, str], source_id: str = "", **kwargs) -> ImageSourceInterface:
+        factory = self.get_factory(source_type)
+        if factory is None:
+            raise ValueError(f"Unsupported source type: {source_type}")
+        return factory(source_type, source_id, **kwargs)
+
+    def load_entry_points(self):
+        """扫描已安装包中声明的第三方图像源(只记录entry point，不导入插件模块)"""
+        self._entry_points_loaded = True
+        try:
+            from importlib.metadata import entry_points
+            eps = entry_points()
+            group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+        except Exception as e:
+            print(f"扫描图像源插件失败: {e}")
+            return
+        for ep in group:
+            if ep.name not in self._factories:
+                self._entry_points.setdefault(ep.name, ep)
+
+    def types(self) -> List[str]:
+        return sorted(set(self._factories) | set(self._entry_points))
+
+
+# 内置源的工厂函数，各自在函数内导入对应模块
+def _demo(source_type, source_id: str = "", **kwargs):
+    from capture.demo_source.demo_source import DemoSource
+    return DemoSource(source_type, source_id)
+
+
+def _screen(source_type, source_id: str = "", **kwargs):
+    from capture.screen_source.screen_capture_source import ScreenCaptureSource
+    return ScreenCaptureSource(source_id, kwargs.get('display_idx', 0))
+
+
+def _camera(source_type, source_id: str = "", **kwargs):
+    from capture.camera_source.camera_source import CameraSource
+    return CameraSource(source_id, kwargs.get('camera_idx', 0))
+
+
+def _rtsp(source_type, source_id: str = "", **kwargs):
+    from capture.rtsp_source.rtsp_source import RTSPSource
+    return RTSPSource(rtsp_url=kwargs.get('rtsp_url'), source_id=source_id)
+
+
+def _video_file(source_type, source_id: str = "", **kwargs):
+    from capture.video_source.video_source import VideoFileSource
+    return VideoFileSource(source_type=source_type, source_id=source_id)
+
+
+def _audio_visualization(source_type, source_id: str = "", **kwargs):
+    from capture.audio_visualization_source.audio_visualization_source import AudioVisualizationSource
+    return AudioVisualizationSource(source_type=source_type, source_id=source_id)
+
+
+registry = SourceRegistry()
+registry.register(SourceType.DEMO, _demo)
+registry.register(SourceType.SCREEN, _screen)
+registry.register(SourceType.CAMERA, _camera)
+registry.register(SourceType.RTSP, _rtsp)
+registry.register(SourceType.VIDEO_FILE, _video_file)
+registry.register(SourceType.AUDIO_VISUALIZATION, _audio_visualization)
@@ -31,6 +31,7 @@ class RTSPSource(ImageSourceInterface):
         'decode_resolution': None,  # 解码分辨率 (width, height)，None表示使用原始分辨率
         'rtsp_transport': 'tcp',  # RTSP传输协议: 'tcp'或'udp'
         'stabilization_frames': 30,  # 稳定帧数，用于计算平均FPS
+        'release_on_suspend': True,  # 挂起时是否断开连接(断开后恢复时需要重新连接)
     }
 
     def __init__(self, rtsp_url: str, source_id: str = ""):
@@ -47,7 +48,9 @@ class RTSPSource(ImageSourceInterface):
         self.buffer = []
         self.buffer_lock = Lock()
         self.capture_thread = None
-        self.should_stop = False
+        self._loop_stop = None  # 当前捕获线程的退出信号，每个线程各有一个
+        self._loop_running = False
+        self._release_on_exit = False  # 挂起/释放时线程还卡在cap.read()里，由线程退出时断开连接
         self.connected = False
         self.reconnect_count = 0
         self._info_cache = {}
@@ -163,9 +166,7 @@ class RTSPSource(ImageSourceInterface):
 
             # 启动捕获线程（如果使用缓冲）
             if self.config['use_buffer']:
-                self.should_stop = False
-                self.capture_thread = Thread(target=self._capture_loop, daemon=True)
-                self.capture_thread.start()
+                self._start_capture_thread()
                 logger.info("RTSP捕获线程已启动")
 
             logger.info(f"RTSP源初始化成功: {rtsp_url}")
@@ -177,12 +178,50 @@ class RTSPSource(ImageSourceInterface):
                 self.cap.release()
             return False
 
-    def _capture_loop(self):
+    def _start_capture_thread(self):
+        self._loop_stop = threading.Event()
+        self._loop_running = True
+        self._release_on_exit = False
+        self.capture_thread = Thread(target=self._capture_loop, args=(self._loop_stop,), daemon=True)
+        self.capture_thread.start()
+
+    def _stop_capture_thread(self, timeout: float = 2.0) -> bool:
+        """
+        通知捕获线程退出并等待
+
+        Returns:
+            bool: 线程是否已经退出；还卡在cap.read()里时保留线程句柄，返回False
+        """
+        if self._loop_stop is not None:
+            self._loop_stop.set()
+        if self.capture_thread is not None and self.capture_thread.is_alive():
+            self.capture_thread.join(timeout=timeout)
+            if self.capture_thread.is_alive():
+                return False
+        self.capture_thread = None
+        return True
+
+    def _release_cap_after_loop(self):
+        """捕获线程还卡在cap.read()里时由它退出时断开连接，否则在这里断开"""
+        with self.lock:
+            if self._loop_running:
+                self._release_on_exit = True
+                return
+        self._release_cap()
+
+    def _release_cap(self):
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+        self.connected = False
+
+    def _capture_loop(self, stop: threading.Event):
         """捕获线程的主循环"""
-        while not self.should_stop:
+        while not stop.is_set():
             try:
                 frame = self._read_frame()
                 if frame is not None:
+                    self._record_background_work()
                     with self.buffer_lock:
                         self.buffer.append(frame)
                         # 保持缓冲区大小
@@ -193,6 +232,12 @@ class RTSPSource(ImageSourceInterface):
             except Exception as e:
                 logger.error(f"捕获线程错误: {e}")
                 time.sleep(0.1)
+        with self.lock:
+            self._loop_running = False
+            release, self._release_on_exit = self._release_on_exit, False
+        if release:
+            # 挂起或释放时没等到这个线程退出，连接由它在这里断开，避免在cap.read()进行中释放
+            self._release_cap()
 
     def _read_frame(self) -> Optional[np.ndarray]:
         """读取一帧图像（内部方法）"""
@@ -413,6 +458,12 @@ class RTSPSource(ImageSourceInterface):
                 'description': '稳定帧数（用于计算平均FPS）',
                 'default': 30,
                 'range': (10, 1000)
+            },
+            {
+                'name': 'release_on_suspend',
+                'type': 'bool',
+                'description': '挂起时是否断开连接',
+                'default': True
             }
         ]
         return configs
@@ -454,32 +505,52 @@ class RTSPSource(ImageSourceInterface):
 
     def release(self):
         """释放资源"""
-        self.should_stop = True
-
-        if self.capture_thread and self.capture_thread.is_alive():
-            self.capture_thread.join(timeout=2.0)
-            self.capture_thread = None
-
-        if self.cap:
-            self.cap.release()
-            self.cap = None
+        self._stop_capture_thread()
+        self._release_cap_after_loop()
 
         with self.buffer_lock:
             self.buffer.clear()
 
-        self.connected = False
         logger.info("RTSP源资源已释放")
 
     def start(self):
         """启动RTSP源"""
         super().start()
+        if self.capture_thread is not None and self._loop_stop.is_set():
+            # stop()/挂起通知过的旧线程可能还在cap.read()里，等它退出后再重建，不能同时跑两个捕获线程
+            if not self._stop_capture_thread(timeout=self.config['timeout']):
+                logger.warning("RTSP捕获线程仍未退出，稍后再启动")
+                return
         if not self.connected:
             self.initialize()
+        elif self.config['use_buffer'] and self.capture_thread is None:
+            self._start_capture_thread()
+
+    def suspend(self):
+        """挂起：停止捕获线程、清空帧缓冲，默认同时断开连接"""
+        super().suspend()
+        self._stop_capture_thread()
+
+        with self.buffer_lock:
+            self.buffer.clear()
+        self.last_frame = None
+
+        if self.config['release_on_suspend'] and self.cap:
+            self._release_cap_after_loop()
+
+    def recover(self):
+        """重连次数用完后捕获线程只会空转，重置次数让它继续重连"""
+        if self.reconnect_count >= self.config['reconnect_attempts']:
+            logger.info("重置重连次数，继续尝试重连")
+            self.reconnect_count = 0
+        if self._is_running and not self.suspended:
+            self.start()
 
     def stop(self):
         """停止RTSP源"""
         super().stop()
-        self.should_stop = True
+        if self._loop_stop is not None:
+            self._loop_stop.set()
 
 
 # 使用示例
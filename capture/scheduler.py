@@ -0,0 +1,175 @@
+import threading
+import time
+from datetime import datetime
+from typing import Optional, List, Dict, Any, Tuple
+
+DAY_NAMES = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+
+class ScheduleEntry:
+    """
+    播放列表中的一项
+
+    设置duration时参与轮播，每次播放duration秒；设置window("HH:MM-HH:MM"，可以跨过零点)时
+    只在该时间段内播放，时间段内优先于轮播。days限制星期几生效，如 ["mon", "fri"] 或 [0, 4]
+    """
+
+    def __init__(self, source_id: str, duration: float = None, window: str = None, days: List = None):
+        if duration is None and window is None:
+            raise ValueError(f"Schedule entry {source_id} needs duration or window")
+        self.source_id = source_id
+        self.duration = duration
+        self.window = self._parse_window(window) if window else None
+        self.days = None
+        if days:
+            self.days = {DAY_NAMES.index(d.lower()[:3]) if isinstance(d, str) else int(d) for d in days}
+
+    @staticmethod
+    def _parse_window(window: str) -> Tuple[int, int]:
+        """"HH:MM-HH:MM" -> (开始分钟, 结束分钟)"""
+        start, end = window.split('-')
+
+        def minutes(text: str) -> int:
+            hour, minute = text.strip().split(':')
+            return int(hour) * 60 + int(minute)
+
+        return minutes(start), minutes(end)
+
+    def in_window(self, now: datetime) -> bool:
+        if self.window is None:
+            return False
+        start, end = self.window
+        minute = now.hour * 60 + now.minute
+        if start <= end:
+            inside, day = start <= minute < end, now.weekday()
+        else:
+            # 跨过零点的时间段，零点之后属于前一天的时间段
+            inside = minute >= start or minute < end
+            day = now.weekday() if minute >= start else (now.weekday() - 1) % 7
+        return inside and (self.days is None or day in self.days)
+
+
+class SourceScheduler:
+    """
+    图像源播放列表
+
+    在后台线程中按播放列表轮流切换活动源：时间段内的项优先，其余时间按顺序轮播有duration的项。
+    下一个源在切换前prewarm秒启动，到切换时已经在出帧，配合无缝切换不会出现空白帧；
+    不在当前时段的源保持挂起，不消耗解码开销。
+    手动切换的源保持到当前时段结束。
+    """
+
+    def __init__(self, streamer, entries: List[ScheduleEntry], prewarm: float = 3.0, tick: float = 0.25):
+        """
+        Args:
+            streamer: 推流程序(Streamer)
+            entries: 播放列表
+            prewarm: 提前多少秒启动下一个源
+            tick: 检查播放列表的间隔(秒)
+        """
+        self.streamer = streamer
+        self.manager = streamer.source_manager
+        self.entries = entries
+        self.rotation = [entry for entry in entries if entry.duration is not None and entry.window is None]
+        self.windows = [entry for entry in entries if entry.window is not None]
+        self.prewarm = prewarm
+        self.tick = tick
+
+        self._index = 0
+        self._slot_start = None
+        self._current = None
+        self._warmed = None
+        self._stop = threading.Event()
+        self._thread = None
+        self.stats = {
+            'switches': 0,
+            'prewarms': 0,
+            'failed_switches': 0,
+            'last_switch_ms': 0.0,
+        }
+
+    @classmethod
+    def from_config(cls, streamer, config: Optional[Dict[str, Any]]) -> Optional['SourceScheduler']:
+        """从config_stream.yaml的streamer.schedule部分创建，未配置播放列表时返回None"""
+        if not config or not config.get('entries'):
+            return None
+        entries = [ScheduleEntry(item['source'], item.get('duration'), item.get('window'), item.get('days'))
+                   for item in config['entries']]
+        return cls(streamer, entries, prewarm=config.get('prewarm', 3.0), tick=config.get('tick', 0.25))
+
+    def _resolve(self, now: float, index: int, slot_start: float) -> Tuple[Optional[str], int, float]:
+        """
+        计算now时刻应该播放的源
+
+        Returns:
+            (source_id, 轮播位置, 当前轮播项的开始时间)
+        """
+        wall = datetime.fromtimestamp(now)
+        for entry in self.windows:
+            if entry.in_window(wall):
+                # 时间段结束后轮播从当前项重新计时
+                return entry.source_id, index, None
+        if not self.rotation:
+            return None, index, slot_start
+        if slot_start is None:
+            slot_start = now
+        while now - slot_start >= self.rotation[index].duration:
+            slot_start += self.rotation[index].duration
+            index = (index + 1) % len(self.rotation)
+        return self.rotation[index].source_id, index, slot_start
+
+    def current_target(self, now: float = None) -> Optional[str]:
+        """当前时刻播放列表指定的源"""
+        source_id, _, _ = self._resolve(now or time.time(), self._index, self._slot_start)
+        return source_id
+
+    def step(self, now: float = None):
+        """检查一次播放列表：到时间时切换，快到时间时预热下一个源"""
+        now = now or time.time()
+        target, self._index, self._slot_start = self._resolve(now, self._index, self._slot_start)
+        if target is not None and target != self._current:
+            start = time.perf_counter()
+            if self.streamer.switch_source(target):
+                self.stats['switches'] += 1
+                self.stats['last_switch_ms'] = round((time.perf_counter() - start) * 1000, 1)
+                print(f"播放列表切换到: {target}")
+            else:
+                self.stats['failed_switches'] += 1
+                print(f"播放列表切换失败: {target}")
+            # 失败时也不反复重试，等下一个时段
+            self._current = target
+            self._warmed = None
+            # 预热了但没有轮到的源重新挂起
+            self.manager.suspend_inactive()
+
+        upcoming, _, _ = self._resolve(now + self.prewarm, self._index, self._slot_start)
+        if upcoming is not None and upcoming != self._current and upcoming != self._warmed:
+            self._warmed = upcoming
+            if self.manager.warm_source(upcoming):
+                self.stats['prewarms'] += 1
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as e:
+                print(f"播放列表出错: {e}")
+            self._stop.wait(self.tick)
+
+    def start(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True, name="source-scheduler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['current'] = self._current
+        return stats
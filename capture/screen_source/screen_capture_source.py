@@ -28,7 +28,7 @@ class ScreenCaptureSource(ImageSourceInterface):
             self._impl = MacScreenCapture(self.display_idx)
         elif system == "Linux":
             from capture.screen_source.screenshot_linux import LinuxScreenCapture
-            self._impl = LinuxScreenCapture(self.display_idx)
+            self._impl = LinuxScreenCapture(self.source_id, self.display_idx)
         else:
             raise RuntimeError(f"Unsupported platform: {system}")
 
@@ -45,6 +45,13 @@ class ScreenCaptureSource(ImageSourceInterface):
             print(f"Screen capture failed: {e}")
             return None
 
+    def take_unchanged(self) -> bool:
+        """画面没有变化的报告来自平台实现(如Linux的XDamage)"""
+        unchanged = super().take_unchanged()
+        if self._impl is not None:
+            unchanged = self._impl.take_unchanged() or unchanged
+        return unchanged
+
     def get_info(self) -> Dict[str, Any]:
         if not self._impl:
             return {}
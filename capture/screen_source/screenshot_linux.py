@@ -1,8 +1,1327 @@
 # Linux实现 (screenshot_linux.py)
-from capture.interface import ImageSourceInterface
+import ctypes
+import ctypes.util
+import os
+import threading
+import time
+from typing import Optional, Tuple, List, Dict, Any
+
+import numpy as np
+
+from capture.interface import ImageSourceInterface, SourceType, ScreenshotError, Frame
+
+ZPixmap = 2
+AllPlanes = ctypes.c_ulong(-1).value
+IPC_PRIVATE = 0
+IPC_CREAT = 0o1000
+IPC_RMID = 0
+XDamageReportNonEmpty = 3
+CompositeRedirectAutomatic = 0
+StructureNotifyMask = 1 << 17
+IsViewable = 2
+DestroyNotify, UnmapNotify, MapNotify, ConfigureNotify = 17, 18, 19, 22
+
+
+class XShmSegmentInfo(ctypes.Structure):
+    _fields_ = [
+        ('shmseg', ctypes.c_ulong),
+        ('shmid', ctypes.c_int),
+        ('shmaddr', ctypes.c_void_p),
+        ('readOnly', ctypes.c_int),
+    ]
+
+
+class XImage(ctypes.Structure):
+    _fields_ = [
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('xoffset', ctypes.c_int),
+        ('format', ctypes.c_int),
+        ('data', ctypes.c_void_p),
+        ('byte_order', ctypes.c_int),
+        ('bitmap_unit', ctypes.c_int),
+        ('bitmap_bit_order', ctypes.c_int),
+        ('bitmap_pad', ctypes.c_int),
+        ('depth', ctypes.c_int),
+        ('bytes_per_line', ctypes.c_int),
+        ('bits_per_pixel', ctypes.c_int),
+        ('red_mask', ctypes.c_ulong),
+        ('green_mask', ctypes.c_ulong),
+        ('blue_mask', ctypes.c_ulong),
+        ('obdata', ctypes.c_void_p),
+        ('f', ctypes.c_void_p * 6),
+    ]
+
+
+class XRectangle(ctypes.Structure):
+    _fields_ = [
+        ('x', ctypes.c_short),
+        ('y', ctypes.c_short),
+        ('width', ctypes.c_ushort),
+        ('height', ctypes.c_ushort),
+    ]
+
+
+class XWindowAttributes(ctypes.Structure):
+    _fields_ = [
+        ('x', ctypes.c_int),
+        ('y', ctypes.c_int),
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('border_width', ctypes.c_int),
+        ('depth', ctypes.c_int),
+        ('visual', ctypes.c_void_p),
+        ('root', ctypes.c_ulong),
+        ('class_', ctypes.c_int),
+        ('bit_gravity', ctypes.c_int),
+        ('win_gravity', ctypes.c_int),
+        ('backing_store', ctypes.c_int),
+        ('backing_planes', ctypes.c_ulong),
+        ('backing_pixel', ctypes.c_ulong),
+        ('save_under', ctypes.c_int),
+        ('colormap', ctypes.c_ulong),
+        ('map_installed', ctypes.c_int),
+        ('map_state', ctypes.c_int),
+        ('all_event_masks', ctypes.c_long),
+        ('your_event_mask', ctypes.c_long),
+        ('do_not_propagate_mask', ctypes.c_long),
+        ('override_redirect', ctypes.c_int),
+        ('screen', ctypes.c_void_p),
+    ]
+
+
+class XClassHint(ctypes.Structure):
+    _fields_ = [
+        ('res_name', ctypes.c_void_p),
+        ('res_class', ctypes.c_void_p),
+    ]
+
+
+class XConfigureEvent(ctypes.Structure):
+    """ConfigureNotify事件；DestroyNotify、UnmapNotify、MapNotify的前几个字段与它相同"""
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('serial', ctypes.c_ulong),
+        ('send_event', ctypes.c_int),
+        ('display', ctypes.c_void_p),
+        ('event', ctypes.c_ulong),
+        ('window', ctypes.c_ulong),
+        ('x', ctypes.c_int),
+        ('y', ctypes.c_int),
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+    ]
+
+
+class XRRMonitorInfo(ctypes.Structure):
+    _fields_ = [
+        ('name', ctypes.c_ulong),
+        ('primary', ctypes.c_int),
+        ('automatic', ctypes.c_int),
+        ('noutput', ctypes.c_int),
+        ('x', ctypes.c_int),
+        ('y', ctypes.c_int),
+        ('width', ctypes.c_int),
+        ('height', ctypes.c_int),
+        ('mwidth', ctypes.c_int),
+        ('mheight', ctypes.c_int),
+        ('outputs', ctypes.POINTER(ctypes.c_ulong)),
+    ]
+
+
+class XErrorEvent(ctypes.Structure):
+    _fields_ = [
+        ('type', ctypes.c_int),
+        ('display', ctypes.c_void_p),
+        ('resourceid', ctypes.c_ulong),
+        ('serial', ctypes.c_ulong),
+        ('error_code', ctypes.c_ubyte),
+        ('request_code', ctypes.c_ubyte),
+        ('minor_code', ctypes.c_ubyte),
+    ]
+
+
+XErrorHandler = ctypes.CFUNCTYPE(ctypes.c_int, ctypes.c_void_p, ctypes.POINTER(XErrorEvent))
+
+_threads_initialized = False
+
+
+def init_x11_threads():
+    """
+    调用XInitThreads，必须是进程中第一个Xlib调用(导入本模块时自动调用)
+
+    界面(tkinter)和本模块共用libX11，main_ui在创建Tk窗口之前调用
+    """
+    global _threads_initialized
+    if _threads_initialized:
+        return
+    _threads_initialized = True
+    path = ctypes.util.find_library('X11')
+    if path:
+        try:
+            ctypes.CDLL(path).XInitThreads()
+        except (OSError, AttributeError):
+            pass
+
+
+init_x11_threads()
+
+
+class X11Libs:
+    """libX11、libXext(MIT-SHM)和可选的libXrandr、libXdamage、libXfixes、libXcomposite的ctypes绑定，进程内只加载一次"""
+
+    def __init__(self):
+        names = {name: ctypes.util.find_library(name) for name in ('X11', 'Xext', 'c')}
+        missing = [name for name, path in names.items() if not path]
+        if missing:
+            raise ScreenshotError(f"Library not found: {', '.join(missing)}")
+        self.x11 = ctypes.CDLL(names['X11'])
+        self.xext = ctypes.CDLL(names['Xext'])
+        self.libc = ctypes.CDLL(names['c'], use_errno=True)
+        self.xrandr = self._optional('Xrandr')
+        self.xdamage = self._optional('Xdamage')
+        self.xfixes = self._optional('Xfixes')
+        self.xcomposite = self._optional('Xcomposite')
+
+        x11, xext, libc = self.x11, self.xext, self.libc
+        x11.XInitThreads.restype = ctypes.c_int
+        x11.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        x11.XOpenDisplay.restype = ctypes.c_void_p
+        x11.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        x11.XDefaultScreen.argtypes = [ctypes.c_void_p]
+        x11.XRootWindow.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XRootWindow.restype = ctypes.c_ulong
+        x11.XDefaultVisual.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDefaultVisual.restype = ctypes.c_void_p
+        x11.XDefaultDepth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayWidth.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XDisplayHeight.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XSync.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        x11.XFree.argtypes = [ctypes.c_void_p]
+        x11.XSetErrorHandler.argtypes = [XErrorHandler]
+        x11.XSetErrorHandler.restype = ctypes.c_void_p
+        x11.XPending.argtypes = [ctypes.c_void_p]
+        x11.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        x11.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        x11.XInternAtom.restype = ctypes.c_ulong
+        x11.XGetWindowProperty.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_long,
+                                           ctypes.c_long, ctypes.c_int, ctypes.c_ulong,
+                                           ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_int),
+                                           ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.c_ulong),
+                                           ctypes.POINTER(ctypes.c_void_p)]
+        x11.XFetchName.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(ctypes.c_void_p)]
+        x11.XGetClassHint.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XClassHint)]
+        x11.XQueryTree.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(ctypes.c_ulong),
+                                   ctypes.POINTER(ctypes.c_ulong), ctypes.POINTER(ctypes.POINTER(ctypes.c_ulong)),
+                                   ctypes.POINTER(ctypes.c_uint)]
+        x11.XGetWindowAttributes.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XWindowAttributes)]
+        x11.XSelectInput.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_long]
+        x11.XFreePixmap.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+
+        xext.XShmQueryExtension.argtypes = [ctypes.c_void_p]
+        xext.XShmCreateImage.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int,
+                                         ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo),
+                                         ctypes.c_uint, ctypes.c_uint]
+        xext.XShmCreateImage.restype = ctypes.POINTER(XImage)
+        xext.XShmAttach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmDetach.argtypes = [ctypes.c_void_p, ctypes.POINTER(XShmSegmentInfo)]
+        xext.XShmGetImage.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XImage),
+                                      ctypes.c_int, ctypes.c_int, ctypes.c_ulong]
+
+        libc.shmget.argtypes = [ctypes.c_int, ctypes.c_size_t, ctypes.c_int]
+        libc.shmat.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_int]
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = [ctypes.c_void_p]
+        libc.shmctl.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_void_p]
+
+        if self.xrandr is not None:
+            self.xrandr.XRRGetMonitors.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int,
+                                                   ctypes.POINTER(ctypes.c_int)]
+            self.xrandr.XRRGetMonitors.restype = ctypes.POINTER(XRRMonitorInfo)
+            self.xrandr.XRRFreeMonitors.argtypes = [ctypes.POINTER(XRRMonitorInfo)]
+
+        if self.xdamage is not None and self.xfixes is not None:
+            xdamage, xfixes = self.xdamage, self.xfixes
+            xdamage.XDamageQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+                                                      ctypes.POINTER(ctypes.c_int)]
+            xdamage.XDamageCreate.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int]
+            xdamage.XDamageCreate.restype = ctypes.c_ulong
+            xdamage.XDamageDestroy.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+            xdamage.XDamageSubtract.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong]
+            xfixes.XFixesQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+                                                    ctypes.POINTER(ctypes.c_int)]
+            xfixes.XFixesCreateRegion.argtypes = [ctypes.c_void_p, ctypes.POINTER(XRectangle), ctypes.c_int]
+            xfixes.XFixesCreateRegion.restype = ctypes.c_ulong
+            xfixes.XFixesDestroyRegion.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+            xfixes.XFixesFetchRegion.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(ctypes.c_int)]
+            xfixes.XFixesFetchRegion.restype = ctypes.POINTER(XRectangle)
+
+        if self.xcomposite is not None:
+            self.xcomposite.XCompositeQueryExtension.argtypes = [ctypes.c_void_p, ctypes.POINTER(ctypes.c_int),
+                                                                 ctypes.POINTER(ctypes.c_int)]
+            self.xcomposite.XCompositeRedirectWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int]
+            self.xcomposite.XCompositeUnredirectWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int]
+            self.xcomposite.XCompositeNameWindowPixmap.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+            self.xcomposite.XCompositeNameWindowPixmap.restype = ctypes.c_ulong
+
+        # 多个线程(初始化线程池、推流线程)都会调用Xlib，XInitThreads已在导入本模块时调用
+        init_x11_threads()
+        # 默认的错误处理函数会直接退出进程，本模块打开的display只记录错误码，由调用方检查返回值；
+        # 错误处理函数是进程全局的，其它display(如tkinter)的错误交给原来的处理函数
+        self._errors: Dict[int, int] = {}  # display -> 最近一次错误码
+        self._error_handler = XErrorHandler(self._on_error)
+        previous = x11.XSetErrorHandler(self._error_handler)
+        self._previous_handler = XErrorHandler(previous) if previous else None
+
+    @staticmethod
+    def _optional(name: str) -> Optional[ctypes.CDLL]:
+        path = ctypes.util.find_library(name)
+        return ctypes.CDLL(path) if path else None
+
+    def _on_error(self, display, event) -> int:
+        if display in self._errors:
+            self._errors[display] = event.contents.error_code
+            return 0
+        if self._previous_handler is not None:
+            return self._previous_handler(display, event)
+        return 0
+
+    def add_display(self, display: int):
+        """登记本模块打开的display，它的错误由last_error(display)返回"""
+        self._errors[display] = 0
+
+    def remove_display(self, display: int):
+        self._errors.pop(display, None)
+
+    def last_error(self, display: int) -> int:
+        return self._errors.get(display, 0)
+
+
+_libs: Optional[X11Libs] = None
+
+
+def x11_libs() -> X11Libs:
+    global _libs
+    if _libs is None:
+        _libs = X11Libs()
+    return _libs
+
+
+class X11Connection:
+    """一个X服务器连接及默认屏幕的信息"""
+
+    def __init__(self, display_name: str = None):
+        self.libs = x11_libs()
+        x11 = self.libs.x11
+        name = display_name or os.environ.get('DISPLAY')
+        if not name:
+            raise ScreenshotError("DISPLAY is not set")
+        self.display = x11.XOpenDisplay(name.encode())
+        if not self.display:
+            raise ScreenshotError(f"Cannot open X display {name}")
+        self.libs.add_display(self.display)
+        self.name = name
+        self._event = None
+        self.screen = x11.XDefaultScreen(self.display)
+        self.root = x11.XRootWindow(self.display, self.screen)
+        self.visual = x11.XDefaultVisual(self.display, self.screen)
+        self.depth = x11.XDefaultDepth(self.display, self.screen)
+        self.width = x11.XDisplayWidth(self.display, self.screen)
+        self.height = x11.XDisplayHeight(self.display, self.screen)
+        if not self.libs.xext.XShmQueryExtension(self.display):
+            self.close()
+            raise ScreenshotError("X server does not support MIT-SHM")
+
+    def monitors(self) -> List[Tuple[int, int, int, int]]:
+        """各显示器在根窗口中的区域 (x, y, width, height)；没有XRandR时整个根窗口算一个显示器"""
+        monitors = []
+        if self.libs.xrandr is not None:
+            count = ctypes.c_int(0)
+            info = self.libs.xrandr.XRRGetMonitors(self.display, self.root, 1, ctypes.byref(count))
+            if info:
+                for i in range(count.value):
+                    m = info[i]
+                    monitors.append((m.x, m.y, m.width, m.height))
+                self.libs.xrandr.XRRFreeMonitors(info)
+        return monitors or [(0, 0, self.width, self.height)]
+
+    def sync(self):
+        self.libs.x11.XSync(self.display, 0)
+
+    def drain_events(self) -> List[XConfigureEvent]:
+        """取出所有已到达的事件，返回窗口结构变化事件(其它事件如DamageNotify直接丢弃)"""
+        x11 = self.libs.x11
+        events = []
+        if self._event is None:
+            self._event = ctypes.create_string_buffer(192)  # sizeof(XEvent)
+        while x11.XPending(self.display):
+            x11.XNextEvent(self.display, self._event)
+            event = XConfigureEvent.from_buffer_copy(self._event)
+            if event.type in (DestroyNotify, UnmapNotify, MapNotify, ConfigureNotify):
+                events.append(event)
+        return events
+
+    def intern(self, name: str) -> int:
+        return self.libs.x11.XInternAtom(self.display, name.encode(), 0)
+
+    def get_property(self, window: int, name: str, fmt: int = 8):
+        """读取窗口属性，fmt为8时返回bytes，为32时返回整数列表；不存在时返回None"""
+        actual_type, actual_format = ctypes.c_ulong(), ctypes.c_int()
+        count, remaining, data = ctypes.c_ulong(), ctypes.c_ulong(), ctypes.c_void_p()
+        status = self.libs.x11.XGetWindowProperty(
+            self.display, window, self.intern(name), 0, 1 << 20, 0, 0,
+            ctypes.byref(actual_type), ctypes.byref(actual_format),
+            ctypes.byref(count), ctypes.byref(remaining), ctypes.byref(data))
+        if status != 0 or not data.value:
+            return None
+        try:
+            if actual_format.value != fmt:
+                return None
+            if fmt == 32:
+                # 格式32的属性在客户端以long数组存放
+                return list((ctypes.c_ulong * count.value).from_address(data.value))
+            return ctypes.string_at(data.value, count.value)
+        finally:
+            self.libs.x11.XFree(data)
+
+    def window_title(self, window: int) -> str:
+        title = self.get_property(window, '_NET_WM_NAME')
+        if title is not None:
+            return title.decode('utf-8', errors='replace')
+        name = ctypes.c_void_p()
+        if self.libs.x11.XFetchName(self.display, window, ctypes.byref(name)) and name.value:
+            try:
+                return ctypes.string_at(name.value).decode('latin-1')
+            finally:
+                self.libs.x11.XFree(name)
+        return ''
+
+    def window_class(self, window: int) -> Tuple[str, str]:
+        """(res_name, res_class)"""
+        hint = XClassHint()
+        if not self.libs.x11.XGetClassHint(self.display, window, ctypes.byref(hint)):
+            return '', ''
+        result = []
+        for pointer in (hint.res_name, hint.res_class):
+            result.append(ctypes.string_at(pointer).decode('latin-1') if pointer else '')
+            if pointer:
+                self.libs.x11.XFree(pointer)
+        return result[0], result[1]
+
+    def query_tree(self, window: int) -> Tuple[int, List[int]]:
+        """(父窗口, 子窗口列表)"""
+        root, parent = ctypes.c_ulong(), ctypes.c_ulong()
+        children, count = ctypes.POINTER(ctypes.c_ulong)(), ctypes.c_uint()
+        if not self.libs.x11.XQueryTree(self.display, window, ctypes.byref(root), ctypes.byref(parent),
+                                        ctypes.byref(children), ctypes.byref(count)):
+            return 0, []
+        result = [children[i] for i in range(count.value)]
+        if children:
+            self.libs.x11.XFree(children)
+        return parent.value, result
+
+    def window_attributes(self, window: int) -> Optional[XWindowAttributes]:
+        attributes = XWindowAttributes()
+        if not self.libs.x11.XGetWindowAttributes(self.display, window, ctypes.byref(attributes)):
+            return None
+        return attributes
+
+    def client_windows(self) -> List[int]:
+        """
+        所有应用程序的顶层窗口
+
+        优先使用窗口管理器维护的_NET_CLIENT_LIST，没有窗口管理器时遍历窗口树找带WM_CLASS的窗口
+        """
+        clients = self.get_property(self.root, '_NET_CLIENT_LIST', 32)
+        if clients:
+            return clients
+        clients, stack = [], [self.root]
+        while stack:
+            _, children = self.query_tree(stack.pop())
+            for child in children:
+                if self.get_property(child, 'WM_CLASS') is not None:
+                    clients.append(child)
+                else:
+                    stack.append(child)
+        return clients
+
+    def find_window(self, title: str = None, window_class: str = None) -> Optional[int]:
+        """按标题(先完全匹配，再不区分大小写的部分匹配)或WM_CLASS查找窗口"""
+        candidates = []
+        for window in self.client_windows():
+            if window_class:
+                if window_class.lower() not in [name.lower() for name in self.window_class(window)]:
+                    continue
+            if title:
+                window_title = self.window_title(window)
+                if window_title == title:
+                    return window
+                if title.lower() not in window_title.lower():
+                    continue
+            candidates.append(window)
+        return candidates[0] if candidates else None
+
+    def frame_window(self, window: int) -> int:
+        """窗口管理器给窗口加的外框(根窗口的直接子窗口)，没有外框时返回窗口本身"""
+        while True:
+            parent, _ = self.query_tree(window)
+            if not parent or parent == self.root:
+                return window
+            window = parent
+
+    @property
+    def last_error(self) -> int:
+        """这个连接最近一次X错误的错误码"""
+        return self.libs.last_error(self.display) if self.display else 0
+
+    def close(self):
+        if self.display:
+            self.libs.x11.XCloseDisplay(self.display)
+            self.libs.remove_display(self.display)
+            self.display = None
+
+
+class ShmImage:
+    """
+    附加到X服务器的共享内存图像
+
+    初始化时分配一次共享内存段，numpy数组直接映射到这段内存，
+    之后每次XShmGetImage由X服务器把像素写进同一块内存，不再分配。
+    """
+
+    def __init__(self, conn: X11Connection, width: int, height: int, visual: int = None, depth: int = None):
+        """visual和depth默认与根窗口相同，截取深度不同的窗口(如带透明通道的窗口)时传入窗口的值"""
+        self.conn = conn
+        self.width = width
+        self.height = height
+        libs = conn.libs
+        self.info = XShmSegmentInfo()
+        self.info.shmid = -1
+        self.image = libs.xext.XShmCreateImage(conn.display, visual or conn.visual, depth or conn.depth, ZPixmap,
+                                               None, ctypes.byref(self.info), width, height)
+        if not self.image:
+            raise ScreenshotError("XShmCreateImage failed")
+        self._attached = False
+        self._removed = False
+        try:
+            image = self.image.contents
+            if image.bits_per_pixel != 32:
+                raise ScreenshotError(f"Unsupported pixel format: {image.bits_per_pixel} bits per pixel")
+            size = image.bytes_per_line * height
+            self.info.shmid = libs.libc.shmget(IPC_PRIVATE, size, IPC_CREAT | 0o600)
+            if self.info.shmid < 0:
+                raise ScreenshotError(f"shmget failed: {os.strerror(ctypes.get_errno())}")
+            address = libs.libc.shmat(self.info.shmid, None, 0)
+            if address in (None, ctypes.c_void_p(-1).value):
+                raise ScreenshotError(f"shmat failed: {os.strerror(ctypes.get_errno())}")
+            self.info.shmaddr = address
+            image.data = address
+            self.info.readOnly = 0
+            if not libs.xext.XShmAttach(conn.display, ctypes.byref(self.info)):
+                raise ScreenshotError("XShmAttach failed")
+            conn.sync()
+            self._attached = True
+            # 附加之后立即标记删除，进程退出时共享内存段自动回收
+            libs.libc.shmctl(self.info.shmid, IPC_RMID, None)
+            self._removed = True
+
+            buffer = (ctypes.c_uint8 * size).from_address(address)
+            rows = np.frombuffer(buffer, dtype=np.uint8).reshape(height, image.bytes_per_line)
+            # 每像素4字节，小端序下为 B G R X
+            self.pixels = rows[:, :width * 4].reshape(height, width, 4)
+            self._rgb = image.red_mask == 0xFF
+        except Exception:
+            self.close()
+            raise
+
+    def grab(self, drawable: int, x: int = 0, y: int = 0) -> bool:
+        """把drawable从(x, y)开始、与图像同样大小的区域读入共享内存"""
+        return bool(self.conn.libs.xext.XShmGetImage(self.conn.display, drawable, self.image,
+                                                     x, y, AllPlanes))
+
+    def grab_rows(self, drawable: int, x: int, y: int, row: int, rows: int) -> bool:
+        """
+        只读取第row行开始的rows行(整行宽度)
+
+        临时把XImage的高度和数据指针指向共享内存中对应的行，行距与整幅图像相同，不需要另外分配
+        """
+        image = self.image.contents
+        image.height = rows
+        image.data = self.info.shmaddr + row * image.bytes_per_line
+        try:
+            return self.grab(drawable, x, y + row)
+        finally:
+            image.height = self.height
+            image.data = self.info.shmaddr
+
+    def frame(self, rect: Tuple[int, int, int, int] = None) -> np.ndarray:
+        """共享内存(中rect区域)的BGR视图(不复制)，下一次grab会覆盖其中的内容"""
+        pixels = self.pixels
+        if rect is not None:
+            x, y, width, height = rect
+            pixels = pixels[y:y + height, x:x + width]
+        if self._rgb:
+            return pixels[:, :, [2, 1, 0]]
+        return pixels[:, :, :3]
+
+    def close(self):
+        libs = self.conn.libs
+        if self._attached:
+            libs.xext.XShmDetach(self.conn.display, ctypes.byref(self.info))
+            self.conn.sync()
+            self._attached = False
+        if self.info.shmaddr:
+            libs.libc.shmdt(self.info.shmaddr)
+            self.info.shmaddr = None
+        if self.info.shmid >= 0 and not self._removed:
+            libs.libc.shmctl(self.info.shmid, IPC_RMID, None)
+            self._removed = True
+        if self.image:
+            # XShmCreateImage创建的图像不拥有data，XFree只释放结构体
+            self.image.contents.data = None
+            libs.x11.XFree(self.image)
+            self.image = None
+
+
+class DamageTracker:
+    """
+    用XDamage跟踪drawable中发生变化的区域
+
+    变化区域在X服务器端累积，fetch()一次取出并清空，只需要一次往返；
+    没有变化时不需要读取任何像素
+    """
+
+    def __init__(self, conn: X11Connection, drawable: int):
+        libs = conn.libs
+        if libs.xdamage is None or libs.xfixes is None:
+            raise ScreenshotError("libXdamage/libXfixes not found")
+        event_base, error_base = ctypes.c_int(), ctypes.c_int()
+        if not libs.xdamage.XDamageQueryExtension(conn.display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            raise ScreenshotError("X server does not support DAMAGE")
+        if not libs.xfixes.XFixesQueryExtension(conn.display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            raise ScreenshotError("X server does not support XFIXES")
+        self.conn = conn
+        self.damage = libs.xdamage.XDamageCreate(conn.display, drawable, XDamageReportNonEmpty)
+        self.region = libs.xfixes.XFixesCreateRegion(conn.display, None, 0)
+
+    def fetch(self) -> List[Tuple[int, int, int, int]]:
+        """
+        取出并清空累积的变化区域，返回drawable坐标系中的矩形列表
+
+        DamageNotify事件只用来唤醒，调用方需要定期conn.drain_events()丢弃它们
+        """
+        libs, display = self.conn.libs, self.conn.display
+        libs.xdamage.XDamageSubtract(display, self.damage, 0, self.region)
+        count = ctypes.c_int(0)
+        rects = libs.xfixes.XFixesFetchRegion(display, self.region, ctypes.byref(count))
+        if not rects:
+            return []
+        result = [(rects[i].x, rects[i].y, rects[i].width, rects[i].height) for i in range(count.value)]
+        libs.x11.XFree(rects)
+        return result
+
+    def close(self):
+        libs, display = self.conn.libs, self.conn.display
+        if self.damage:
+            libs.xdamage.XDamageDestroy(display, self.damage)
+            self.damage = 0
+        if self.region:
+            libs.xfixes.XFixesDestroyRegion(display, self.region)
+            self.region = 0
+
+
+def merge_rows(rects: List[Tuple[int, int, int, int]], gap: int = 8) -> List[Tuple[int, int]]:
+    """把矩形覆盖的行合并为不相交的行区间 [(起始行, 结束行)]，间隔不超过gap行的区间合并为一个"""
+    bands = []
+    for _, y, _, height in sorted(rects, key=lambda r: r[1]):
+        if bands and y <= bands[-1][1] + gap:
+            bands[-1][1] = max(bands[-1][1], y + height)
+        else:
+            bands.append([y, y + height])
+    return [(start, end) for start, end in bands]
+
+
+def _bbox(rects: List[Tuple[int, int, int, int]]) -> Tuple[int, int, int, int]:
+    left = min(r[0] for r in rects)
+    top = min(r[1] for r in rects)
+    right = max(r[0] + r[2] for r in rects)
+    bottom = max(r[1] + r[3] for r in rects)
+    return left, top, right - left, bottom - top
+
+
+class GrabSubscription:
+    """SharedScreenGrabber的一个订阅者(截图源)"""
+
+    def __init__(self, rect: Tuple[int, int, int, int], max_age: float, damage: bool):
+        self.rect = rect  # 根窗口坐标系中的区域
+        self.max_age = max_age  # 别的订阅者截的图不超过多久可以直接使用
+        self.damage = damage  # 没有变化时是否返回None
+        self.seen = -1  # 已经取过的截图序号
+        self.full = True  # 下一帧整个区域都算作变化
+        self.dirty: List[Tuple[int, int, int, int]] = []  # 上次取帧之后变化的区域(订阅区域坐标系)
+        self.unchanged = False  # 上一次capture返回None是因为区域内没有变化(而不是截图失败)
+
+
+_shared_grabbers: Dict[str, 'SharedScreenGrabber'] = {}
+_shared_grabbers_lock = threading.Lock()
+
+
+class SharedScreenGrabber:
+    """
+    同一个X display上所有截图源共享的截图
+
+    每个截图源登记自己在根窗口中的区域，共享内存图像覆盖所有区域的外接矩形。
+    截图源要新的一帧、而当前这一帧它已经取过或者已经太旧时才真正截图一次，只读取各区域覆盖的行
+    (开启XDamage时只读取其中变化的行)；同一个周期内其它截图源直接拿到这一帧中自己区域的视图，不复制。
+    截图开销只与display的数量有关，与配置了多少个截图源无关。
+
+    通过acquire()获取进程内共享的实例，用完调用release()。
+    """
+
+    def __init__(self, display_name: str = None):
+        self.conn = X11Connection(display_name)
+        self._key = display_name or ''
+        self._refs = 0
+        self._lock = threading.Lock()
+        self._subscriptions: List[GrabSubscription] = []
+        self._image: Optional[ShmImage] = None
+        self._bounds = (0, 0, 0, 0)  # 共享图像在根窗口中的区域
+        self._generation = 0
+        self._grab_time = 0.0
+        self._full_grab = True
+        try:
+            self._damage = DamageTracker(self.conn, self.conn.root)
+        except ScreenshotError as e:
+            print(f"XDamage不可用，每次截图读取所有订阅区域: {e}")
+            self._damage = None
+        self.stats = {
+            'requests': 0,
+            'grabs': 0,
+            'shared': 0,
+            'grabbed_rows': 0,
+        }
+
+    @classmethod
+    def acquire(cls, display_name: str = None) -> 'SharedScreenGrabber':
+        key = display_name or os.environ.get('DISPLAY') or ''
+        with _shared_grabbers_lock:
+            grabber = _shared_grabbers.get(key)
+            if grabber is None:
+                grabber = cls(key or None)
+                _shared_grabbers[key] = grabber
+            grabber._refs += 1
+            return grabber
+
+    def release(self):
+        with _shared_grabbers_lock:
+            self._refs -= 1
+            if self._refs > 0:
+                return
+            _shared_grabbers.pop(self._key, None)
+        with self._lock:
+            if self._damage is not None:
+                self._damage.close()
+                self._damage = None
+            if self._image is not None:
+                self._image.close()
+                self._image = None
+            self.conn.close()
+
+    def monitors(self) -> List[Tuple[int, int, int, int]]:
+        with self._lock:
+            return self.conn.monitors()
+
+    # ========== 订阅 ==========
+
+    def subscribe(self, rect: Tuple[int, int, int, int], max_age: float, damage: bool = True) -> GrabSubscription:
+        subscription = GrabSubscription(rect, max_age, damage)
+        with self._lock:
+            self._subscriptions.append(subscription)
+            try:
+                self._rebuild()
+            except Exception:
+                self._subscriptions.remove(subscription)
+                raise
+        return subscription
+
+    def update(self, subscription: GrabSubscription, rect: Tuple[int, int, int, int]):
+        with self._lock:
+            subscription.rect = rect
+            self._rebuild()
+
+    def unsubscribe(self, subscription: GrabSubscription):
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+                self._rebuild()
+
+    def _rebuild(self):
+        """订阅区域变化后重新计算外接矩形，大小改变时重新分配共享内存图像"""
+        for subscription in self._subscriptions:
+            subscription.full = True
+            subscription.dirty = []
+        self._full_grab = True
+        if not self._subscriptions:
+            if self._image is not None:
+                self._image.close()
+                self._image = None
+            self._bounds = (0, 0, 0, 0)
+            return
+        bounds = _bbox([subscription.rect for subscription in self._subscriptions])
+        if self._image is not None and bounds[2:] != self._bounds[2:]:
+            self._image.close()
+            self._image = None
+        if self._image is None:
+            self._image = ShmImage(self.conn, bounds[2], bounds[3])
+        self._bounds = bounds
+
+    # ========== 截图 ==========
+
+    def _relative(self, rect: Tuple[int, int, int, int]) -> Tuple[int, int, int, int]:
+        return rect[0] - self._bounds[0], rect[1] - self._bounds[1], rect[2], rect[3]
+
+    def _grab(self, now: float) -> bool:
+        """截图一次：第一次或区域变化后读取所有订阅区域覆盖的行，之后只读取订阅区域内变化的行"""
+        x, y = self._bounds[:2]
+        regions = [self._relative(subscription.rect) for subscription in self._subscriptions]
+        self.conn.drain_events()
+        if self._damage is not None:
+            damaged = []
+            for rx, ry, rw, rh in self._damage.fetch():
+                rx, ry = rx - x, ry - y
+                for subscription, (sx, sy, sw, sh) in zip(self._subscriptions, regions):
+                    left, top = max(rx, sx), max(ry, sy)
+                    right, bottom = min(rx + rw, sx + sw), min(ry + rh, sy + sh)
+                    if right > left and bottom > top:
+                        damaged.append((left, top, right - left, bottom - top))
+                        subscription.dirty.append((left - sx, top - sy, right - left, bottom - top))
+                        if len(subscription.dirty) > 32:
+                            # 长时间不取帧的订阅者只保留外接矩形
+                            subscription.dirty = [_bbox(subscription.dirty)]
+            if not self._full_grab:
+                regions = damaged
+
+        self._generation += 1
+        self._grab_time = now
+        self.stats['grabs'] += 1
+        for start, end in merge_rows(regions):
+            if not self._image.grab_rows(self.conn.root, x, y, start, end - start):
+                print(f"Capture failed: XShmGetImage error {self.conn.last_error}")
+                self._full_grab = True
+                for subscription in self._subscriptions:
+                    subscription.full = True
+                return False
+            self.stats['grabbed_rows'] += end - start
+        self._full_grab = False
+        return True
+
+    def capture(self, subscription: GrabSubscription, now: float = None) -> Optional[np.ndarray]:
+        """
+        返回订阅区域的视图(不复制，下一次截图会覆盖其中的内容)
+
+        订阅者开启damage时返回带damage_bbox的Frame，区域内没有变化时返回None并设置subscription.unchanged
+        """
+        now = now or time.time()
+        subscription.unchanged = False
+        with self._lock:
+            if self._image is None:
+                return None
+            self.stats['requests'] += 1
+            if subscription.seen == self._generation or now - self._grab_time > subscription.max_age:
+                if not self._grab(now):
+                    return None
+            else:
+                self.stats['shared'] += 1
+            subscription.seen = self._generation
+
+            view = self._image.frame(self._relative(subscription.rect))
+            if self._damage is None or not subscription.damage:
+                subscription.full = False
+                subscription.dirty = []
+                return view
+            if subscription.full:
+                rects = [(0, 0, subscription.rect[2], subscription.rect[3])]
+            elif subscription.dirty:
+                rects = subscription.dirty
+            else:
+                subscription.unchanged = True
+                return None
+            subscription.full = False
+            subscription.dirty = []
+            return Frame.wrap(view, _bbox(rects), rects)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+            stats['subscribers'] = len(self._subscriptions)
+            stats['bounds'] = self._bounds
+            stats['damage'] = self._damage is not None
+            return stats
 
 
 class LinuxScreenCapture(ImageSourceInterface):
-    def capture(self, region=None):
-        # 使用X11或Wayland实现
-        pass
\ No newline at end of file
+    """
+    Linux平台屏幕截图源(X11 MIT-SHM)
+
+    截图区域对应的共享内存图像在initialize时分配，之后每帧只调用一次XShmGetImage。
+    display_idx为XRandR报告的第几个显示器，region为根窗口坐标系中的区域 (x, y, width, height)。
+
+    设置window_title或window_class时截取窗口：用XComposite把窗口重定向到离屏缓冲区，
+    被遮挡或移出屏幕的窗口也能截到；remove_title_bar为True(默认)时只截客户区。
+    窗口只在初始化和窗口被关闭后查找，大小变化通过ConfigureNotify事件跟踪。
+
+    X服务器支持DAMAGE扩展时(damage为True)，只在截图区域内有像素变化时才读取，并且只读取变化的行；
+    没有变化时capture返回None，返回的帧是带有damage_bbox(相对截图区域)的Frame。
+
+    截取显示器或区域时(share_grab为True，默认)，同一个X display上的截图源通过SharedScreenGrabber共享截图，
+    多个截图源同时在用时每个周期只截图一次。
+    """
+
+    def __init__(self, source_id: str = "", display_idx: int = 0):
+        super().__init__(SourceType.SCREEN, source_id or f"screen_{display_idx}")
+        self.display_idx = display_idx
+        self._region = None  # 截图区域 (x, y, width, height)
+        self._window_title = None  # 窗口标题
+        self._window_class = None  # 窗口WM_CLASS
+        self._remove_title_bar = True  # 是否只截客户区
+        self._display_name = None  # X display，默认使用环境变量DISPLAY
+        self._conn: Optional[X11Connection] = None
+        self._image: Optional[ShmImage] = None
+        self._rect = (0, 0, 0, 0)  # 实际截取的区域
+        self._last_capture_time = 0.0
+        self._use_damage = True
+        self._damage: Optional[DamageTracker] = None
+        self._full_grab = True  # 下一帧需要完整读取(刚分配图像或恢复运行)
+        self._share_grab = True
+        self._grabber: Optional[SharedScreenGrabber] = None
+        self._subscription: Optional[GrabSubscription] = None
+        # 窗口截图的状态
+        self._window = 0  # 被截取的窗口
+        self._window_mapped = False
+        self._pixmap = 0  # 窗口的离屏缓冲区
+        self._window_visual = None
+        self._window_depth = None
+        self._last_window_search = 0.0
+        self.damage_stats = {
+            'polls': 0,
+            'unchanged': 0,
+            'grabbed_rows': 0,
+            'total_rows': 0,
+        }
+
+    @property
+    def _window_mode(self) -> bool:
+        return bool(self._window_title or self._window_class)
+
+    def initialize(self, **kwargs) -> bool:
+        """初始化截图源"""
+        try:
+            if 'region' in kwargs:
+                self._region = kwargs['region']
+            if 'window_title' in kwargs:
+                self._window_title = kwargs['window_title']
+            if 'window_class' in kwargs:
+                self._window_class = kwargs['window_class']
+            if 'remove_title_bar' in kwargs:
+                self._remove_title_bar = kwargs['remove_title_bar']
+            if 'display_idx' in kwargs:
+                self.display_idx = kwargs['display_idx']
+            if 'display' in kwargs:
+                self._display_name = kwargs['display']
+            if 'fps' in kwargs:
+                self.fps = kwargs['fps']
+            if 'damage' in kwargs:
+                self._use_damage = kwargs['damage']
+            if 'share_grab' in kwargs:
+                self._share_grab = kwargs['share_grab']
+
+            if self._share_grab and not self._window_mode:
+                self._grabber = SharedScreenGrabber.acquire(self._display_name)
+                self._rect = self._capture_rect()
+                self._subscription = self._grabber.subscribe(self._rect, 0.5 / self._fps, self._use_damage)
+            else:
+                if self._conn is None:
+                    self._conn = X11Connection(self._display_name)
+                if self._window_mode:
+                    self._attach_window()
+                else:
+                    self._allocate()
+                    self._track_damage(self._conn.root)
+            self._is_running = True
+            return True
+
+        except Exception as e:
+            self.release()
+            raise ScreenshotError(f"Failed to initialize X11 screen capture: {e}")
+
+    def _track_damage(self, drawable: int):
+        if not self._use_damage:
+            return
+        if self._damage is not None:
+            self._damage.close()
+            self._damage = None
+        try:
+            self._damage = DamageTracker(self._conn, drawable)
+        except ScreenshotError as e:
+            print(f"XDamage不可用，每帧完整截图: {e}")
+            self._use_damage = False
+
+    def _capture_rect(self) -> Tuple[int, int, int, int]:
+        """根据region和display_idx计算截取区域，并裁剪到根窗口范围内"""
+        conn = self._grabber.conn if self._grabber else self._conn
+        monitors = self.list_displays()
+        if self._region:
+            x, y, width, height = self._region
+        elif 0 <= self.display_idx < len(monitors):
+            x, y, width, height = monitors[self.display_idx]
+        else:
+            raise ScreenshotError(f"Display {self.display_idx} not found ({len(monitors)} displays)")
+        x = max(0, min(x, conn.width - 1))
+        y = max(0, min(y, conn.height - 1))
+        width = max(1, min(width, conn.width - x))
+        height = max(1, min(height, conn.height - y))
+        return x, y, width, height
+
+    def _allocate(self, rect: Tuple[int, int, int, int] = None):
+        """区域大小改变时重新分配共享内存图像"""
+        rect = rect or self._capture_rect()
+        if self._image is not None and rect[2:] == self._rect[2:]:
+            self._rect = rect
+            return
+        if self._image is not None:
+            self._image.close()
+            self._image = None
+        self._image = ShmImage(self._conn, rect[2], rect[3], self._window_visual, self._window_depth)
+        self._rect = rect
+        self._full_grab = True
+
+    # ========== 窗口截图 ==========
+
+    def _attach_window(self):
+        """查找窗口，重定向到离屏缓冲区并开始跟踪它的结构变化"""
+        libs = self._conn.libs
+        if libs.xcomposite is None:
+            raise ScreenshotError("libXcomposite not found")
+        event_base, error_base = ctypes.c_int(), ctypes.c_int()
+        if not libs.xcomposite.XCompositeQueryExtension(self._conn.display, ctypes.byref(event_base),
+                                                        ctypes.byref(error_base)):
+            raise ScreenshotError("X server does not support Composite")
+
+        self._last_window_search = time.time()
+        window = self._conn.find_window(self._window_title, self._window_class)
+        if window is None:
+            raise ScreenshotError(f"Window '{self._window_title or self._window_class}' not found")
+        if not self._remove_title_bar:
+            window = self._conn.frame_window(window)
+        attributes = self._conn.window_attributes(window)
+        if attributes is None:
+            raise ScreenshotError(f"Window {window:#x} is gone")
+
+        libs.xcomposite.XCompositeRedirectWindow(self._conn.display, window, CompositeRedirectAutomatic)
+        libs.x11.XSelectInput(self._conn.display, window, StructureNotifyMask)
+        self._window = window
+        self._window_mapped = attributes.map_state == IsViewable
+        if (attributes.visual, attributes.depth) != (self._window_visual, self._window_depth) and self._image:
+            # 深度不同的窗口需要重新创建图像
+            self._image.close()
+            self._image = None
+        self._window_visual, self._window_depth = attributes.visual, attributes.depth
+        self._resize_window(attributes.width, attributes.height)
+        self._track_damage(window)
+
+    def _resize_window(self, width: int, height: int):
+        """窗口大小变化或重新显示后，重新获取离屏缓冲区"""
+        self._free_pixmap()
+        self._allocate((0, 0, max(1, width), max(1, height)))
+        if self._window_mapped:
+            self._pixmap = self._conn.libs.xcomposite.XCompositeNameWindowPixmap(self._conn.display, self._window)
+        self._full_grab = True
+
+    def _free_pixmap(self):
+        if self._pixmap:
+            self._conn.libs.x11.XFreePixmap(self._conn.display, self._pixmap)
+            self._pixmap = 0
+
+    def _detach_window(self):
+        self._free_pixmap()
+        if self._window:
+            libs = self._conn.libs
+            libs.x11.XSelectInput(self._conn.display, self._window, 0)
+            libs.xcomposite.XCompositeUnredirectWindow(self._conn.display, self._window, CompositeRedirectAutomatic)
+            self._window = 0
+
+    def _handle_window_events(self, events: List[XConfigureEvent]):
+        for event in events:
+            if event.window != self._window:
+                continue
+            if event.type == ConfigureNotify:
+                if (event.width, event.height) != self._rect[2:]:
+                    self._resize_window(event.width, event.height)
+            elif event.type == UnmapNotify:
+                self._window_mapped = False
+                self._free_pixmap()
+            elif event.type == MapNotify:
+                self._window_mapped = True
+                self._resize_window(*self._rect[2:])
+            elif event.type == DestroyNotify:
+                # 窗口销毁时服务器已经释放了它的damage对象，离屏缓冲区还需要自己释放
+                self._free_pixmap()
+                self._window = 0
+                if self._damage is not None:
+                    self._damage.damage = 0
+                    self._damage.close()
+                    self._damage = None
+
+    def _window_drawable(self) -> int:
+        """窗口截图时要读取的离屏缓冲区，窗口不可见或已关闭时返回0"""
+        if not self._window and time.time() - self._last_window_search >= 1.0:
+            # 窗口被关闭后每秒重新查找一次(比如程序重启)
+            try:
+                self._attach_window()
+            except ScreenshotError:
+                pass
+        if not self._window or not self._window_mapped:
+            return 0
+        return self._pixmap
+
+    # ========== 截图 ==========
+
+    def capture(self) -> Optional[np.ndarray]:
+        """
+        捕获一帧屏幕图像
+
+        距离上一帧不足1/fps秒、截取的窗口不可见，或者(开启XDamage时)截图区域没有变化时返回None
+        """
+        if not self._is_running or (self._image is None and self._subscription is None):
+            return None
+
+        current_time = time.time()
+        if current_time - self._last_capture_time < 1.0 / self._fps:
+            return None
+        self._last_capture_time = current_time
+
+        if self._subscription is not None:
+            # 同一个周期内别的截图源已经截过图时直接使用
+            self._subscription.max_age = 0.5 / self._fps
+            frame = self._grabber.capture(self._subscription, current_time)
+            if self._subscription.damage:
+                self.damage_stats['polls'] += 1
+                if self._subscription.unchanged:
+                    self.damage_stats['unchanged'] += 1
+                    self._report_unchanged()
+            return frame
+
+        events = self._conn.drain_events()
+        if self._window_mode:
+            self._handle_window_events(events)
+            drawable = self._window_drawable()
+            if not drawable:
+                return None
+            x, y = 0, 0
+        else:
+            drawable = self._conn.root
+            x, y = self._rect[:2]
+        width, height = self._rect[2:]
+
+        if self._damage is None:
+            if not self._image.grab(drawable, x, y):
+                print(f"Capture failed: XShmGetImage error {self._conn.last_error}")
+                return None
+            return self._image.frame()
+
+        # 变化区域转换到截图区域坐标系并裁剪
+        self.damage_stats['polls'] += 1
+        rects = []
+        for rx, ry, rw, rh in self._damage.fetch():
+            left, top = max(rx - x, 0), max(ry - y, 0)
+            right, bottom = min(rx + rw - x, width), min(ry + rh - y, height)
+            if right > left and bottom > top:
+                rects.append((left, top, right - left, bottom - top))
+        if self._full_grab:
+            rects = [(0, 0, width, height)]
+        elif not rects:
+            self.damage_stats['unchanged'] += 1
+            self._report_unchanged()
+            return None
+
+        for start, end in merge_rows(rects):
+            if not self._image.grab_rows(drawable, x, y, start, end - start):
+                print(f"Capture failed: XShmGetImage error {self._conn.last_error}")
+                self._full_grab = True
+                return None
+            self.damage_stats['grabbed_rows'] += end - start
+        self.damage_stats['total_rows'] += height
+        self._full_grab = False
+
+        return Frame.wrap(self._image.frame(), _bbox(rects), rects)
+
+    def start(self):
+        """停止期间的变化已经在X服务器端累积，这里保险起见下一帧完整读取"""
+        super().start()
+        self._full_grab = True
+        if self._subscription is not None:
+            self._subscription.full = True
+
+    def list_displays(self) -> List[Tuple[int, int, int, int]]:
+        if self._grabber is not None:
+            return self._grabber.monitors()
+        return self._conn.monitors() if self._conn else []
+
+    def get_display_info(self) -> Dict[str, Any]:
+        return self.get_info()
+
+    def get_info(self) -> Dict[str, Any]:
+        """获取截图源信息"""
+        if self._window_mode:
+            capture_mode = 'window'
+        else:
+            capture_mode = 'region' if self._region else 'display'
+        info = {
+            'source_type': self.source_type.value,
+            'source_id': self.source_id,
+            'capture_mode': capture_mode,
+            'resolution': self._rect[2:],
+            'display_idx': self.display_idx,
+            'fps': self._fps,
+            'backend': 'x11-shm',
+            'damage': self._damage is not None,
+        }
+        if self._grabber is not None:
+            shared = self._grabber.get_stats()
+            info['damage'] = shared['damage'] and self._subscription.damage
+            info['shared_grab'] = shared
+        if info['damage']:
+            info['damage_stats'] = dict(self.damage_stats)
+        if self._window_mode:
+            info.update({
+                'window_title': self._conn.window_title(self._window) if self._conn and self._window else None,
+                'window_id': self._window,
+                'window_visible': self._window_mapped,
+                'remove_title_bar': self._remove_title_bar,
+            })
+        elif self._region:
+            info['region'] = self._region
+        conn = self._grabber.conn if self._grabber else self._conn
+        if conn:
+            info['display'] = conn.name
+        return info
+
+    def get_available_configs(self) -> List[Dict[str, Any]]:
+        """获取可用的配置选项"""
+        return [
+            {
+                'name': 'display_idx',
+                'type': 'int',
+                'description': '显示器索引',
+                'default': 0,
+                'range': f'0-{max(0, len(self.list_displays()) - 1)}'
+            },
+            {
+                'name': 'region',
+                'type': 'tuple',
+                'description': '截图区域 (x, y, width, height)',
+                'default': None,
+                'optional': True
+            },
+            {
+                'name': 'window_title',
+                'type': 'str',
+                'description': '窗口标题(先完全匹配，再部分匹配)',
+                'default': '',
+                'optional': True
+            },
+            {
+                'name': 'window_class',
+                'type': 'str',
+                'description': '窗口WM_CLASS(程序名或类名)',
+                'default': '',
+                'optional': True
+            },
+            {
+                'name': 'remove_title_bar',
+                'type': 'bool',
+                'description': '是否移除窗口标题栏',
+                'default': True
+            },
+            {
+                'name': 'fps',
+                'type': 'float',
+                'description': '帧率',
+                'default': 30.0,
+                'range': '1.0-120.0'
+            },
+            {
+                'name': 'damage',
+                'type': 'bool',
+                'description': '是否只在画面变化时截图(XDamage)',
+                'default': True
+            },
+            {
+                'name': 'share_grab',
+                'type': 'bool',
+                'description': '同一个显示器上的截图源共享截图(截取窗口时不共享)',
+                'default': True
+            },
+            {
+                'name': 'display',
+                'type': 'str',
+                'description': 'X display，默认使用环境变量DISPLAY',
+                'default': None,
+                'optional': True
+            },
+        ]
+
+    def set_config(self, config: Dict[str, Any]) -> bool:
+        """设置配置参数"""
+        try:
+            if 'region' in config:
+                self._region = config['region']
+            if 'display_idx' in config:
+                self.display_idx = config['display_idx']
+            if 'fps' in config:
+                self.fps = config['fps']
+            mode_changed = False
+            for key in ('window_title', 'window_class', 'remove_title_bar', 'share_grab'):
+                if key in config:
+                    setattr(self, f'_{key}', config[key])
+                    mode_changed = True
+            if self._conn is None and self._grabber is None:
+                return True
+            if mode_changed:
+                # 截图方式改变，重新初始化
+                running = self._is_running
+                self.release()
+                self._window_visual = self._window_depth = None
+                self.initialize()
+                self._is_running = running
+            elif 'region' in config or 'display_idx' in config:
+                if self._subscription is not None:
+                    self._rect = self._capture_rect()
+                    self._grabber.update(self._subscription, self._rect)
+                elif not self._window_mode:
+                    self._allocate()
+            return True
+
+        except Exception as e:
+            print(f"Failed to set config: {e}")
+            return False
+
+    def release(self):
+        """释放资源"""
+        self._is_running = False
+        if self._damage is not None:
+            self._damage.close()
+            self._damage = None
+        if self._grabber is not None:
+            self._grabber.unsubscribe(self._subscription)
+            self._grabber.release()
+            self._grabber = None
+            self._subscription = None
+        if self._conn is not None:
+            self._detach_window()
+        if self._image is not None:
+            self._image.close()
+            self._image = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
@@ -0,0 +1,252 @@
+"""
+在真实的X服务器(Xvfb)上测试Linux截图源，没有安装Xvfb时跳过
+
+    python -m unittest capture.screen_source.screenshot_linux_test
+    XVFB_DISPLAY=:42 python -m unittest capture.screen_source.screenshot_linux_test
+"""
+import ctypes
+import os
+import shutil
+import subprocess
+import sys
+import time
+import unittest
+
+import numpy as np
+
+WIDTH, HEIGHT = 320, 240
+
+
+def start_xvfb(display: str) -> subprocess.Popen:
+    """启动Xvfb并等它开始监听"""
+    process = subprocess.Popen(['Xvfb', display, '-screen', '0', f'{WIDTH}x{HEIGHT}x24', '-nolisten', 'tcp'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    socket_path = f"/tmp/.X11-unix/X{display.lstrip(':').split('.')[0]}"
+    deadline = time.time() + 10
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Xvfb退出，退出码{process.returncode}(display {display}可能已被占用)")
+        if os.path.exists(socket_path):
+            return process
+        time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("等待Xvfb启动超时")
+
+
+def bgr(rgb: int) -> tuple:
+    """X的24位像素值对应截图中的(B, G, R)"""
+    return rgb & 0xFF, (rgb >> 8) & 0xFF, (rgb >> 16) & 0xFF
+
+
+def poll(source, accept=lambda frame: True, timeout: float = 2.0):
+    """反复capture直到拿到accept的帧，超时返回None"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        frame = source.capture()
+        if frame is not None and accept(frame):
+            return frame
+        time.sleep(0.01)
+    return None
+
+
+class XClient:
+    """在自己的X连接上创建窗口并绘图，模拟被截图的应用程序"""
+
+    def __init__(self):
+        from capture.screen_source.screenshot_linux import X11Connection
+        self.conn = X11Connection()
+        x11 = self.conn.libs.x11
+        x11.XCreateSimpleWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_int, ctypes.c_int,
+                                            ctypes.c_uint, ctypes.c_uint, ctypes.c_uint,
+                                            ctypes.c_ulong, ctypes.c_ulong]
+        x11.XCreateSimpleWindow.restype = ctypes.c_ulong
+        x11.XMapWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong]
+        x11.XResizeWindow.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_uint, ctypes.c_uint]
+        x11.XStoreName.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_char_p]
+        x11.XCreateGC.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_void_p]
+        x11.XCreateGC.restype = ctypes.c_void_p
+        x11.XSetForeground.argtypes = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_ulong]
+        x11.XFillRectangle.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.c_void_p,
+                                       ctypes.c_int, ctypes.c_int, ctypes.c_uint, ctypes.c_uint]
+        self.x11 = x11
+        self.gc = None
+
+    def window(self, x: int, y: int, width: int, height: int, title: str = None) -> int:
+        """创建并显示一个黑色背景的窗口，title不为空时同时设置标题和WM_CLASS"""
+        from capture.screen_source.screenshot_linux import XClassHint
+        display = self.conn.display
+        window = self.x11.XCreateSimpleWindow(display, self.conn.root, x, y, width, height, 0, 0, 0)
+        if title:
+            self.x11.XStoreName(display, window, title.encode())
+            name = ctypes.create_string_buffer(title.encode())
+            hint = XClassHint(ctypes.cast(name, ctypes.c_void_p), ctypes.cast(name, ctypes.c_void_p))
+            self.x11.XSetClassHint.argtypes = [ctypes.c_void_p, ctypes.c_ulong, ctypes.POINTER(XClassHint)]
+            self.x11.XSetClassHint(display, window, ctypes.byref(hint))
+        self.x11.XMapWindow(display, window)
+        if self.gc is None:
+            self.gc = self.x11.XCreateGC(display, window, 0, None)
+        self.conn.sync()
+        return window
+
+    def fill(self, window: int, rgb: int, x: int, y: int, width: int, height: int):
+        self.x11.XSetForeground(self.conn.display, self.gc, rgb)
+        self.x11.XFillRectangle(self.conn.display, window, self.gc, x, y, width, height)
+        self.conn.sync()
+
+    def resize(self, window: int, width: int, height: int):
+        self.x11.XResizeWindow(self.conn.display, window, width, height)
+        self.conn.sync()
+
+    def close(self):
+        self.conn.close()
+
+
+@unittest.skipUnless(sys.platform.startswith('linux') and shutil.which('Xvfb'), "没有找到Xvfb")
+class LinuxScreenCaptureTest(unittest.TestCase):
+    """每个测试使用新的客户端连接，关闭连接时它创建的窗口随之销毁"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.display = os.environ.get('XVFB_DISPLAY', ':99')
+        cls.xvfb = start_xvfb(cls.display)
+        cls.old_display = os.environ.get('DISPLAY')
+        os.environ['DISPLAY'] = cls.display
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.xvfb.terminate()
+        cls.xvfb.wait(5)
+        if cls.old_display is None:
+            os.environ.pop('DISPLAY', None)
+        else:
+            os.environ['DISPLAY'] = cls.old_display
+
+    def setUp(self):
+        self.client = XClient()
+        self.background = self.client.window(0, 0, WIDTH, HEIGHT)
+        self.sources = []
+
+    def tearDown(self):
+        for source in self.sources:
+            source.release()
+        self.client.close()
+
+    def source(self, **kwargs):
+        from capture.screen_source.screenshot_linux import LinuxScreenCapture
+        source = LinuxScreenCapture()
+        self.sources.append(source)
+        kwargs.setdefault('fps', 120)
+        self.assertTrue(source.initialize(**kwargs))
+        return source
+
+    def require_damage(self, source):
+        if not source.get_info()['damage']:
+            self.skipTest("X服务器或系统不支持XDamage")
+
+    def assert_rect(self, frame, rect, rgb):
+        x, y, width, height = rect
+        inside = np.asarray(frame[y:y + height, x:x + width])
+        self.assertTrue((inside == bgr(rgb)).all(), f"{rect}内像素{inside[0, 0]}，应为{bgr(rgb)}")
+
+    # ========== user-045: MIT-SHM截图 ==========
+
+    def test_full_screen_pixels(self):
+        self.client.fill(self.background, 0x3366CC, 40, 30, 50, 20)
+        frame = poll(self.source(damage=False, share_grab=False))
+        self.assertIsNotNone(frame)
+        self.assertEqual(frame.shape, (HEIGHT, WIDTH, 3))
+        self.assert_rect(frame, (40, 30, 50, 20), 0x3366CC)
+        self.assert_rect(frame, (40, 60, 50, 10), 0x000000)
+
+    def test_region_pixels(self):
+        self.client.fill(self.background, 0x11EE22, 100, 100, 20, 20)
+        frame = poll(self.source(region=[90, 80, 60, 50], damage=False, share_grab=False))
+        self.assertEqual(frame.shape, (50, 60, 3))
+        self.assert_rect(frame, (10, 20, 20, 20), 0x11EE22)
+        self.assert_rect(frame, (0, 0, 10, 20), 0x000000)
+
+    # ========== user-046: XDamage ==========
+
+    def test_damage_rows(self):
+        source = self.source(share_grab=False)
+        self.require_damage(source)
+        self.assertIsNotNone(poll(source))
+
+        # 画面没有变化：返回None并报告unchanged(刚创建窗口时可能还有一次迟到的变化)
+        for _ in range(3):
+            time.sleep(0.02)
+            if source.capture() is None and source.take_unchanged():
+                break
+        else:
+            self.fail("画面没有变化时没有返回None并报告unchanged")
+
+        self.client.fill(self.background, 0xFF8000, 10, 100, 30, 20)
+        frame = poll(source)
+        self.assertIsNotNone(frame)
+        rows = frame.damage_rows()
+        self.assertIsNotNone(rows)
+        covered = set()
+        for start, end in rows:
+            covered.update(range(start, end))
+        self.assertTrue(set(range(100, 120)) <= covered, f"damage_rows {rows} 没有覆盖[100, 120)")
+        self.assertLess(len(covered), HEIGHT // 2)
+        self.assert_rect(frame, (10, 100, 30, 20), 0xFF8000)
+
+    def test_static_screen_is_healthy(self):
+        from capture.interface import SourceType
+        from capture.source_manager import SourceManager
+        manager = SourceManager()
+        try:
+            self.assertEqual(manager.create_source(SourceType.SCREEN, 'screen', fps=120, share_grab=False),
+                             'screen')
+            self.require_damage(manager.get_source('screen')._impl)
+            self.assertTrue(manager.warm_source('screen'))
+            deadline = time.time() + 2.0
+            while time.time() < deadline and manager.get_health('screen').unchanged == 0:
+                manager.capture_frame('screen')
+                time.sleep(0.02)
+            health = manager.get_health('screen')
+            self.assertGreater(health.unchanged, 0)
+            self.assertLess(health.frame_age(), 1.0)
+        finally:
+            manager.cleanup()
+
+    # ========== user-047: 窗口截图 ==========
+
+    def test_window_capture_follows_resize(self):
+        if self.client.conn.libs.xcomposite is None:
+            self.skipTest("没有找到libXcomposite")
+        title = "screenshot-linux-test"
+        window = self.client.window(20, 20, 120, 80, title)
+        source = self.source(window_title=title, share_grab=False)
+        self.client.fill(window, 0x22AA44, 0, 0, 120, 80)
+        frame = poll(source, lambda f: tuple(f[40, 60]) == bgr(0x22AA44))
+        self.assertIsNotNone(frame, "没有截到窗口内容")
+        self.assertEqual(frame.shape, (80, 120, 3))
+
+        self.client.resize(window, 200, 150)
+        self.client.fill(window, 0x22AA44, 0, 0, 200, 150)
+        frame = poll(source, lambda f: f.shape[:2] == (150, 200) and tuple(f[140, 190]) == bgr(0x22AA44))
+        self.assertIsNotNone(frame, f"窗口改变大小后截图尺寸为{source.get_info()['resolution']}，应为(200, 150)")
+
+    # ========== user-048: 共享截图 ==========
+
+    def test_shared_grab(self):
+        self.client.fill(self.background, 0x4040C0, 20, 20, 40, 40)
+        self.client.fill(self.background, 0xC04040, 200, 150, 40, 40)
+        left = self.source(region=[0, 0, 100, 100], fps=10, damage=False)
+        right = self.source(region=[180, 130, 100, 100], fps=10, damage=False)
+        self.assertIs(left._grabber, right._grabber)
+
+        a = np.array(left.capture())
+        b = np.array(right.capture())
+        self.assert_rect(a, (20, 20, 40, 40), 0x4040C0)
+        self.assert_rect(b, (20, 20, 40, 40), 0xC04040)
+        stats = left._grabber.get_stats()
+        # 第二个源在同一个周期内直接使用第一个源截的图
+        self.assertEqual(stats['grabs'], 1)
+        self.assertEqual(stats['shared'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,50 +1,233 @@
-from typing import Optional, List, Dict, Any
+import threading
+import time
+from typing import Optional, List, Dict, Any, Callable
 
 import numpy as np
 
-from capture.demo_source.demo_source import DemoSource
-from capture.camera_source.camera_source import CameraSource
-from capture.rtsp_source.rtsp_source import RTSPSource
+from capture.failover import SourceHealth
 from capture.interface import SourceType, ImageSourceInterface
-from capture.screen_source.screen_capture_source import ScreenCaptureSource
-from capture.video_source.video_source import VideoFileSource
-from capture.audio_visualization_source.audio_visualization_source import AudioVisualizationSource
+from capture.registry import registry, type_name
 
 
 class SourceManager:
     """图像源管理器"""
 
-    def __init__(self):
+    # 就绪报告中的状态
+    READY = 'ready'
+    FAILED = 'failed'
+    TIMEOUT = 'timeout'
+    REGISTERED = 'registered'
+    DEGRADED = 'degraded'
+
+    def __init__(self, retry_interval: float = 5.0, max_retry_interval: float = 60.0,
+                 switch_timeout: float = 10.0):
         self._sources = {}  # source_id -> ImageSourceInterface
         self._active_source_id = None
+        self._specs = {}  # source_id -> (source_type, process, kwargs)，已登记但尚未初始化的源
+        self._init_locks = {}  # source_id -> Lock，避免同一个源被预热线程和切换同时初始化
+        self._lock = threading.Lock()
+
+        # 初始化失败或超时的源在后台按指数退避重试
+        self.retry_interval = retry_interval
+        self.max_retry_interval = max_retry_interval
+        self._degraded = set()
+        self._retry_thread = None
+        self._closed = threading.Event()
+        self.on_source_ready: Optional[Callable[[str], None]] = None  # 降级的源重试成功后回调
+
+        # 无缝切换：推流线程看到的活动源只在_switch_cond下改变
+        self.switch_timeout = switch_timeout
+        self._switch_cond = threading.Condition()
+        self._switch_generation = 0
+        self._pending_frame = None  # 新源预热时拿到的第一帧，切换后第一次capture_frame返回
+        self._busy = {}  # source_id -> 正在进行的capture调用数
+
+        self._health: Dict[str, SourceHealth] = {}  # 每个源最近的出帧和出错情况
+
+        # 切换过渡效果(capture.transition.Transition)，None表示硬切
+        self.transition = None
+        self._last_frame = None
+        self._last_frame_source = None
+
+    def register_source(self, source_type: SourceType, source_id: str,
+                        process=None, **kwargs) -> Optional[str]:
+        """
+        登记图像源但不初始化
+
+        第一次切换到该源(或预热)时才调用create_source，启动时只需等待活动源就绪
+        """
+        if not registry.is_registered(source_type):
+            print(f"Unsupported source type: {type_name(source_type)}")
+            return None
+        with self._lock:
+            if source_id in self._sources or source_id in self._specs:
+                print(f"Source {source_id} already exists")
+                return source_id
+            self._specs[source_id] = (source_type, process, kwargs)
+        return source_id
+
+    def is_registered(self, source_id: str) -> bool:
+        """源是否存在(已初始化或已登记)"""
+        return source_id in self._sources or source_id in self._specs
+
+    def ensure_source(self, source_id: str) -> bool:
+        """
+        确保源已经初始化，已登记未初始化的源在这里初始化
+
+        Returns:
+            bool: 源是否可用
+        """
+        with self._lock:
+            if source_id in self._sources:
+                return True
+            spec = self._specs.get(source_id)
+            if spec is None:
+                return False
+            init_lock = self._init_locks.setdefault(source_id, threading.Lock())
+
+        with init_lock:
+            if source_id in self._sources:
+                return True
+            source_type, process, kwargs = spec
+            # 按需初始化(切换、预热、并行启动、后台重试)的源只由switch_source设为活动源
+            if self.create_source(source_type, source_id, process=process, activate=False, **kwargs) is None:
+                # 保留登记信息，下次切换时重试
+                return False
+            with self._lock:
+                self._specs.pop(source_id, None)
+            if self._closed.is_set():
+                # 超时的初始化在管理器清理之后才完成
+                self._sources.pop(source_id).release()
+                return False
+            return True
+
+    def initialize_sources(self, source_ids: List[str], timeout: float = 10.0,
+                           max_workers: int = 4) -> Dict[str, str]:
+        """
+        并行初始化多个源(最多max_workers个同时进行)，最多等待timeout秒
+
+        失败或超时的源标记为降级并在后台重试(超时的初始化仍在继续，完成后即可使用)，不会阻塞推流。
+        初始化在守护线程中进行，卡住的初始化(如连不上的RTSP地址)不会阻止程序退出。
+
+        Returns:
+            就绪报告 source_id -> 'ready' / 'failed' / 'timeout'
+        """
+        if not source_ids:
+            return {}
+        results: Dict[str, bool] = {}
+        finished = threading.Condition()
+        slots = threading.Semaphore(max(1, min(max_workers, len(source_ids))))
+
+        def init(source_id: str):
+            with slots:
+                try:
+                    ready = self.ensure_source(source_id)
+                except Exception as e:
+                    print(f"初始化源{source_id}出错: {e}")
+                    ready = False
+            with finished:
+                results[source_id] = ready
+                finished.notify_all()
+
+        for source_id in source_ids:
+            threading.Thread(target=init, args=(source_id,), daemon=True, name=f"source-init-{source_id}").start()
+        with finished:
+            # 不等待超时的初始化结束
+            finished.wait_for(lambda: len(results) == len(source_ids), timeout=timeout)
+            done = dict(results)
+
+        report = {}
+        for source_id in source_ids:
+            if source_id not in done:
+                report[source_id] = self.TIMEOUT
+            elif done[source_id]:
+                report[source_id] = self.READY
+                continue
+            else:
+                report[source_id] = self.FAILED
+            self._mark_degraded(source_id)
+        return report
+
+    def get_readiness(self) -> Dict[str, str]:
+        """所有源的状态: ready / degraded(后台重试中) / registered(尚未初始化)"""
+        with self._lock:
+            readiness = {source_id: self.READY for source_id in self._sources}
+            for source_id in self._specs:
+                readiness[source_id] = self.DEGRADED if source_id in self._degraded else self.REGISTERED
+        return readiness
+
+    def _park(self, source_id: str):
+        """源初始化完成但不是活动源时挂起"""
+        source = self._sources.get(source_id)
+        if source is not None and source_id != self._active_source_id and not source.suspended:
+            source.suspend()
+
+    def _mark_degraded(self, source_id: str):
+        with self._lock:
+            self._degraded.add(source_id)
+            if self._retry_thread is None or not self._retry_thread.is_alive():
+                self._retry_thread = threading.Thread(target=self._retry_loop, daemon=True,
+                                                      name="source-retry")
+                self._retry_thread.start()
+
+    def _retry_loop(self):
+        """后台重试降级的源，直到全部就绪或管理器被清理"""
+        delay = self.retry_interval
+        while not self._closed.wait(delay):
+            with self._lock:
+                pending = list(self._degraded)
+            if not pending:
+                return
+            for source_id in pending:
+                try:
+                    ready = self.ensure_source(source_id)
+                except Exception as e:
+                    print(f"重试初始化源{source_id}出错: {e}")
+                    ready = False
+                if ready:
+                    with self._lock:
+                        self._degraded.discard(source_id)
+                    print(f"降级的源已恢复: {source_id}")
+                    if self.on_source_ready is not None:
+                        self.on_source_ready(source_id)
+                    self._park(source_id)
+            delay = min(delay * 2, self.max_retry_interval)
+
+    def prewarm(self, source_ids: List[str]) -> threading.Thread:
+        """在后台线程中依次初始化source_ids，切换到这些源时不需要再等待"""
+        def worker():
+            for source_id in source_ids:
+                if self.ensure_source(source_id):
+                    self._park(source_id)
+                    print(f"预热完成: {source_id}")
+                else:
+                    print(f"预热失败: {source_id}")
+
+        thread = threading.Thread(target=worker, daemon=True, name="source-prewarm")
+        thread.start()
+        return thread
 
     def create_source(self, source_type: SourceType,
-                      source_id: str = "", **kwargs) -> Optional[str]:
-        """创建图像源"""
+                      source_id: str = "", process=None, activate: bool = True, **kwargs) -> Optional[str]:
+        """
+        创建图像源
+
+        process为True或 {'output_size': [w, h], 'slots': n} 时，图像源运行在独立的子进程中，
+        帧通过共享内存传回，对调用方透明。
+        activate为True且还没有活动源时设为活动源(启动时初始化全部源的情况)
+        """
 
         if source_id and source_id in self._sources:
             print(f"Source {source_id} already exists")
             return None
 
-        # 根据类型创建对应的源
-        if source_type == SourceType.DEMO:
-            source = DemoSource(source_type,source_id)
-        elif source_type == SourceType.SCREEN:
-            display_idx = kwargs.get('display_idx', 0)
-            source = ScreenCaptureSource(source_id, display_idx)
-        elif source_type == SourceType.CAMERA:
-            camera_idx = kwargs.get('camera_idx', 0)
-            source = CameraSource(source_id, camera_idx)
-        elif source_type == SourceType.RTSP:
-            rtsp_url = kwargs.get('rtsp_url')
-            source = RTSPSource(rtsp_url=rtsp_url,source_id=source_id)
-        elif source_type == SourceType.VIDEO_FILE:
-            source = VideoFileSource(source_type=source_type,source_id=source_id)
-        elif source_type == SourceType.AUDIO_VISUALIZATION:
-            source = AudioVisualizationSource(source_type=source_type, source_id=source_id)
-
+        # 根据类型创建对应的源(对应模块在第一次使用时才导入)
+        if process:
+            from capture.process_source.process_source import ProcessSource
+            options = process if isinstance(process, dict) else {}
+            source = ProcessSource(source_type, source_id, **options)
         else:
-            raise ValueError(f"Unsupported source type: {source_type}")
+            source = registry.create(source_type, source_id, **kwargs)
 
         # 初始化
         if not source.initialize(**kwargs):
@@ -53,18 +236,32 @@ class SourceManager:
 
         # 生成ID（如果未提供）
         if not source_id:
-            source_id = f"{source_type.value}_{len(self._sources)}"
+            source_id = f"{type_name(source_type)}_{len(self._sources)}"
             source.source_id = source_id
 
         # 添加到管理器
-        self._sources[source_id] = source
+        with self._lock:
+            self._sources[source_id] = source
 
-        # 如果没有活动源，设为第一个源
-        if self._active_source_id is None:
-            self._active_source_id = source_id
+            # 如果没有活动源，设为第一个源
+            if activate and self._active_source_id is None:
+                self._active_source_id = source_id
 
         return source_id
 
+    @property
+    def active_source_id(self) -> Optional[str]:
+        return self._active_source_id
+
+    def get_health(self, source_id: str) -> SourceHealth:
+        """源的健康状况，由capture_frame记录"""
+        with self._lock:
+            return self._health.setdefault(source_id, SourceHealth())
+
+    def get_health_stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {source_id: health.get_stats() for source_id, health in self._health.items()}
+
     def get_source(self, source_id: str = None) -> Optional[ImageSourceInterface]:
         """获取图像源"""
         if source_id is None:
@@ -72,69 +269,202 @@ class SourceManager:
 
         return self._sources.get(source_id)
 
-    def switch_source(self, source_id: str) -> bool:
-        """切换活动图像源"""
-        if source_id not in self._sources:
-            return False
+    def switch_source(self, source_id: str, wait: bool = True, suspend_old: bool = True) -> bool:
+        """
+        切换活动图像源(无缝切换)
 
-        # 停止当前源
-        current = self.get_source()
-        if current:
-            current.stop()
+        在当前线程(wait=False时在后台线程)中初始化或恢复新源，等它出第一帧之后再原子地替换活动源，
+        期间推流线程继续从旧源取帧；替换后第一次capture_frame返回这第一帧，最后才挂起旧源。
+        新源超过switch_timeout秒仍没有出帧时照常切换。连续切换时只有最后一次生效。
+        suspend_old为False时旧源继续运行(故障切换时让失效的源在后台重连)。
 
-        # 启动新源
-        self._active_source_id = source_id
+        Returns:
+            bool: wait=True时表示是否切换成功，wait=False时表示是否已开始切换
+        """
+        if not self.is_registered(source_id):
+            return False
+        with self._switch_cond:
+            self._switch_generation += 1
+            generation = self._switch_generation
+        if not wait:
+            threading.Thread(target=self._switch, args=(source_id, generation, suspend_old), daemon=True,
+                             name=f"source-switch-{source_id}").start()
+            return True
+        return self._switch(source_id, generation, suspend_old)
+
+    def _switch(self, source_id: str, generation: int, suspend_old: bool = True) -> bool:
+        # 启动(或恢复)新源
+        if not self.warm_source(source_id):
+            return False
         new_source = self._sources[source_id]
-        new_source.start()
+        if source_id == self._active_source_id:
+            return True
+        # 没有旧源可以继续推流时不需要等待
+        first_frame = self._wait_first_frame(new_source) if self._active_source_id else None
 
+        with self._switch_cond:
+            if generation != self._switch_generation:
+                # 已经有更新的切换请求
+                superseded = True
+            else:
+                superseded = False
+                old_id = self._active_source_id
+                self._active_source_id = source_id
+                self._pending_frame = first_frame
+                # 等推流线程对旧源的capture调用返回后再挂起旧源
+                self._switch_cond.wait_for(lambda: not self._busy.get(old_id), timeout=2.0)
+        if superseded:
+            self._park(source_id)
+            return False
+
+        # 挂起旧源，不再消耗CPU
+        old_source = self._sources.get(old_id)
+        if old_source is not None and suspend_old:
+            old_source.suspend()
+        return True
+
+    def warm_source(self, source_id: str) -> bool:
+        """
+        初始化并启动(或恢复)源，但不切换活动源，让源在切换之前就开始出帧
+
+        Returns:
+            bool: 源是否可用
+        """
+        if not self.ensure_source(source_id):
+            return False
+        source = self._sources[source_id]
+        if source.suspended:
+            source.resume()
+        else:
+            source.start()
         return True
 
-    def list_sources(self) -> List[Dict[str, Any]]:
-        """列出所有可用的图像源"""
-        sources_info = []
-
-        # 列出屏幕源
-        for i in range(3):  # 假设最多3个显示器
-            sources_info.append({
-                'type': SourceType.SCREEN,
-                'id': f'screen_{i}',
-                'name': f'显示器 {i + 1}',
-                'available': True  # 需要实际检测
-            })
-
-        # 列出摄像头
-        try:
-            import cv2
-            for i in range(10):  # 检查前10个摄像头
-                cap = cv2.VideoCapture(i)
-                if cap.isOpened():
-                    sources_info.append({
-                        'type': SourceType.CAMERA,
-                        'id': f'camera_{i}',
-                        'name': f'摄像头 {i}',
-                        'available': True
-                    })
-                    cap.release()
-        except ImportError:
-            pass
-
-        return sources_info
+    def _wait_first_frame(self, source: ImageSourceInterface) -> Optional[np.ndarray]:
+        """等待新源出第一帧，超时返回None"""
+        deadline = time.time() + self.switch_timeout
+        while time.time() < deadline:
+            frame = source.capture()
+            if frame is not None:
+                # 切换后才交给推流，这期间源可能已经覆盖了它的缓冲区
+                return np.array(frame)
+            time.sleep(0.005)
+        print(f"等待图像源{source.source_id}出帧超时，直接切换")
+        return None
+
+    def suspend_inactive(self):
+        """挂起所有非活动源(启动时并行初始化或预热的源在初始化时可能已经开始后台工作)"""
+        for source_id, source in list(self._sources.items()):
+            if source_id != self._active_source_id and not source.suspended:
+                source.suspend()
+
+    def get_suspend_stats(self) -> Dict[str, Dict[str, Any]]:
+        """每个源的挂起统计，用于确认非活动源的开销"""
+        return {source_id: source.get_suspend_stats() for source_id, source in list(self._sources.items())}
+
+    def list_sources(self, wait: float = 0) -> List[Dict[str, Any]]:
+        """
+        列出所有可用的图像源(显示器、摄像头)
+
+        返回后台枚举服务缓存的结果，不会打开设备；第一次调用时启动枚举服务。
+        wait大于0时，如果还没有完成第一次枚举，最多等待wait秒
+        """
+        from capture.devices import device_enumerator
+        device_enumerator.start()
+        return device_enumerator.list(wait)
+
+    def _begin_capture(self, source_id: str = None):
+        """
+        取出要捕获的源并登记为正在捕获
+
+        Returns:
+            (source_id, source, pending_frame)，切换后还没取走的第一帧通过pending_frame返回(此时source为None)
+        """
+        with self._switch_cond:
+            if source_id is None:
+                if self._pending_frame is not None:
+                    frame, self._pending_frame = self._pending_frame, None
+                    return self._active_source_id, None, frame
+                source_id = self._active_source_id
+            source = self._sources.get(source_id)
+            if source is None:
+                return source_id, None, None
+            self._busy[source_id] = self._busy.get(source_id, 0) + 1
+            return source_id, source, None
+
+    def _end_capture(self, source_id: str):
+        with self._switch_cond:
+            self._busy[source_id] -= 1
+            self._switch_cond.notify_all()
+
+    def _present(self, source_id: str, frame: Optional[np.ndarray]) -> Optional[np.ndarray]:
+        """活动源的帧经过过渡效果后交给推流，活动源变化时从上一个源的最后一帧开始过渡"""
+        transition = self.transition
+        if source_id != self._last_frame_source and frame is not None:
+            if transition is not None and self._last_frame is not None:
+                transition.begin(self._last_frame)
+            self._last_frame_source = source_id
+            # 变化区域是相对这个源自己的上一帧的，换源后的第一帧按整帧变化处理
+            frame = np.asarray(frame)
+        if transition is None:
+            return frame
+        if transition.active:
+            frame = transition.update(frame)
+        if frame is not None:
+            # 源返回的可能是下一次capture就会被覆盖的视图，保留过渡起点时复制到自己的缓冲区
+            if self._last_frame is not None and self._last_frame.shape == frame.shape \
+                    and self._last_frame.dtype == frame.dtype:
+                np.copyto(self._last_frame, frame)
+            else:
+                self._last_frame = np.array(frame)
+        return frame
 
     def capture_frame(self, source_id: str = None) -> Optional[np.ndarray]:
-        """从指定源捕获一帧"""
-        source = self.get_source(source_id)
-        if not source:
-            return None
+        """从指定源捕获一帧，不指定时捕获活动源(切换时带过渡效果)"""
+        active = source_id is None
+        source_id, source, frame = self._begin_capture(source_id)
+        if source:
+            health = self.get_health(source_id)
+            try:
+                frame = source.capture()
+                health.record(frame, unchanged=source.take_unchanged())
+            except Exception as e:
+                print(f"图像源{source_id}捕获出错: {e}")
+                health.record_error()
+                frame = None
+            finally:
+                self._end_capture(source_id)
+        return self._present(source_id, frame) if active else frame
 
-        return source.capture()
+    async def capture_frame_async(self, source_id: str = None) -> Optional[np.ndarray]:
+        """在asyncio事件循环中从指定源捕获一帧"""
+        active = source_id is None
+        source_id, source, frame = self._begin_capture(source_id)
+        if source:
+            health = self.get_health(source_id)
+            try:
+                frame = await source.capture_async()
+                health.record(frame, unchanged=source.take_unchanged())
+            except Exception as e:
+                print(f"图像源{source_id}捕获出错: {e}")
+                health.record_error()
+                frame = None
+            finally:
+                self._end_capture(source_id)
+        return self._present(source_id, frame) if active else frame
 
     def cleanup(self):
         """清理所有资源"""
-        for source_id, source in self._sources.items():
+        self._closed.set()
+        for source_id, source in list(self._sources.items()):
             try:
                 source.release()
             except Exception as e:
                 print(f"Error releasing source {source_id}: {e}")
 
         self._sources.clear()
+        self._specs.clear()
+        self._degraded.clear()
+        self._pending_frame = None
+        self._last_frame = None
+        self._last_frame_source = None
         self._active_source_id = None
\ No newline at end of file
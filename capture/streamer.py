@@ -2,7 +2,7 @@ from typing import Dict, Any, Optional, List
 
 import numpy as np
 
-from capture.interface import SourceType
+from capture.registry import resolve_type
 from capture.source_manager import SourceManager
 
 
@@ -10,41 +10,149 @@ class Streamer:
     """推流程序"""
 
     def __init__(self, config: Dict[str, Any] = None):
-        self.source_manager = SourceManager()
         self.config = config or {}
+        self.source_manager = SourceManager(switch_timeout=self.config.get('switch_timeout', 10.0))
         self._initialized = False
+        self._pending_active = None  # 初始化降级、恢复后需要切换过去的活动源
+        self.scheduler = None  # 播放列表
+        self.failover = None  # 故障切换
 
     def initialize(self) -> bool:
-        """初始化推流程序"""
+        """
+        初始化推流程序
+
+        默认只登记配置中的源，启动时只初始化活动源，其它源在第一次切换时初始化；
+        prewarm中列出的源在后台线程中提前初始化。lazy设置为False时恢复为启动时初始化全部源。
+        """
         # 从配置创建图像源
         source_configs = self.config.get('sources', [])
+        lazy = self.config.get('lazy', True)
+        first_source = None
 
         for src_config in source_configs:
-            src_type = SourceType(src_config.get('type', 'screen'))
+            src_type = resolve_type(src_config.get('type', 'screen'))
             src_id = src_config.get('id', '')
 
             # 只初始化设置为True的源
             if src_config.get('enable', True):
-                self.source_manager.create_source(
-                    source_type=src_type,
-                    source_id=src_id,
-                    **src_config.get('params', {})
-                )
-                print(f"成功加载配置源{src_id}")
+                if lazy and src_id:
+                    if self.source_manager.register_source(
+                        source_type=src_type,
+                        source_id=src_id,
+                        process=src_config.get('process'),
+                        **src_config.get('params', {})
+                    ):
+                        print(f"已登记配置源{src_id}")
+                else:
+                    self.source_manager.create_source(
+                        source_type=src_type,
+                        source_id=src_id,
+                        process=src_config.get('process'),
+                        **src_config.get('params', {})
+                    )
+                    print(f"成功加载配置源{src_id}")
+                first_source = first_source or src_id
             else:
                 print(f"没有开启的的配置源:{src_id}")
 
-        # 设置活动源
-        active_source = self.config.get('active_source')
+        # 设置活动源(未指定时使用第一个源)
+        active_source = self.config.get('active_source') or (first_source if lazy else None)
+
+        # 配置了播放列表时，启动时的活动源由播放列表决定
+        if self.config.get('schedule'):
+            from capture.scheduler import SourceScheduler
+            self.scheduler = SourceScheduler.from_config(self, self.config['schedule'])
+            if self.scheduler is not None:
+                active_source = self.scheduler.current_target() or active_source
+
+        # 活动源和startup中的源在线程池中并行初始化，失败或超时的源在后台重试
+        startup = [src_id for src_id in self.config.get('startup', []) if src_id != active_source]
+        if active_source and self.source_manager.is_registered(active_source):
+            startup.insert(0, active_source)
+        if lazy and startup:
+            self.source_manager.on_source_ready = self._on_source_ready
+            report = self.source_manager.initialize_sources(
+                startup,
+                timeout=self.config.get('startup_timeout', 10.0),
+                max_workers=self.config.get('init_workers', 4)
+            )
+            print(f"图像源就绪情况: {report}")
+
         if active_source:
             print(f"正在尝试切换到指定源:{active_source}")
-            switch_ok = self.source_manager.switch_source(active_source)
-            if not switch_ok: raise Exception(f'配置源不存在或者初始化失败，请检查配置文件{active_source}')
-            print(f"成功切换到指定源:{active_source}")
+            if not self.source_manager.is_registered(active_source):
+                raise Exception(f'配置源不存在，请检查配置文件{active_source}')
+            if self.source_manager.get_readiness().get(active_source) == SourceManager.DEGRADED:
+                # 不阻塞推流，恢复后自动切换
+                self._pending_active = active_source
+                print(f"指定源暂不可用，后台重试成功后自动切换:{active_source}")
+            else:
+                switch_ok = self.source_manager.switch_source(active_source)
+                if not switch_ok: raise Exception(f'配置源不存在或者初始化失败，请检查配置文件{active_source}')
+                print(f"成功切换到指定源:{active_source}")
+
+        # 启动时初始化的其它源挂起，直到切换过去
+        self.source_manager.suspend_inactive()
+
+        # 切换源时的过渡效果
+        if self.config.get('transition'):
+            from capture.transition import Transition
+            self.source_manager.transition = Transition.from_config(self.config['transition'])
+
+        # 后台预热
+        prewarm = [src_id for src_id in self.config.get('prewarm', []) if src_id != active_source]
+        if prewarm:
+            self.source_manager.prewarm(prewarm)
+
+        # 后台枚举显示器和摄像头，界面列出图像源时直接读缓存
+        if self.config.get('enumerate_devices', True):
+            from capture.devices import device_enumerator
+            device_enumerator.start()
+
+        if self.scheduler is not None:
+            self.scheduler.start()
+
+        # 活动源失效时切换到备用源
+        if self.config.get('failover'):
+            from capture.failover import FailoverController
+            self.failover = FailoverController.from_config(self, self.config['failover'])
+            if self.failover is not None:
+                self.failover.start()
 
         self._initialized = True
         return True
 
+    def _on_source_ready(self, source_id: str):
+        """降级的源在后台恢复"""
+        if source_id == self._pending_active:
+            self._pending_active = None
+            self.source_manager.switch_source(source_id)
+            print(f"成功切换到指定源:{source_id}")
+
+    def get_suspend_stats(self) -> Dict[str, Dict[str, Any]]:
+        """每个源的挂起统计"""
+        return self.source_manager.get_suspend_stats()
+
+    def get_schedule_stats(self) -> Optional[Dict[str, Any]]:
+        """播放列表统计，未配置时返回None"""
+        return self.scheduler.get_stats() if self.scheduler else None
+
+    def get_health_stats(self) -> Dict[str, Any]:
+        """每个源的健康状况，开启故障切换时附带切换统计"""
+        stats = dict(self.source_manager.get_health_stats())
+        if self.failover is not None:
+            stats['failover'] = self.failover.get_stats()
+        return stats
+
+    def get_transition_stats(self) -> Optional[Dict[str, Any]]:
+        """过渡效果统计，未开启时返回None"""
+        transition = self.source_manager.transition
+        return transition.get_stats() if transition else None
+
+    def get_readiness(self) -> Dict[str, str]:
+        """所有源的就绪情况"""
+        return self.source_manager.get_readiness()
+
     def get_frame(self) -> Optional[np.ndarray]:
         """
         获取帧的接口，供推流程序调用
@@ -56,13 +164,21 @@ class Streamer:
 
         return self.source_manager.capture_frame()
 
-    def switch_source(self, source_id: str) -> bool:
-        """切换图像源"""
-        return self.source_manager.switch_source(source_id)
+    async def get_frame_async(self) -> Optional[np.ndarray]:
+        """get_frame的asyncio版本，供AsyncSender调用"""
+        if not self._initialized:
+            return None
+
+        return await self.source_manager.capture_frame_async()
+
+    def switch_source(self, source_id: str, wait: bool = True) -> bool:
+        """切换图像源，wait=False时在后台预热新源，出帧后自动切换"""
+        self._pending_active = None
+        return self.source_manager.switch_source(source_id, wait)
 
-    def list_available_sources(self) -> List[Dict[str, Any]]:
-        """列出可用图像源"""
-        return self.source_manager.list_sources()
+    def list_available_sources(self, wait: float = 0) -> List[Dict[str, Any]]:
+        """列出可用图像源(缓存结果，立即返回)"""
+        return self.source_manager.list_sources(wait)
 
     def get_source_info(self, source_id: str = None) -> Dict[str, Any]:
         """获取当前源信息"""
@@ -80,6 +196,10 @@ class Streamer:
 
     def close(self):
         """关闭推流程序"""
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.failover is not None:
+            self.failover.stop()
         self.source_manager.cleanup()
         self._initialized = False
 
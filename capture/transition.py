@@ -0,0 +1,142 @@
+import time
+from typing import Optional, Tuple, Dict, Any
+
+import cv2
+import numpy as np
+
+
+class Transition:
+    """
+    切换图像源时的过渡效果
+
+    直接硬切时设备上会短暂出现上半部分新画面、下半部分旧画面，看起来像撕裂。
+    过渡在输出分辨率下进行：旧源最后一帧和新源的帧缩放到预先分配的缓冲区，
+    每一步的混合系数(或分界列)在创建时算好，混合使用8位定点整数运算，不产生临时数组。
+
+    支持的效果：
+        crossfade: 淡入淡出
+        wipe: 新画面从左向右擦除旧画面
+        slide: 新画面从右侧推入，旧画面向左移出
+    """
+
+    KINDS = ('crossfade', 'wipe', 'slide')
+
+    def __init__(self, kind: str = 'crossfade', frames: int = 15,
+                 size: Tuple[int, int] = (240, 240), frame_interval: float = 1 / 30):
+        """
+        Args:
+            kind: 过渡效果
+            frames: 过渡持续的帧数
+            size: 输出分辨率(宽, 高)，一般与屏幕分辨率相同
+            frame_interval: 新源没有新帧时，用它的上一帧继续推进过渡的间隔(秒)
+        """
+        if kind not in self.KINDS:
+            raise ValueError(f"Unsupported transition: {kind}")
+        self.kind = kind
+        self.frames = max(1, int(frames))
+        self.width, self.height = size
+        self.frame_interval = frame_interval
+
+        shape = (self.height, self.width, 3)
+        self._from = np.zeros(shape, np.uint8)
+        self._to = np.zeros(shape, np.uint8)
+        # 输出双缓冲，发送端还在使用上一帧时不会被覆盖
+        self._out = [np.zeros(shape, np.uint8), np.zeros(shape, np.uint8)]
+        self._out_index = 0
+        if kind == 'crossfade':
+            self._acc = np.zeros(shape, np.uint16)
+            self._tmp = np.zeros(shape, np.uint16)
+            # 第i步新画面的权重，满值256
+            self._steps = [np.uint16(256 * (i + 1) // self.frames) for i in range(self.frames)]
+        else:
+            # 第i步新画面占据的列数
+            self._steps = [self.width * (i + 1) // self.frames for i in range(self.frames)]
+
+        self._step = 0
+        self._has_to = False
+        self._last_step_time = 0.0
+        self.active = False
+        self.stats = {
+            'transitions': 0,
+            'frames': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional['Transition']:
+        """从config_stream.yaml的streamer.transition部分创建，未配置或type为cut时返回None"""
+        if not config:
+            return None
+        kind = config.get('type', 'crossfade')
+        if kind == 'cut':
+            return None
+        size = config.get('size', [240, 240])
+        return cls(
+            kind=kind,
+            frames=config.get('frames', 15),
+            size=(size[0], size[1]),
+            frame_interval=config.get('frame_interval', 1 / 30),
+        )
+
+    def _fit(self, frame: np.ndarray, dst: np.ndarray):
+        """把任意大小的帧缩放到输出分辨率，写入dst"""
+        if frame.shape[:2] == dst.shape[:2]:
+            np.copyto(dst, frame[:, :, :3])
+        elif frame.ndim == 3 and frame.shape[2] == 3:
+            cv2.resize(frame, (self.width, self.height), dst=dst)
+        else:
+            cv2.resize(frame[:, :, :3], (self.width, self.height), dst=dst)
+
+    def begin(self, last_frame: np.ndarray):
+        """从旧源的最后一帧开始过渡"""
+        self._fit(last_frame, self._from)
+        self._step = 0
+        self._has_to = False
+        self.active = True
+        self.stats['transitions'] += 1
+
+    def cancel(self):
+        self.active = False
+
+    def update(self, frame: Optional[np.ndarray], now: float = None) -> Optional[np.ndarray]:
+        """
+        输入新源的返回值，返回过渡中的一帧
+
+        新源没有新帧时，每隔frame_interval用它的上一帧推进一步，否则返回None
+        """
+        if now is None:
+            now = time.monotonic()
+        if frame is not None:
+            self._fit(frame, self._to)
+            self._has_to = True
+        elif not self._has_to or now - self._last_step_time < self.frame_interval:
+            return None
+        self._last_step_time = now
+
+        out = self._out[self._out_index]
+        self._out_index ^= 1
+        step = self._steps[self._step]
+        if self.kind == 'crossfade':
+            # out = (旧 * (256 - a) + 新 * a + 128) >> 8
+            np.multiply(self._from, np.uint16(256) - step, out=self._acc)
+            np.multiply(self._to, step, out=self._tmp)
+            np.add(self._acc, self._tmp, out=self._acc)
+            np.add(self._acc, np.uint16(128), out=self._acc)
+            np.right_shift(self._acc, 8, out=self._acc)
+            np.copyto(out, self._acc, casting='unsafe')
+        elif self.kind == 'wipe':
+            out[:, :step] = self._to[:, :step]
+            out[:, step:] = self._from[:, step:]
+        else:
+            out[:, :self.width - step] = self._from[:, step:]
+            out[:, self.width - step:] = self._to[:, :step]
+
+        self._step += 1
+        self.stats['frames'] += 1
+        if self._step >= self.frames:
+            self.active = False
+        return out
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['type'] = self.kind
+        return stats
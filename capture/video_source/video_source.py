@@ -23,6 +23,7 @@ class VideoFileSource(ImageSourceInterface):
         self._cap: Optional[cv2.VideoCapture] = None
         self._last_frame_time: float = 0.0
         self._frame_interval: float = 1.0 / self._fps
+        self._suspended_position: Optional[float] = None  # 挂起时的播放位置(帧号)
 
     def initialize(self, **kwargs) -> bool:
         self.video_path = kwargs.get('video_path', '')
@@ -134,6 +135,21 @@ class VideoFileSource(ImageSourceInterface):
             frame = self.resize_crop_square(frame, 240)
         return frame
 
+    def suspend(self):
+        """挂起：记住播放位置并关闭视频，释放解码器占用的内存"""
+        super().suspend()
+        if self._cap:
+            self._suspended_position = self._cap.get(cv2.CAP_PROP_POS_FRAMES)
+            self._cap.release()
+            self._cap = None
+
+    def resume(self):
+        """重新打开视频并跳回挂起时的位置"""
+        if self._cap is None and self._open_current_video() and self._suspended_position:
+            self._cap.set(cv2.CAP_PROP_POS_FRAMES, self._suspended_position)
+        self._suspended_position = None
+        super().resume()
+
     def get_info(self) -> Dict[str, Any]:
         info = {
             'video_path': self.video_path,
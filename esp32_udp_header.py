@@ -13,6 +13,15 @@ class ESP32UDPHeader(object):
     # 包头的色彩模式。
     COLOR_RGB565 = 0
     COLOR_RGB332 = 1
+    # 前向纠错(FEC)校验包，ESP32不认识这个色彩模式，应直接丢弃
+    COLOR_PARITY = 3
+
+    HEADER_SIZE = 5
+
+    # 接收端 -> 发送端 的丢包重传请求(NACK)
+    # 格式: 魔数(1字节) + frame_id(uint16) + 数量(uint8) + 数量 * y_start(uint16)
+    NACK_MAGIC = 0xA5
+    NACK_MAX_BANDS = 255
 
     @staticmethod
     def make_flags(resolution, color_mode, line_count):
@@ -37,6 +46,36 @@ class ESP32UDPHeader(object):
                            frame_id,
                            y_start,
                            flags)
+
+    @staticmethod
+    def parse_header(data):
+        """解析包头，返回 (frame_id, y_start, resolution, color_mode, line_count)"""
+        frame_id, y_start, flags = struct.unpack_from(">HHB", data)
+        return (frame_id, y_start,
+                (flags >> 6) & 0b11,
+                (flags >> 4) & 0b11,
+                flags & 0b1111)
+
+    @staticmethod
+    def make_nack(frame_id, y_starts):
+        """构造NACK包，请求发送端重传frame_id中丢失的行(以y_start标识)"""
+        y_starts = list(y_starts)[:ESP32UDPHeader.NACK_MAX_BANDS]
+        return struct.pack(">BHB%dH" % len(y_starts),
+                           ESP32UDPHeader.NACK_MAGIC,
+                           frame_id,
+                           len(y_starts),
+                           *y_starts)
+
+    @staticmethod
+    def parse_nack(data):
+        """解析NACK包，返回 (frame_id, [y_start, ...])，不是合法NACK时返回None"""
+        if len(data) < 4 or data[0] != ESP32UDPHeader.NACK_MAGIC:
+            return None
+        frame_id, count = struct.unpack_from(">HB", data, 1)
+        if len(data) < 4 + count * 2:
+            return None
+        return frame_id, list(struct.unpack_from(">%dH" % count, data, 4))
+
     # ESP32如何解析？
 
 """
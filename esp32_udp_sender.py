@@ -8,7 +8,6 @@ import socket
 import time
 
 from capture.config import get_streamer
-cap = get_streamer()
 
 # ------------------------------
 # 配置参数
@@ -47,11 +46,6 @@ else:
     WIDTH = 240
 HEIGHT = WIDTH
 
-# ------------------------------
-# 初始化 UDP
-# ------------------------------
-sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
 def bgr_to_rgb332_cv2_style(bgr_image):
     """类似OpenCV风格的RGB332转换"""
     b, g, r = cv2.split(bgr_image)
@@ -62,27 +56,37 @@ def bgr_to_rgb332_cv2_style(bgr_image):
 
 # 主循环
 # ------------------------------
-frame_id = 0
-while True:
-    # 控制帧率
-    frame_id = (frame_id + 1) & 0xFFFF
-    sc = cap.get_frame()
-    # sc = cap.capture_region(641,377,600,600)
-    # sc = cap.capture_fullscreen()
-    sc = cv2.resize(sc, (WIDTH, HEIGHT))
-    # cv2.imshow('screenshot',sc)
-    # cv2.waitKey(1)
-    if option['color_mode'] == ESP32UDPHeader.COLOR_RGB332:
-        rgb = bgr_to_rgb332_cv2_style(sc)
-    else:
-        rgb = cv2.cvtColor(sc, cv2.COLOR_BGR2BGR565)
+def main():
+    # 推流程序和socket在这里创建：图像源进程以spawn方式启动时会重新导入本模块
+    cap = get_streamer()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    frame_id = 0
+    while True:
+        # 控制帧率
+        frame_id = (frame_id + 1) & 0xFFFF
+        sc = cap.get_frame()
+        # sc = cap.capture_region(641,377,600,600)
+        # sc = cap.capture_fullscreen()
+        sc = cv2.resize(sc, (WIDTH, HEIGHT))
+        # cv2.imshow('screenshot',sc)
+        # cv2.waitKey(1)
+        if option['color_mode'] == ESP32UDPHeader.COLOR_RGB332:
+            rgb = bgr_to_rgb332_cv2_style(sc)
+        else:
+            rgb = cv2.cvtColor(sc, cv2.COLOR_BGR2BGR565)
+
+        for y in range(0, HEIGHT, LINES_PER_PACKET):
+            start_time = time.time()
+            lines = min(LINES_PER_PACKET, HEIGHT - y)
+            payload = rgb[y:y + lines, :].flatten().tobytes()
+            header = ESP32UDPHeader.make_header(frame_id=frame_id, y_start=y,resolution=option['resolution'],
+                                                color_mode=option['color_mode'], line_count=lines)
+            sock.sendto(header + payload, (ESP32_IP, ESP32_PORT))
+            cost = time.time() - start_time
+            time.sleep(option['udp_interval'])
+
 
-    for y in range(0, HEIGHT, LINES_PER_PACKET):
-        start_time = time.time()
-        lines = min(LINES_PER_PACKET, HEIGHT - y)
-        payload = rgb[y:y + lines, :].flatten().tobytes()
-        header = ESP32UDPHeader.make_header(frame_id=frame_id, y_start=y,resolution=option['resolution'],
-                                            color_mode=option['color_mode'], line_count=lines)
-        sock.sendto(header + payload, (ESP32_IP, ESP32_PORT))
-        cost = time.time() - start_time
-        time.sleep(option['udp_interval'])
+if __name__ == "__main__":
+    import multiprocessing
+    multiprocessing.freeze_support()
+    main()
@@ -14,18 +14,24 @@ try:
     import cv2
     import numpy as np
     import socket
-    from  capture.config import get_streamer
-    streamer = get_streamer()
-
-    # 初始化
-    if streamer is None:
-        print("Failed to initialize streamer")
+    from  capture.config import get_streamer, get_sender_config
+    from sender.packetizer import bgr_to_rgb332
+    from sender.factory import create_sender
+    from sender.realtime import RealtimeSendThread
+    from sender.async_sender import AsyncSender
+    from sender.idle import IdleController
+    from sender.capture_pacer import CapturePacer
+    import asyncio
     UDP_MODULES_AVAILABLE = True
 except ImportError as e:
     UDP_MODULES_AVAILABLE = False
     print(f"警告: 图像源加载配置失败: {e}")
     print("推流功能将不可用")
 
+# 推流程序在main()中创建：图像源进程以spawn方式启动时会重新导入本模块，
+# 在模块级别创建会让每个子进程都再初始化一遍全部图像源
+streamer = None
+
 
 class YAMLConfigEditor:
     def __init__(self, root):
@@ -578,22 +584,11 @@ class YAMLConfigEditor:
 
     def bgr_to_rgb332_cv2_style(self, bgr_image):
         """类似OpenCV风格的RGB332转换"""
-        b, g, r = cv2.split(bgr_image)
-        r_332 = (r >> 5) & 0x07
-        g_332 = (g >> 5) & 0x07
-        b_332 = (b >> 6) & 0x03
-        return (r_332 << 5) | (g_332 << 2) | b_332
+        return bgr_to_rgb332(bgr_image)
 
     def stream_udp_data(self, server_ip, server_port, width, color_mode_str, lines_per_packet, udp_interval):
         """UDP推流线程函数"""
         try:
-            # 初始化UDP socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            self.sock = sock
-
-            # 初始化屏幕捕获
-            # cap = ScreenCaptureCV()
-
             # 设置分辨率
             height = width
 
@@ -608,80 +603,79 @@ class YAMLConfigEditor:
                 self.log_message(f"警告: 每包行数{lines_per_packet}超出Header限制(8)，将使用8")
                 lines_per_packet = 8
 
+            # 发送线程绑核、提高调度优先级(config_stream.yaml中sender.realtime)
+            sender_config = get_sender_config()
+            realtime = RealtimeSendThread.from_config(sender_config.get('realtime'))
+            if realtime is not None:
+                self.log_message(f"发送线程实时设置: {realtime.apply()}")
+
+            # 初始化UDP发送端（config_stream.yaml中配置了devices时同时推流到多个设备）
+            sender = create_sender(
+                sender_config,
+                server_ip=server_ip,
+                server_port=server_port,
+                resolution=width,
+                color_mode=color_mode_code,
+                lines_per_packet=lines_per_packet,
+                udp_interval=udp_interval
+            )
+            self.sock = getattr(sender, 'sock', None)
+
             self.log_message(f"开始推流: 分辨率={width}x{height}, 颜色模式={color_mode_str}")
             self.log_message(
                 f"Header参数: 分辨率代码={resolution_code}, 颜色代码={color_mode_code}, 每包行数={lines_per_packet}")
-
-            frame_id = 0  # 这个暂时没什么用
-            last_frame = None
-            last_frame_time = time.time()
-            while self.streaming:
-                frame_id = (frame_id + 1) & 0xFFFF
-                try:
-                    # 捕获屏幕
-                    # sc = cap.capture_window_by_title("原神", mss_mode=False)
-                    sc = streamer.get_frame()  # 调用这个接口,不关心流来自于哪里，只需要返回一张任意大小的图片
-                    # 如果是空白图片，5秒内返回上一张图片
-                    if sc is None:
-                        if time.time() - last_frame_time> 5:
-                            time.sleep(0.1)  # 超过5秒没数据，休息
+            if sender_config.get('backend') == 'asyncio':
+                # 由asyncio事件循环驱动发送
+                sender = AsyncSender(sender)
+            self.log_message(f"发送端: {sender.describe()}")
+
+            # 没有新帧时不全速重发上一帧，只做低频保活重发(config_stream.yaml中sender.idle)
+            idle = IdleController.from_config(sender_config.get('idle'))
+            # 按发送时隙即时采集(config_stream.yaml中sender.capture)
+            pacer = CapturePacer.from_config(sender_config.get('capture'))
+            # 采集线程不继承发送线程的绑核和实时调度
+            worker_init = realtime.reset_current_thread if realtime is not None else None
+            if isinstance(sender, AsyncSender):
+                if pacer is not None:
+                    self.log_message("asyncio发送端不支持sender.capture，忽略")
+                    pacer = None
+                asyncio.run(sender.stream(streamer, lambda: self.streaming, idle, worker_init))
+            elif pacer is not None:
+                self.log_message(f"即时采集: {pacer.mode}模式")
+                pacer.stream(streamer, sender, lambda: self.streaming, idle, worker_init)
+            else:
+                while self.streaming:
+                    try:
+                        # 捕获屏幕
+                        sc = streamer.get_frame()  # 调用这个接口,不关心流来自于哪里，只需要返回一张任意大小的图片
+                        sc = idle.update(sc)
+                        if sc is None:
+                            sender.service_nacks()
+                            time.sleep(idle.poll_delay())
                             continue
-                        if last_frame is None: continue
-                        else: sc = last_frame
-                    else:
-                        last_frame_time = time.time()
-                        last_frame = sc
-
-                    # 调整大小
-                    sc = cv2.resize(sc, (width, height))
-
-                    # 转换颜色模式
-                    if color_mode_code == ESP32UDPHeader.COLOR_RGB332:  # 1
-                        # RGB332转换
-                        rgb = self.bgr_to_rgb332_cv2_style(sc)
-                    else:  # ESP32UDPHeader.COLOR_RGB565 = 0
-                        # RGB565转换
-                        rgb = cv2.cvtColor(sc, cv2.COLOR_BGR2BGR565)
-
-                    # 发送数据
-                    for y in range(0, height, lines_per_packet):
-                        start_time = time.time()
-                        lines = min(lines_per_packet, height - y)
-
-                        # 准备payload
-                        if color_mode_code == ESP32UDPHeader.COLOR_RGB332:
-                            # RGB332每个像素1字节
-                            payload = rgb[y:y + lines, :].astype(np.uint8).flatten().tobytes()
-                        else:
-                            # RGB565每个像素2字节
-                            payload = rgb[y:y + lines, :].flatten().tobytes()
-
-                        # 创建Header
-                        header = ESP32UDPHeader.make_header(
-                            frame_id=frame_id,
-                            y_start=y,
-                            resolution=resolution_code,
-                            color_mode=color_mode_code,
-                            line_count=lines
-                        )
-
-                        # 发送数据包
-                        sock.sendto(header + payload, (server_ip, server_port))
-
-                        # 控制发送频率
-                        time.sleep(udp_interval)
-
-                        # 检查是否应该停止
-                        if not self.streaming:
-                            break
-
-                except Exception as e:
-                    self.log_message(f"推流错误: {str(e)}")
-                    time.sleep(1)  # 出错后等待1秒
+
+                        # 缩放、转换颜色并按行发送
+                        sender.send_frame(sc, should_continue=lambda: self.streaming)
+
+                    except Exception as e:
+                        self.log_message(f"推流错误: {str(e)}")
+                        time.sleep(1)  # 出错后等待1秒
 
             # 关闭socket
-            sock.close()
+            self.log_message(f"发送统计: {sender.get_stats()}")
+            self.log_message(f"空闲统计: {idle.get_stats()}")
+            if pacer is not None:
+                self.log_message(f"采集时机统计: {pacer.get_stats()}")
+            self.log_message(f"图像源挂起统计: {streamer.get_suspend_stats()}")
+            self.log_message(f"图像源健康统计: {streamer.get_health_stats()}")
+            if streamer.get_schedule_stats():
+                self.log_message(f"播放列表统计: {streamer.get_schedule_stats()}")
+            if streamer.get_transition_stats():
+                self.log_message(f"过渡效果统计: {streamer.get_transition_stats()}")
+            sender.close()
             self.sock = None
+            if realtime is not None:
+                realtime.release()
 
         except Exception as e:
             self.log_message(f"推流线程错误: {str(e)}")
@@ -701,6 +695,16 @@ class YAMLConfigEditor:
 
 
 def main():
+    global streamer
+    if sys.platform.startswith('linux'):
+        # XInitThreads必须在Tk和截图源打开X display之前调用
+        from capture.screen_source.screenshot_linux import init_x11_threads
+        init_x11_threads()
+    if UDP_MODULES_AVAILABLE:
+        streamer = get_streamer()
+        # 初始化
+        if streamer is None:
+            print("Failed to initialize streamer")
     root = tk.Tk()
     app = YAMLConfigEditor(root)
 
@@ -712,6 +716,9 @@ def main():
 
 
 if __name__ == "__main__":
+    import multiprocessing
+    # 打包成exe后子进程也从这里启动，必须最先调用
+    multiprocessing.freeze_support()
     # 检查依赖
     try:
         import yaml
@@ -0,0 +1,141 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any, List
+
+import numpy as np
+
+from sender.idle import IdleController
+from sender.udp_sender import ESP32UDPSender
+
+
+class NackProtocol(asyncio.DatagramProtocol):
+    """把设备发回的NACK交给对应的发送端"""
+
+    def __init__(self, sender: ESP32UDPSender):
+        self.sender = sender
+
+    def datagram_received(self, data: bytes, addr):
+        self.sender.handle_nack(data)
+
+    def error_received(self, exc: Exception):
+        # 对端端口不可达(ICMP)等错误不影响后续发送
+        pass
+
+
+class AsyncSender:
+    """
+    asyncio推流后端
+
+    包装create_sender创建的任意发送端(单设备、多设备、组播、拼接屏)，每个设备的socket交给
+    DatagramProtocol管理，NACK由事件循环回调处理。每个包用loop.call_at排在一条截止时间线上，
+    一个事件循环即可驱动多个设备和其它协程(如控制接口)，不需要额外的发送线程。
+
+    注意：事件循环的定时精度受selector超时精度限制(epoll为1ms)，udp_interval远小于1ms时
+    实际间隔会变大，这种情况下线程版本的send_frame(可配合spin_us)更精确。
+    """
+
+    def __init__(self, sender):
+        self.sender = sender
+        self.senders: List[ESP32UDPSender] = sender.senders
+        self._opened = False
+
+    async def open(self):
+        """把每个设备的socket接入事件循环"""
+        if self._opened:
+            return
+        loop = asyncio.get_running_loop()
+        for sender in self.senders:
+            transport, _ = await loop.create_datagram_endpoint(
+                lambda sender=sender: NackProtocol(sender), sock=sender.sock)
+            sender.transport = transport
+        self._opened = True
+
+    async def send_frame(self, image: np.ndarray, should_continue: Callable[[], bool] = None) -> bool:
+        """
+        发送一帧，所有设备的包交错排在同一条时间线上
+
+        Returns:
+            bool: 是否全部发送完毕
+        """
+        await self.open()
+        loop = asyncio.get_running_loop()
+        streams = self.sender.frame_streams(image)
+        done = loop.create_future()
+        pending = [len(streams)]
+
+        def finish(result: bool):
+            if not done.done():
+                done.set_result(result)
+
+        def emit(i: int, due: float):
+            if done.done():
+                return
+            if should_continue is not None and not should_continue():
+                finish(False)
+                return
+            packet = next(streams[i], None)
+            if packet is None:
+                pending[0] -= 1
+                if pending[0] == 0:
+                    finish(True)
+                return
+            sender = self.senders[i]
+            sender.send_packet(packet)
+            now = loop.time()
+            sender.pacing.record(now - due)
+            # 睡过头时从当前时间重新排期，避免为了追赶进度而突发
+            next_due = max(due, now) + sender.udp_interval
+            loop.call_at(next_due, emit, i, next_due)
+
+        start = loop.time()
+        count = len(streams)
+        for i, sender in enumerate(self.senders):
+            due = start + sender.udp_interval * i / count
+            loop.call_at(due, emit, i, due)
+        return await done
+
+    async def stream(self, streamer, should_continue: Callable[[], bool], idle: IdleController = None,
+                     worker_init: Callable[[], None] = None):
+        """
+        推流主循环：等待图像源的新帧并发送
+
+        Args:
+            streamer: 提供get_frame_async的推流程序
+            should_continue: 返回False时退出
+            idle: 没有新帧时的保活策略，默认使用IdleController()
+            worker_init: 执行capture的线程池线程开始时调用，
+                例如RealtimeSendThread.reset_current_thread，去掉从发送线程继承的绑核和实时调度
+        """
+        idle = idle or IdleController()
+        if worker_init is not None:
+            # asyncio.run()结束时会关闭默认线程池
+            asyncio.get_running_loop().set_default_executor(
+                ThreadPoolExecutor(thread_name_prefix="capture", initializer=worker_init))
+        await self.open()
+        try:
+            while should_continue():
+                frame = idle.update(await streamer.get_frame_async())
+                if frame is None:
+                    await asyncio.sleep(idle.poll_delay())
+                    continue
+                await self.send_frame(frame, should_continue)
+        finally:
+            self.detach()
+
+    def detach(self):
+        """在事件循环结束前关闭所有transport(socket随之关闭)"""
+        for sender in self.senders:
+            if sender.transport is not None:
+                sender.transport.close()
+                sender.transport = None
+        self._opened = False
+
+    def get_stats(self) -> Dict[str, Any]:
+        return self.sender.get_stats()
+
+    def describe(self) -> str:
+        return f"asyncio: {self.sender.describe()}"
+
+    def close(self):
+        self.detach()
+        self.sender.close()
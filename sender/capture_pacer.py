@@ -0,0 +1,227 @@
+import queue
+import threading
+import time
+from collections import deque
+from typing import Optional, Callable, Dict, Any
+
+from sender.fanout import interleave_send
+from sender.idle import IdleController
+from sender.realtime import JitterMeter, wait_until
+
+
+class CapturePacer:
+    """
+    即时采集调度
+
+    预测下一帧开始发送的时刻(发送时隙)，把采集和编码(缩放+颜色转换)安排在时隙之前刚好完成，
+    设备上显示的是开始发送前一刻的画面，而不是图像源早些时候准备好的画面。
+    采集编码的耗时取最近history帧的percentile分位数再加margin，时隙之间至少间隔1/fps秒。
+
+    latency模式：发送线程依次完成采集、编码、发送，采集不会和发包抢CPU，画面最新；
+        帧率为 1 / (采集编码 + 发送) 与fps中较小的一个。
+    throughput模式：采集和编码在后台线程中与上一帧发送的末尾重叠，上一帧发完立即发送下一帧，
+        帧率为 1 / max(采集编码, 发送) 与fps中较小的一个；预测不准时画面会稍旧，发包间隔的抖动也会稍大。
+
+    两种模式都统计采集开始到这一帧开始发送(age)和发送完毕(age_sent)的时间。
+    """
+
+    LATENCY = 'latency'
+    THROUGHPUT = 'throughput'
+
+    def __init__(self, mode: str = LATENCY, fps: float = 0, margin_ms: float = 1.0,
+                 percentile: float = 90, history: int = 32, retry_interval: float = 0.001):
+        """
+        Args:
+            mode: 'latency'或'throughput'
+            fps: 最高发送帧率，0表示不限制(上一帧发完就是下一个时隙)
+            margin_ms: 预计的采集编码耗时之外多留的时间(毫秒)
+            percentile: 用最近耗时的哪个分位数作为预计耗时
+            history: 预计耗时参考最近多少帧
+            retry_interval: 图像源在计划时刻还没有新帧时，多久后再问一次
+        """
+        if mode not in (self.LATENCY, self.THROUGHPUT):
+            raise ValueError(f"Unknown capture mode: {mode}")
+        self.mode = mode
+        self.frame_interval = 1.0 / fps if fps else 0.0
+        self.margin = margin_ms / 1000
+        self.percentile = percentile
+        self.retry_interval = retry_interval
+
+        self._prep_times = deque(maxlen=history)  # 采集+编码耗时
+        self._send_times = deque(maxlen=history)  # 一帧的发送耗时
+        self._last_slot = 0.0
+        self.age = JitterMeter()
+        self.age_sent = JitterMeter()
+        self.slack = JitterMeter()  # 编码完成到时隙开始的余量，负数表示赶不上时隙
+        self.stats = {
+            'frames': 0,
+            'late': 0,
+            'retries': 0,
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional['CapturePacer']:
+        """从config_stream.yaml的sender.capture部分创建，未配置时返回None"""
+        if not config:
+            return None
+        return cls(
+            mode=config.get('mode', cls.LATENCY),
+            fps=config.get('fps', 0),
+            margin_ms=config.get('margin_ms', 1.0),
+            percentile=config.get('percentile', 90),
+            history=config.get('history', 32),
+        )
+
+    @staticmethod
+    def _quantile(samples: deque, percentile: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+    def predicted_prep(self) -> float:
+        """预计的采集+编码耗时(含margin)"""
+        return self._quantile(self._prep_times, self.percentile) + self.margin
+
+    def predicted_send(self) -> float:
+        """预计的一帧发送耗时"""
+        return self._quantile(self._send_times, 50)
+
+    def next_slot(self, now: float) -> float:
+        """下一个发送时隙：距离上一个时隙至少frame_interval，并且留够采集编码的时间"""
+        slot = self._last_slot + self.frame_interval
+        if self.mode == self.THROUGHPUT:
+            # 上一帧发完之前不能开始发送下一帧
+            slot = max(slot, self._last_slot + self.predicted_send())
+        return max(slot, now + self.predicted_prep())
+
+    def _prepare(self, streamer, sender, idle: IdleController, slot: float, should_continue: Callable[[], bool]):
+        """
+        在slot之前采集并编码一帧
+
+        Returns:
+            (采集开始时刻, 包迭代器列表)；图像源一直没有新帧并且也不需要重发时返回None
+        """
+        wait_until(slot - self.predicted_prep())
+        while True:
+            start = time.perf_counter()
+            frame = idle.update(streamer.get_frame())
+            if frame is not None:
+                break
+            # 计划时刻图像源还没有新帧(图像源的帧率节流、画面没有变化)，时隙之前再问几次
+            if start + self.retry_interval >= slot or not should_continue():
+                return None
+            self.stats['retries'] += 1
+            time.sleep(self.retry_interval)
+        streams = sender.frame_streams(frame)
+        done = time.perf_counter()
+        self._prep_times.append(done - start)
+        self.slack.record(slot - done)
+        if done > slot:
+            self.stats['late'] += 1
+        return start, streams
+
+    def _send(self, sender, slot: float, captured: float, streams, should_continue: Callable[[], bool],
+              on_start: Callable[[], None] = None) -> bool:
+        wait_until(slot)
+        start = time.perf_counter()
+        # 按实际开始发送的时刻安排下一个时隙
+        self._last_slot = start
+        if on_start is not None:
+            on_start()
+        self.age.record(start - captured)
+        finished = interleave_send(sender.senders, streams, should_continue)
+        end = time.perf_counter()
+        self.age_sent.record(end - captured)
+        if finished:
+            self._send_times.append(end - start)
+        self.stats['frames'] += 1
+        return finished
+
+    def stream(self, streamer, sender, should_continue: Callable[[], bool], idle: IdleController = None,
+               worker_init: Callable[[], None] = None):
+        """
+        推流主循环
+
+        Args:
+            streamer: 提供get_frame的推流程序
+            sender: create_sender创建的发送端(单设备、多设备、组播、拼接屏)
+            should_continue: 返回False时退出
+            idle: 没有新帧时的保活策略，默认使用IdleController()
+            worker_init: throughput模式下在后台采集线程开始时调用，
+                例如RealtimeSendThread.reset_current_thread，去掉从发送线程继承的绑核和实时调度
+        """
+        idle = idle or IdleController()
+        if self.mode == self.THROUGHPUT:
+            self._stream_overlapped(streamer, sender, should_continue, idle, worker_init)
+            return
+        while should_continue():
+            try:
+                slot = self.next_slot(time.perf_counter())
+                prepared = self._prepare(streamer, sender, idle, slot, should_continue)
+                if prepared is None:
+                    sender.service_nacks()
+                    time.sleep(idle.poll_delay())
+                    continue
+                self._send(sender, slot, prepared[0], prepared[1], should_continue)
+            except Exception as e:
+                print(f"推流错误: {e}")
+                time.sleep(1)
+
+    def _stream_overlapped(self, streamer, sender, should_continue: Callable[[], bool], idle: IdleController,
+                           worker_init: Callable[[], None] = None):
+        """throughput模式：后台线程按时隙采集编码，发送线程只负责发送"""
+        prepared = queue.Queue(maxsize=1)
+        taken = threading.Event()  # 发送线程已经开始发送上一次准备好的帧
+        stop = threading.Event()
+
+        def running() -> bool:
+            return should_continue() and not stop.is_set()
+
+        def produce():
+            if worker_init is not None:
+                worker_init()
+            while running():
+                try:
+                    slot = self.next_slot(time.perf_counter())
+                    item = self._prepare(streamer, sender, idle, slot, running)
+                    if item is None:
+                        time.sleep(idle.poll_delay())
+                        continue
+                    taken.clear()
+                    prepared.put((slot,) + item)
+                    # 这一帧开始发送后才能按它的发送时刻安排下一帧，否则会提前一整帧采集
+                    while running() and not taken.wait(0.1):
+                        pass
+                except Exception as e:
+                    print(f"采集错误: {e}")
+                    time.sleep(1)
+
+        worker = threading.Thread(target=produce, daemon=True, name="capture-pacer")
+        worker.start()
+        try:
+            while should_continue():
+                try:
+                    slot, captured, streams = prepared.get(timeout=idle.poll_delay())
+                except queue.Empty:
+                    # NACK只在发送线程中处理，避免和发送中的帧同时修改重传队列
+                    sender.service_nacks()
+                    continue
+                try:
+                    self._send(sender, slot, captured, streams, should_continue, taken.set)
+                except Exception as e:
+                    print(f"推流错误: {e}")
+                    time.sleep(1)
+        finally:
+            stop.set()
+            worker.join(timeout=5)
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['mode'] = self.mode
+        stats['predicted_prep_ms'] = round(self.predicted_prep() * 1000, 2)
+        stats['predicted_send_ms'] = round(self.predicted_send() * 1000, 2)
+        stats['age'] = self.age.summary()
+        stats['age_sent'] = self.age_sent.summary()
+        stats['slack'] = self.slack.summary()
+        return stats
@@ -0,0 +1,84 @@
+from typing import Dict, Any
+
+from esp32_udp_header import ESP32UDPHeader
+from sender.fanout import FanoutSender
+from sender.packetizer import COLOR_MODES
+from sender.udp_sender import ESP32UDPSender, is_multicast_address
+from sender.video_wall import VideoWallSender
+
+
+def sender_kwargs(device: Dict[str, Any], defaults: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    把一个设备的配置(缺省项使用defaults)转换为ESP32UDPSender的参数
+
+    resolution可以写成240或[240, 240]，color_mode可以写成'rgb565'/'rgb332'或包头代码
+    """
+    config = dict(defaults)
+    config.update(device)
+
+    resolution = config.get('resolution', 240)
+    if isinstance(resolution, (list, tuple)):
+        resolution = resolution[0]
+
+    color_mode = config.get('color_mode', 'rgb332')
+    if isinstance(color_mode, str):
+        color_mode = COLOR_MODES.get(color_mode, ESP32UDPHeader.COLOR_RGB332)
+
+    return {
+        'server_ip': config['server_ip'],
+        'server_port': int(config.get('server_port', 8888)),
+        'width': int(resolution),
+        'color_mode': color_mode,
+        'lines_per_packet': int(config.get('lines_per_packet', 3)),
+        'udp_interval': float(config.get('udp_interval', 0.0002)),
+        'nack': config.get('nack', False),
+        'nack_history': config.get('nack_history', 8),
+        'fec_group': config.get('fec_group', 0),
+        'broadcast': config.get('broadcast', False),
+        'multicast_ttl': config.get('multicast_ttl', 1),
+        'multicast_interface': config.get('multicast_interface'),
+        'multicast_loop': config.get('multicast_loop', True),
+        'phy_rate_mbps': config.get('phy_rate_mbps'),
+        'spin_us': float(config.get('spin_us', 0)),
+        'dirty_rows': config.get('dirty_rows', False),
+        'refresh_frames': int(config.get('refresh_frames', 30)),
+    }
+
+
+def create_sender(sender_config: Dict[str, Any], **defaults):
+    """
+    根据config_stream.yaml中的sender部分创建发送端
+
+    配置了wall时按行列把画面切开分给拼接屏的每个设备；
+    配置了multicast时向组播地址(或子网广播地址)发送一份数据，所有加入的设备同时显示；
+    配置了devices时创建多设备扇出发送端，每个设备未写的参数使用sender部分和defaults(界面上的配置)；
+    否则只向defaults中的server_ip:server_port发送。
+    """
+    defaults = dict(defaults)
+    defaults.update({k: v for k, v in sender_config.items() if k not in ('devices', 'multicast', 'wall', 'realtime')})
+
+    wall = sender_config.get('wall')
+    if wall:
+        columns, rows = wall.get('layout', [2, 2])
+        if 'resolution' in wall:
+            defaults['resolution'] = wall['resolution']
+        return VideoWallSender([ESP32UDPSender(**sender_kwargs(device, defaults)) for device in wall['devices']],
+                               columns, rows, fit=wall.get('fit', 'stretch'))
+
+    multicast = sender_config.get('multicast')
+    if multicast:
+        group = multicast['group']
+        return ESP32UDPSender(**sender_kwargs({
+            'server_ip': group,
+            'server_port': multicast.get('port', defaults.get('server_port', 8888)),
+            'broadcast': not is_multicast_address(group),
+            'multicast_ttl': multicast.get('ttl', 1),
+            'multicast_interface': multicast.get('interface'),
+            'multicast_loop': multicast.get('loop', True),
+            'phy_rate_mbps': multicast.get('phy_rate_mbps', 6),
+        }, defaults))
+
+    devices = sender_config.get('devices') or []
+    if devices:
+        return FanoutSender([ESP32UDPSender(**sender_kwargs(device, defaults)) for device in devices])
+    return ESP32UDPSender(**sender_kwargs({}, defaults))
@@ -0,0 +1,125 @@
+import heapq
+import time
+from typing import List, Dict, Any, Callable, Tuple
+
+import numpy as np
+
+from sender.packetizer import encode_frame
+from sender.realtime import wait_until
+from sender.udp_sender import ESP32UDPSender
+
+
+class EncodeCache:
+    """
+    编码结果缓存
+
+    同一帧按 (宽, 高, 色彩模式) 缓存缩放+颜色转换的结果，
+    多个设备使用相同的分辨率和色彩模式时每帧只编码一次。
+    """
+
+    def __init__(self):
+        self._image = None
+        self._entries: Dict[Tuple[int, int, int], np.ndarray] = {}
+        self.encodes = 0
+        self.hits = 0
+
+    def set_frame(self, image: np.ndarray):
+        """换到新的一帧，清空上一帧的编码结果"""
+        self._image = image
+        self._entries.clear()
+
+    def get(self, width: int, height: int, color_mode: int) -> np.ndarray:
+        key = (width, height, color_mode)
+        rows = self._entries.get(key)
+        if rows is None:
+            rows = encode_frame(self._image, width, height, color_mode)
+            self._entries[key] = rows
+            self.encodes += 1
+        else:
+            self.hits += 1
+        return rows
+
+
+def interleave_send(senders: List[ESP32UDPSender], streams: List,
+                    should_continue: Callable[[], bool] = None) -> bool:
+    """
+    在一条共同的时间线上交错发送多个设备的包
+
+    每个设备按自己的udp_interval排期，起始时间错开，总是先发送最早到期的包，
+    这样各设备的包均匀地穿插在一起，而不是一个设备发完一整帧再轮到下一个。
+
+    Args:
+        senders: 每个包流对应的发送端
+        streams: frame_transmissions生成的包迭代器，与senders一一对应
+        should_continue: 每发一个包检查一次，返回False时中止
+
+    Returns:
+        bool: 是否全部发送完毕
+    """
+    now = time.perf_counter()
+    count = len(streams)
+    heap = [(now + senders[i].udp_interval * i / count, i) for i in range(count)]
+    heapq.heapify(heap)
+
+    while heap:
+        due, i = heapq.heappop(heap)
+        packet = next(streams[i], None)
+        if packet is None:
+            continue
+        wait_until(due, senders[i].spin)
+        senders[i].send_packet(packet)
+        now = time.perf_counter()
+        senders[i].pacing.record(now - due)
+        # 睡过头时从当前时间重新排期，避免为了追赶进度而突发
+        heapq.heappush(heap, (max(due, now) + senders[i].udp_interval, i))
+
+        if should_continue is not None and not should_continue():
+            return False
+    return True
+
+
+class FanoutSender:
+    """
+    多设备扇出发送
+
+    所有设备共用一次采集，每种 (分辨率, 色彩模式) 每帧只编码一次，
+    每个设备有各自的每包行数、发送间隔、NACK/FEC设置和frame_id。
+    """
+
+    def __init__(self, senders: List[ESP32UDPSender]):
+        self.senders = senders
+        self.cache = EncodeCache()
+
+    def frame_streams(self, image: np.ndarray) -> List:
+        """编码并打包一帧，返回与senders一一对应的包迭代器"""
+        self.cache.set_frame(image)
+        streams = []
+        for sender in self.senders:
+            rows = self.cache.get(sender.width, sender.height, sender.color_mode)
+            frame = sender.packetize_rows(rows)
+            streams.append(sender.frame_transmissions(frame, sender.dirty_bands(image, frame)))
+        return streams
+
+    def send_frame(self, image: np.ndarray, should_continue: Callable[[], bool] = None) -> bool:
+        """把一帧发送给所有设备"""
+        return interleave_send(self.senders, self.frame_streams(image), should_continue)
+
+    def service_nacks(self):
+        for sender in self.senders:
+            sender.service_nacks()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'encodes': self.cache.encodes,
+            'encode_cache_hits': self.cache.hits,
+            'devices': [sender.get_stats() for sender in self.senders],
+        }
+
+    def describe(self) -> str:
+        lines = [f"多设备推流: {len(self.senders)}个设备"]
+        lines += [f"  设备{i + 1}: {sender.describe()}" for i, sender in enumerate(self.senders)]
+        return "\n".join(lines)
+
+    def close(self):
+        for sender in self.senders:
+            sender.close()
@@ -0,0 +1,90 @@
+import struct
+from typing import Optional, Dict
+
+import numpy as np
+
+from esp32_udp_header import ESP32UDPHeader
+from sender.packetizer import PacketizedFrame
+
+# 校验包payload前缀: 本组包数(uint8) + 实际色彩模式(uint8)
+PARITY_PREFIX = struct.Struct(">BB")
+
+
+def compute_parity(payload: np.ndarray, group_size: int) -> np.ndarray:
+    """
+    按组计算XOR校验
+
+    Args:
+        payload: PacketizedFrame.payload，形状 (包数, 每包字节数)
+        group_size: 每组包数K
+
+    Returns:
+        形状 (组数, 每包字节数) 的校验数据，第g行是第g组K个payload的XOR
+    """
+    count, size = payload.shape
+    groups = -(-count // group_size)
+    if groups * group_size != count:
+        # 最后一组不满K个时补0，补0不影响XOR结果
+        padded = np.zeros((groups * group_size, size), dtype=np.uint8)
+        padded[:count] = payload
+        payload = padded
+    return np.bitwise_xor.reduce(payload.reshape(groups, group_size, size), axis=1)
+
+
+def make_parity_packet(frame: PacketizedFrame, group: int, group_size: int, parity: np.ndarray) -> bytes:
+    """第group组的校验包，包头色彩模式为COLOR_PARITY，y_start为组内第一个包的y_start"""
+    first = group * group_size
+    members = min(group_size, len(frame) - first)
+    header = ESP32UDPHeader.make_header(
+        frame_id=frame.frame_id,
+        y_start=frame.y_starts[first],
+        resolution=frame.resolution,
+        color_mode=ESP32UDPHeader.COLOR_PARITY,
+        line_count=frame.lines_per_packet
+    )
+    return header + PARITY_PREFIX.pack(members, frame.color_mode) + parity.tobytes()
+
+
+class FECGroup:
+    """接收端一个校验组的状态"""
+
+    def __init__(self, y_start: int, lines_per_packet: int, members: int,
+                 resolution: int, color_mode: int):
+        self.lines_per_packet = lines_per_packet
+        self.resolution = resolution
+        self.color_mode = color_mode
+        self.y_starts = [y_start + i * lines_per_packet for i in range(members)]
+        self.payloads: Dict[int, bytes] = {}
+        self.parity: Optional[np.ndarray] = None
+        self.recovered = False
+
+    def add(self, y_start: int, payload: bytes):
+        self.payloads[y_start] = payload
+
+    def try_recover(self):
+        """
+        组内恰好丢了一个包且校验包已到达时恢复它
+
+        Returns:
+            (y_start, payload)，无法恢复或不需要恢复时返回None。
+            payload按校验长度返回，末尾可能有补0，由调用方按行数截断
+        """
+        if self.recovered or self.parity is None:
+            return None
+        missing = [y for y in self.y_starts if y not in self.payloads]
+        if len(missing) != 1:
+            return None
+        data = self.parity.copy()
+        size = len(data)
+        for payload in self.payloads.values():
+            n = min(len(payload), size)
+            data[:n] ^= np.frombuffer(payload, dtype=np.uint8, count=n)
+        self.recovered = True
+        return missing[0], data.tobytes()
+
+
+def parse_parity_payload(payload: bytes):
+    """解析校验包payload，返回 (组内包数, 实际色彩模式, 校验数据)"""
+    members, color_mode = PARITY_PREFIX.unpack_from(payload)
+    parity = np.frombuffer(payload, dtype=np.uint8, offset=PARITY_PREFIX.size)
+    return members, color_mode, parity
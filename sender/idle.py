@@ -0,0 +1,115 @@
+import time
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+
+class IdleController:
+    """
+    空闲/保活状态机
+
+    图像源有新帧时处于ACTIVE状态，直接发送新帧；没有新帧时不再全速重发上一帧，
+    只在refresh_delay秒后重发一次上一帧(弥补丢包)，之后的重发间隔按指数退避，最长max_refresh_interval秒。
+    连续idle_after秒没有新帧进入IDLE状态，轮询间隔放宽到idle_poll_interval；
+    图像源一有新帧立即回到ACTIVE状态。
+    """
+
+    ACTIVE = 'active'
+    IDLE = 'idle'
+
+    def __init__(self, refresh_delay: float = 1.0, max_refresh_interval: float = 30.0,
+                 idle_after: float = 0.5, poll_interval: float = 0.005, idle_poll_interval: float = 0.05):
+        """
+        Args:
+            refresh_delay: 最后一个新帧之后多久重发一次
+            max_refresh_interval: 重发间隔的上限，0表示只重发一次
+            idle_after: 多久没有新帧进入IDLE状态
+            poll_interval: ACTIVE状态下没有新帧时的轮询间隔
+            idle_poll_interval: IDLE状态下的轮询间隔，也是检测到新内容的最大延迟
+        """
+        self.refresh_delay = refresh_delay
+        self.max_refresh_interval = max_refresh_interval
+        self.idle_after = idle_after
+        self.poll_interval = poll_interval
+        self.idle_poll_interval = idle_poll_interval
+
+        self.state = self.ACTIVE
+        self._last_frame = None
+        self._copy_buffer = None  # 图像源返回视图时，重发用的上一帧复制到这里
+        self._last_frame_time = 0.0
+        self._refresh_interval = refresh_delay
+        self._next_refresh = None
+        self.stats = {
+            'frames': 0,
+            'refreshes': 0,
+            'wakeups': 0,
+            'copies': 0,  # 需要复制的新帧数(图像源返回的是视图)
+        }
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> 'IdleController':
+        """从config_stream.yaml的sender.idle部分创建，未配置的项使用默认值"""
+        config = config or {}
+        return cls(
+            refresh_delay=config.get('refresh_delay', 1.0),
+            max_refresh_interval=config.get('max_refresh_interval', 30.0),
+            idle_after=config.get('idle_after', 0.5),
+            poll_interval=config.get('poll_interval', 0.005),
+            idle_poll_interval=config.get('idle_poll_interval', 0.05),
+        )
+
+    def update(self, frame: Optional[np.ndarray], now: float = None) -> Optional[np.ndarray]:
+        """
+        输入图像源的返回值，返回这一轮需要发送的帧
+
+        Returns:
+            新帧、需要重发的上一帧，或None(本轮不发送，调用方等待poll_delay()秒)
+        """
+        if now is None:
+            now = time.monotonic()
+
+        if frame is not None:
+            if self.state == self.IDLE:
+                self.stats['wakeups'] += 1
+            self.state = self.ACTIVE
+            self.stats['frames'] += 1
+            if frame.base is None:
+                # 图像源新分配的数组(摄像头、视频、RTSP解码)不会被覆盖，直接保留
+                self._last_frame = frame
+            else:
+                # 视图(共享内存截图、Frame)可能在下一次capture时被覆盖，复制到自己的缓冲区
+                buffer = self._copy_buffer
+                if buffer is None or buffer.shape != frame.shape or buffer.dtype != frame.dtype:
+                    buffer = self._copy_buffer = np.empty(frame.shape, frame.dtype)
+                np.copyto(buffer, frame)
+                self._last_frame = buffer
+                self.stats['copies'] += 1
+            self._last_frame_time = now
+            self._refresh_interval = self.refresh_delay
+            self._next_refresh = now + self.refresh_delay
+            return frame
+
+        if self._last_frame is None:
+            return None
+        if self.state == self.ACTIVE and now - self._last_frame_time >= self.idle_after:
+            self.state = self.IDLE
+
+        if self._next_refresh is not None and now >= self._next_refresh:
+            self.stats['refreshes'] += 1
+            if self.max_refresh_interval:
+                self._refresh_interval = min(self._refresh_interval * 2, self.max_refresh_interval)
+                self._next_refresh = now + self._refresh_interval
+            else:
+                self._next_refresh = None
+            # 重发时整帧发送，不带图像源给出的变化区域
+            return np.asarray(self._last_frame)
+        return None
+
+    def poll_delay(self) -> float:
+        """本轮没有发送时，再次询问图像源前应等待的时间"""
+        return self.idle_poll_interval if self.state == self.IDLE else self.poll_interval
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['state'] = self.state
+        return stats
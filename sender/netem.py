@@ -0,0 +1,311 @@
+"""
+用户态UDP网络损伤模拟代理
+
+发送端 -> ImpairmentProxy -> 接收端，在本机复现拥挤Wi-Fi上的丢包、突发丢包、时延抖动、乱序和带宽限制。
+接收端回给发送端的包(比如NACK)原样转发回去，默认不做损伤。
+
+命令行用法(在项目根目录运行):
+    python -m sender.netem --listen 127.0.0.1:9999 --target 127.0.0.1:8888 --loss 0.02 --jitter-ms 2
+"""
+import argparse
+import heapq
+import itertools
+import random
+import select
+import socket
+import threading
+import time
+from typing import Optional, Tuple, Dict, Any
+
+from sender.udp_sender import resolve_host
+
+
+class BernoulliLoss:
+    """每个包独立地以概率p丢弃"""
+
+    def __init__(self, p: float = 0.0):
+        self.p = p
+
+    def drop(self, rng: random.Random) -> bool:
+        return rng.random() < self.p
+
+    @property
+    def average_loss(self) -> float:
+        return self.p
+
+
+class GilbertElliottLoss:
+    """
+    Gilbert-Elliott两状态突发丢包模型
+
+    每个包先按转移概率在好/坏两个状态间切换，再按所在状态的丢包率决定是否丢弃。
+    p: 好 -> 坏 的概率，r: 坏 -> 好 的概率，平均突发长度约为 1/r 个包
+    """
+
+    def __init__(self, p: float = 0.01, r: float = 0.3, loss_good: float = 0.0, loss_bad: float = 1.0):
+        self.p = p
+        self.r = r
+        self.loss_good = loss_good
+        self.loss_bad = loss_bad
+        self.bad = False
+
+    def drop(self, rng: random.Random) -> bool:
+        if self.bad:
+            if rng.random() < self.r:
+                self.bad = False
+        elif rng.random() < self.p:
+            self.bad = True
+        return rng.random() < (self.loss_bad if self.bad else self.loss_good)
+
+    @property
+    def average_loss(self) -> float:
+        if self.p + self.r == 0:
+            return self.loss_good
+        bad_ratio = self.p / (self.p + self.r)
+        return bad_ratio * self.loss_bad + (1 - bad_ratio) * self.loss_good
+
+
+def make_loss_model(config: Optional[Dict[str, Any]]):
+    """
+    根据配置创建丢包模型
+
+    {'model': 'bernoulli', 'p': 0.01}
+    {'model': 'gilbert_elliott', 'p': 0.01, 'r': 0.3, 'loss_good': 0.0, 'loss_bad': 1.0}
+    """
+    if not config:
+        return None
+    config = dict(config)
+    model = config.pop('model', 'bernoulli')
+    if model == 'bernoulli':
+        return BernoulliLoss(**config)
+    if model == 'gilbert_elliott':
+        return GilbertElliottLoss(**config)
+    raise ValueError(f"Unsupported loss model: {model}")
+
+
+class TokenBucket:
+    """令牌桶限速，返回每个包离开瓶颈的时间"""
+
+    def __init__(self, rate_bps: float, burst_bytes: int = 3000):
+        self.rate = rate_bps / 8.0  # 字节/秒
+        self.burst = burst_bytes
+        self._tokens = burst_bytes
+        self._time = None
+
+    def schedule(self, now: float, size: int, max_queue_delay: float = None) -> Optional[float]:
+        """
+        计算大小为size的包的离开时间
+
+        Returns:
+            离开时间，排队时间超过max_queue_delay时返回None(尾部丢弃，桶状态不变)
+        """
+        start = now if self._time is None else max(now, self._time)
+        if self._time is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, self._tokens + (start - self._time) * self.rate)
+
+        depart = start
+        if tokens < size:
+            depart = start + (size - tokens) / self.rate
+        if max_queue_delay is not None and depart - now > max_queue_delay:
+            return None
+
+        self._tokens = max(0.0, tokens - size)
+        self._time = depart
+        return depart
+
+
+class ImpairmentProxy:
+    """UDP损伤代理"""
+
+    def __init__(self, target: Tuple[str, int], listen: Tuple[str, int] = ("127.0.0.1", 0),
+                 loss=None, delay: float = 0.0, jitter: float = 0.0,
+                 reorder: float = 0.0, reorder_delay: float = 0.002,
+                 rate_bps: float = None, burst_bytes: int = 3000, max_queue_delay: float = 0.05,
+                 impair_reverse: bool = False, seed: int = 0):
+        """
+        Args:
+            target: 接收端地址，主机名(如localhost)在这里解析一次
+            listen: 代理监听地址，发送端把包发到这里
+            loss: 丢包模型(BernoulliLoss / GilbertElliottLoss)，None表示不丢包
+            delay: 固定时延(秒)
+            jitter: 时延抖动(秒)，每个包额外增加 [0, jitter) 的均匀随机时延，不会因此乱序
+            reorder: 乱序概率，被选中的包额外延迟reorder_delay秒，从而被后面的包超过
+            rate_bps: 带宽上限(比特/秒)，None表示不限速
+            burst_bytes: 令牌桶容量
+            max_queue_delay: 限速排队超过该时间的包直接丢弃
+            impair_reverse: 接收端 -> 发送端方向是否也应用丢包
+            seed: 随机种子，相同种子和相同包序列得到相同的丢包结果
+        """
+        # 回包的来源地址是IP，解析后才能和它比较
+        self.target = (resolve_host(target[0]), target[1])
+        self.loss = loss
+        self.delay = delay
+        self.jitter = jitter
+        self.reorder = reorder
+        self.reorder_delay = reorder_delay
+        self.bucket = TokenBucket(rate_bps, burst_bytes) if rate_bps else None
+        self.max_queue_delay = max_queue_delay
+        self.impair_reverse = impair_reverse
+        self._rng = random.Random(seed)
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind(listen)
+        self.address = self.sock.getsockname()
+        self._client = None  # 发送端地址，用于转发回程包
+
+        self._queue = []  # (release_time, seq, data, addr)
+        self._seq = itertools.count()
+        self._last_release = 0.0
+        self._thread = None
+        self._running = False
+
+        self.stats = {
+            'received': 0,
+            'forwarded': 0,
+            'dropped_loss': 0,
+            'dropped_queue': 0,
+            'reordered': 0,
+            'reverse': 0,
+        }
+
+    @classmethod
+    def from_config(cls, target: Tuple[str, int], config: Dict[str, Any], **kwargs):
+        """
+        从字典创建，方便基准测试脚本按场景配置:
+        {'loss': {...}, 'delay_ms': 2, 'jitter_ms': 1, 'reorder': 0.01, 'rate_kbps': 20000, 'seed': 1}
+        """
+        rate_kbps = config.get('rate_kbps')
+        return cls(
+            target,
+            loss=make_loss_model(config.get('loss')),
+            delay=config.get('delay_ms', 0) / 1000.0,
+            jitter=config.get('jitter_ms', 0) / 1000.0,
+            reorder=config.get('reorder', 0.0),
+            reorder_delay=config.get('reorder_delay_ms', 2) / 1000.0,
+            rate_bps=rate_kbps * 1000 if rate_kbps else None,
+            burst_bytes=config.get('burst_bytes', 3000),
+            max_queue_delay=config.get('queue_ms', 50) / 1000.0,
+            impair_reverse=config.get('impair_reverse', False),
+            seed=config.get('seed', 0),
+            **kwargs
+        )
+
+    def _on_packet(self, data: bytes, addr, now: float):
+        if addr == self.target:
+            # 回程方向(接收端 -> 发送端)
+            self.stats['reverse'] += 1
+            if self._client is not None:
+                if not (self.impair_reverse and self.loss is not None and self.loss.drop(self._rng)):
+                    self.sock.sendto(data, self._client)
+            return
+
+        self._client = addr
+        self.stats['received'] += 1
+        if self.loss is not None and self.loss.drop(self._rng):
+            self.stats['dropped_loss'] += 1
+            return
+
+        release = now
+        if self.bucket is not None:
+            release = self.bucket.schedule(now, len(data), self.max_queue_delay)
+            if release is None:
+                self.stats['dropped_queue'] += 1
+                return
+
+        release += self.delay
+        if self.jitter:
+            release += self._rng.random() * self.jitter
+        # 抖动本身不乱序
+        release = max(release, self._last_release)
+        self._last_release = release
+
+        if self.reorder and self._rng.random() < self.reorder:
+            release += self.reorder_delay
+            self.stats['reordered'] += 1
+
+        heapq.heappush(self._queue, (release, next(self._seq), data))
+
+    def _release_due(self, now: float):
+        while self._queue and self._queue[0][0] <= now:
+            _, _, data = heapq.heappop(self._queue)
+            self.sock.sendto(data, self.target)
+            self.stats['forwarded'] += 1
+
+    def _loop(self):
+        while self._running:
+            now = time.perf_counter()
+            self._release_due(now)
+            timeout = 0.05
+            if self._queue:
+                timeout = max(0.0, min(timeout, self._queue[0][0] - now))
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if readable:
+                try:
+                    data, addr = self.sock.recvfrom(65535)
+                except OSError:
+                    continue
+                self._on_packet(data, addr, time.perf_counter())
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.sock.close()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
+
+
+def _parse_address(text: str) -> Tuple[str, int]:
+    host, port = text.rsplit(':', 1)
+    return host, int(port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="UDP网络损伤模拟代理")
+    parser.add_argument('--listen', default="127.0.0.1:9999", help="代理监听地址，发送端把服务器IP/端口设为它")
+    parser.add_argument('--target', default="127.0.0.1:8888", help="接收端地址")
+    parser.add_argument('--loss', type=float, default=0.0, help="伯努利丢包率")
+    parser.add_argument('--burst', type=float, nargs=2, metavar=('P', 'R'),
+                        help="改用Gilbert-Elliott突发丢包: 好->坏概率P, 坏->好概率R")
+    parser.add_argument('--delay-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--reorder', type=float, default=0.0)
+    parser.add_argument('--rate-kbps', type=float, default=None)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    loss = {'model': 'bernoulli', 'p': args.loss}
+    if args.burst:
+        loss = {'model': 'gilbert_elliott', 'p': args.burst[0], 'r': args.burst[1]}
+    proxy = ImpairmentProxy.from_config(
+        _parse_address(args.target),
+        {'loss': loss, 'delay_ms': args.delay_ms, 'jitter_ms': args.jitter_ms,
+         'reorder': args.reorder, 'rate_kbps': args.rate_kbps, 'seed': args.seed},
+        listen=_parse_address(args.listen)
+    ).start()
+    print(f"损伤代理已启动: {proxy.address} -> {proxy.target}")
+    try:
+        while True:
+            time.sleep(2)
+            print(proxy.get_stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        proxy.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+import math
+from typing import List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from esp32_udp_header import ESP32UDPHeader
+
+# 分辨率宽度 -> 包头分辨率代码
+RESOLUTION_CODES = {
+    240: ESP32UDPHeader.RES_240,
+    180: ESP32UDPHeader.RES_180,
+    120: ESP32UDPHeader.RES_120,
+}
+RESOLUTION_WIDTHS = {code: width for width, code in RESOLUTION_CODES.items()}
+
+# 配置文件中的色彩模式字符串 -> 包头色彩模式代码
+COLOR_MODES = {
+    'rgb565': ESP32UDPHeader.COLOR_RGB565,
+    'rgb332': ESP32UDPHeader.COLOR_RGB332,
+}
+
+# 每种色彩模式每个像素占用的字节数
+BYTES_PER_PIXEL = {
+    ESP32UDPHeader.COLOR_RGB565: 2,
+    ESP32UDPHeader.COLOR_RGB332: 1,
+}
+
+
+def bgr_to_rgb332(bgr_image: np.ndarray) -> np.ndarray:
+    """类似OpenCV风格的RGB332转换"""
+    b, g, r = cv2.split(bgr_image)
+    r_332 = (r >> 5) & 0x07
+    g_332 = (g >> 5) & 0x07
+    b_332 = (b >> 6) & 0x03
+    return (r_332 << 5) | (g_332 << 2) | b_332
+
+
+def encode_frame(image: np.ndarray, width: int, height: int, color_mode: int) -> np.ndarray:
+    """
+    把任意大小的BGR图片缩放并转换为ESP32的像素格式
+
+    Returns:
+        形状为 (height, width * 每像素字节数) 的uint8数组，每一行就是一行像素的原始字节
+    """
+    if image.shape[1] != width or image.shape[0] != height:
+        image = cv2.resize(image, (width, height))
+    if color_mode == ESP32UDPHeader.COLOR_RGB332:
+        encoded = bgr_to_rgb332(image).astype(np.uint8, copy=False)
+    else:
+        encoded = cv2.cvtColor(image, cv2.COLOR_BGR2BGR565)
+    return encoded.reshape(height, -1)
+
+
+def map_damage_rows(image: np.ndarray, height: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    把图像源给出的变化行(capture.interface.Frame)映射到缩放到height行之后的行区间
+
+    缩放时每个输出行会用到相邻的源行，映射结果上下各多留一行。不是Frame或者变化区域未知时返回None
+    """
+    damage_rows = getattr(image, 'damage_rows', None)
+    rows = damage_rows() if damage_rows is not None else None
+    if rows is None:
+        return None
+    scale = height / image.shape[0]
+    mapped = []
+    for start, end in rows:
+        start = max(0, int(start * scale) - 1)
+        end = min(height, math.ceil(end * scale) + 1)
+        if end > start:
+            mapped.append((start, end))
+    return mapped
+
+
+class PacketizedFrame:
+    """
+    一帧打包好的数据
+
+    所有包的payload放在一个连续的 (包数, 每包最大字节数) 缓冲区里，
+    最后一个包行数不足时只有前 payload_lens[i] 个字节有效，其余补0
+    """
+
+    def __init__(self, frame_id: int, rows: np.ndarray, resolution: int,
+                 color_mode: int, lines_per_packet: int):
+        self.frame_id = frame_id
+        self.resolution = resolution
+        self.color_mode = color_mode
+        self.lines_per_packet = lines_per_packet
+
+        height, row_bytes = rows.shape
+        self.height = height
+        self.row_bytes = row_bytes
+        self.y_starts = list(range(0, height, lines_per_packet))
+        self.line_counts = [min(lines_per_packet, height - y) for y in self.y_starts]
+        self.payload_lens = [lines * row_bytes for lines in self.line_counts]
+
+        count = len(self.y_starts)
+        if count * lines_per_packet == height:
+            # 整除时直接reshape，不拷贝
+            self.payload = np.ascontiguousarray(rows).reshape(count, lines_per_packet * row_bytes)
+        else:
+            padded = np.zeros((count * lines_per_packet, row_bytes), dtype=np.uint8)
+            padded[:height] = rows
+            self.payload = padded.reshape(count, lines_per_packet * row_bytes)
+
+        self._index = {y: i for i, y in enumerate(self.y_starts)}
+
+    def __len__(self):
+        return len(self.y_starts)
+
+    def index_of(self, y_start: int) -> Optional[int]:
+        """y_start对应的包序号，不存在返回None"""
+        return self._index.get(y_start)
+
+    def packet(self, i: int) -> bytes:
+        """第i个包(包头 + payload)"""
+        header = ESP32UDPHeader.make_header(
+            frame_id=self.frame_id,
+            y_start=self.y_starts[i],
+            resolution=self.resolution,
+            color_mode=self.color_mode,
+            line_count=self.line_counts[i]
+        )
+        return header + self.payload[i, :self.payload_lens[i]].tobytes()
+
+    def packets(self) -> List[bytes]:
+        return [self.packet(i) for i in range(len(self))]
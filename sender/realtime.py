@@ -0,0 +1,265 @@
+import os
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any
+
+import numpy as np
+
+
+class JitterMeter:
+    """
+    发包时刻相对排期时刻的延迟统计
+
+    用预分配的环形数组保存最近capacity个包的延迟，发包路径上只有一次数组写入。
+    """
+
+    def __init__(self, capacity: int = 4096):
+        self._samples = np.zeros(capacity, dtype=np.float64)
+        self._count = 0
+
+    def record(self, lateness: float):
+        self._samples[self._count % len(self._samples)] = lateness
+        self._count += 1
+
+    def reset(self):
+        self._count = 0
+
+    def summary(self) -> Dict[str, Any]:
+        """最近一段时间的发包延迟(微秒)"""
+        n = min(self._count, len(self._samples))
+        if n == 0:
+            return {'samples': 0}
+        late = self._samples[:n] * 1e6
+        return {
+            'samples': n,
+            'p50_us': round(float(np.percentile(late, 50)), 1),
+            'p99_us': round(float(np.percentile(late, 99)), 1),
+            'max_us': round(float(late.max()), 1),
+        }
+
+
+def wait_until(deadline: float, spin: float = 0.0):
+    """
+    等待到deadline(time.perf_counter时间)
+
+    spin大于0时先sleep到deadline前spin秒，剩下的时间忙等，
+    用一个核的CPU换取远低于系统定时器精度的发包间隔误差。
+    """
+    delay = deadline - time.perf_counter() - spin
+    if delay > 0:
+        time.sleep(delay)
+    if spin:
+        while time.perf_counter() < deadline:
+            pass
+
+
+class RealtimeSendThread:
+    """
+    发送线程的实时性设置
+
+    在发送线程内调用apply()：把线程绑定到cpu指定的核，把进程中其它线程(界面、采集、音频回调)
+    挪到其余的核，申请SCHED_FIFO/SCHED_RR或提高nice优先级，并限制OpenCV线程池的大小。
+    每一项失败(没有权限、平台不支持)都只记录在报告里，不影响推流。
+    Linux下发送线程之后创建的线程会继承这些设置，需要在新线程内调用reset_current_thread()；
+    release()把被挪走的线程挪回原来的核。
+    """
+
+    def __init__(self, cpu: int = None, policy: str = None, priority: int = 10,
+                 nice: int = None, opencv_threads: int = None, isolate: bool = True):
+        """
+        Args:
+            cpu: 发送线程绑定的CPU核，None表示不绑定
+            policy: 'fifo'、'rr'或None(仅Linux)
+            priority: 实时调度优先级(1-99)
+            nice: 申请实时调度失败或未配置时使用的nice值，越小优先级越高
+            opencv_threads: cv2.setNumThreads的值
+            isolate: 绑定cpu时是否把其它线程挪到其余的核
+        """
+        self.cpu = cpu
+        self.policy = policy
+        self.priority = priority
+        self.nice = nice
+        self.opencv_threads = opencv_threads
+        self.isolate = isolate
+        self._timer_period = False
+        self._original_affinity = None  # apply()之前发送线程可以使用的核
+        self._original_nice = None
+        self._moved: Dict[int, set] = {}  # 被挪走的线程 -> 原来的亲和性
+
+    @classmethod
+    def from_config(cls, config: Optional[Dict[str, Any]]) -> Optional['RealtimeSendThread']:
+        """从config_stream.yaml的sender.realtime部分创建，未配置时返回None"""
+        if not config:
+            return None
+        return cls(
+            cpu=config.get('cpu'),
+            policy=config.get('policy'),
+            priority=config.get('priority', 10),
+            nice=config.get('nice'),
+            opencv_threads=config.get('opencv_threads'),
+            isolate=config.get('isolate', True),
+        )
+
+    def apply(self) -> Dict[str, str]:
+        """
+        在发送线程内调用
+
+        Returns:
+            每一项设置的结果，用于日志
+        """
+        report = {}
+        if self.opencv_threads is not None:
+            report['opencv_threads'] = self._set_opencv_threads()
+        if sys.platform == 'win32':
+            report.update(self._apply_windows())
+        elif hasattr(os, 'sched_setaffinity'):
+            report.update(self._apply_linux())
+        else:
+            report['realtime'] = '当前平台不支持'
+        return report
+
+    def release(self):
+        """恢复系统定时器精度(Windows)，把apply()挪走的线程挪回原来的核(Linux)"""
+        if self._timer_period:
+            import ctypes
+            ctypes.windll.winmm.timeEndPeriod(1)
+            self._timer_period = False
+        for tid, affinity in self._moved.items():
+            try:
+                os.sched_setaffinity(tid, affinity)
+            except OSError:
+                # 线程已经退出
+                pass
+        self._moved.clear()
+
+    def reset_current_thread(self):
+        """
+        在发送线程创建的工作线程(如即时采集的后台采集线程)内调用
+
+        Linux下新线程继承发送线程的绑核和实时调度，这里把它挪到发送线程以外的核并恢复普通调度和nice值，
+        采集编码不会和发包抢同一个核。Windows下新线程不继承这些设置，什么都不做
+        """
+        if self._original_affinity is None:
+            return
+        others = self._original_affinity - {self.cpu} if self.cpu is not None else set()
+        try:
+            os.sched_setaffinity(0, others or self._original_affinity)
+        except (OSError, ValueError):
+            pass
+        if self.policy:
+            try:
+                os.sched_setscheduler(0, os.SCHED_OTHER, os.sched_param(0))
+            except OSError:
+                pass
+        if self._original_nice is not None:
+            try:
+                os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), self._original_nice)
+            except OSError:
+                pass
+
+    def _set_opencv_threads(self) -> str:
+        import cv2
+        cv2.setNumThreads(self.opencv_threads)
+        return str(cv2.getNumThreads())
+
+    def _warm_opencv_pool(self) -> str:
+        """
+        OpenCV第一次并行运算时才在调用线程中创建线程池，池中的线程继承调用线程的绑核和实时调度，
+        会和发包抢同一个核。绑核之前先做一次缩放和颜色转换，让线程池按原来的设置创建，
+        之后由_isolate_other_threads挪到其余的核
+        """
+        try:
+            import cv2
+        except ImportError:
+            return '跳过: 没有OpenCV'
+        image = np.zeros((1080, 1920, 3), np.uint8)
+        cv2.cvtColor(cv2.resize(image, (960, 540)), cv2.COLOR_BGR2BGR565)
+        cv2.cvtColor(image, cv2.COLOR_BGR2BGR565)
+        return f'{cv2.getNumThreads()}个线程'
+
+    def _apply_linux(self) -> Dict[str, str]:
+        report = {}
+        tid = threading.get_native_id()
+        if self.cpu is not None or self.policy:
+            report['opencv_pool'] = self._warm_opencv_pool()
+        allowed = os.sched_getaffinity(0)
+        self._original_affinity = allowed
+
+        if self.cpu is not None:
+            try:
+                # Linux下pid为0时只作用于调用线程
+                os.sched_setaffinity(0, {self.cpu})
+                report['affinity'] = f'cpu{self.cpu}'
+            except (OSError, ValueError) as e:
+                report['affinity'] = f'失败: {e}'
+            else:
+                if self.isolate:
+                    report['isolate'] = self._isolate_other_threads(tid, allowed - {self.cpu})
+
+        scheduled = False
+        if self.policy:
+            policy = {'fifo': getattr(os, 'SCHED_FIFO', None), 'rr': getattr(os, 'SCHED_RR', None)}.get(self.policy)
+            if policy is None:
+                report['policy'] = f'不支持: {self.policy}'
+            else:
+                try:
+                    os.sched_setscheduler(0, policy, os.sched_param(self.priority))
+                    report['policy'] = f'{self.policy} 优先级{self.priority}'
+                    scheduled = True
+                except OSError as e:
+                    report['policy'] = f'失败(需要CAP_SYS_NICE或root): {e}'
+
+        if not scheduled and self.nice is not None:
+            try:
+                self._original_nice = os.getpriority(os.PRIO_PROCESS, tid)
+                # 传入线程ID时setpriority只作用于该线程
+                os.setpriority(os.PRIO_PROCESS, tid, self.nice)
+                report['nice'] = str(os.getpriority(os.PRIO_PROCESS, tid))
+            except OSError as e:
+                report['nice'] = f'失败: {e}'
+        return report
+
+    def _isolate_other_threads(self, own_tid: int, others: set) -> str:
+        """把进程里的其它线程挪到其余的核，之后它们创建的线程(如OpenCV线程池)会继承这个设置"""
+        if not others:
+            return '跳过: 只有一个核'
+        moved = 0
+        for name in os.listdir('/proc/self/task'):
+            tid = int(name)
+            if tid == own_tid:
+                continue
+            try:
+                previous = os.sched_getaffinity(tid)
+                os.sched_setaffinity(tid, others)
+                self._moved[tid] = previous
+                moved += 1
+            except OSError:
+                pass
+        return f'{moved}个线程 -> {sorted(others)}'
+
+    def _apply_windows(self) -> Dict[str, str]:
+        import ctypes
+        report = {}
+        kernel32 = ctypes.windll.kernel32
+        thread = kernel32.GetCurrentThread()
+
+        # 默认定时器精度约15.6ms，sleep(0.0002)实际会睡一个完整的时钟周期
+        if ctypes.windll.winmm.timeBeginPeriod(1) == 0:
+            self._timer_period = True
+            report['timer'] = '1ms'
+
+        if self.cpu is not None:
+            if kernel32.SetThreadAffinityMask(thread, ctypes.c_size_t(1 << self.cpu)):
+                report['affinity'] = f'cpu{self.cpu}'
+            else:
+                report['affinity'] = f'失败: {ctypes.GetLastError()}'
+
+        if self.policy or self.nice is not None:
+            # THREAD_PRIORITY_TIME_CRITICAL / THREAD_PRIORITY_HIGHEST
+            level = 15 if self.policy else 2
+            if kernel32.SetThreadPriority(thread, level):
+                report['priority'] = 'time_critical' if self.policy else 'highest'
+            else:
+                report['priority'] = f'失败: {ctypes.GetLastError()}'
+        return report
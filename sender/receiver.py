@@ -0,0 +1,307 @@
+import argparse
+import select
+import socket
+import struct
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any
+
+import cv2
+import numpy as np
+
+from esp32_udp_header import ESP32UDPHeader
+from sender.fec import FECGroup, parse_parity_payload
+from sender.packetizer import RESOLUTION_WIDTHS, BYTES_PER_PIXEL
+
+
+class ESP32UDPReceiver:
+    """
+    ESP32接收端的Python替身，用于在没有硬件的情况下本地测试发送端
+
+    行为与ESP32一致：收到的行直接写入帧缓冲。另外记录每一帧收到了哪些行带，
+    开启nack时在一帧结束(收到下一帧的包)后把丢失的y_start报告给发送端；
+    开启fec时用校验包恢复每组中丢失的一个包(ESP32本身会忽略校验包)。
+    指定multicast_group时加入该组播组，同一台机器上可以启动多个替身模拟多台设备。
+    """
+
+    # 保留多少帧的接收记录，用于统计晚到的重传包
+    RECORD_HISTORY = 32
+
+    def __init__(self, bind_ip: str = "127.0.0.1", port: int = 8888, nack: bool = False,
+                 fec: bool = False, multicast_group: str = None, interface: str = "0.0.0.0"):
+        self.nack = nack
+        self.fec = fec
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if multicast_group:
+            # 允许多个接收端绑定同一个端口
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if hasattr(socket, 'SO_REUSEPORT'):
+                self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            self.sock.bind(("", port))
+            membership = struct.pack("4s4s", socket.inet_aton(multicast_group), socket.inet_aton(interface))
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        else:
+            self.sock.bind((bind_ip, port))
+        self.address = self.sock.getsockname()
+
+        self.framebuffer = None  # (height, width * 每像素字节数)
+        self.resolution = None
+        self.color_mode = None
+        self.lines_per_packet = 0
+        self.sender_address = None
+
+        self._current_frame_id = None
+        self._records = OrderedDict()  # frame_id -> {'received': set, 'repaired': int, 'payloads': dict, 'groups': dict}
+        self.stats = {
+            'packets': 0,
+            'frames': 0,
+            'frames_complete': 0,
+            'frames_incomplete': 0,
+            'nacks_sent': 0,
+            'bands_requested': 0,
+            'bands_repaired': 0,
+            'parity_packets': 0,
+            'bands_recovered': 0,
+        }
+
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+
+    # ========== 数据包处理 ==========
+
+    def handle_packet(self, data: bytes, addr=None):
+        """处理一个数据包"""
+        if len(data) < ESP32UDPHeader.HEADER_SIZE:
+            return
+        frame_id, y_start, resolution, color_mode, line_count = ESP32UDPHeader.parse_header(data)
+        if color_mode == ESP32UDPHeader.COLOR_PARITY:
+            if self.fec and resolution in RESOLUTION_WIDTHS:
+                self.stats['parity_packets'] += 1
+                self._handle_parity(frame_id, y_start, resolution, line_count,
+                                    data[ESP32UDPHeader.HEADER_SIZE:])
+            return
+        if line_count == 0 or resolution not in RESOLUTION_WIDTHS or color_mode not in BYTES_PER_PIXEL:
+            return
+
+        self.stats['packets'] += 1
+        if addr is not None:
+            self.sender_address = addr
+
+        payload = data[ESP32UDPHeader.HEADER_SIZE:]
+        self._write_rows(y_start, resolution, color_mode, line_count, payload)
+        record = self._record_band(frame_id, y_start, line_count)
+        if self.fec:
+            record['payloads'][y_start] = payload
+            for group in record['groups'].values():
+                if y_start in group.y_starts:
+                    group.add(y_start, payload)
+                    self._recover(record, group)
+                    break
+
+    def _handle_parity(self, frame_id, y_start, resolution, lines_per_packet, payload):
+        members, color_mode, parity = parse_parity_payload(payload)
+        if color_mode not in BYTES_PER_PIXEL:
+            return
+        self.lines_per_packet = max(self.lines_per_packet, lines_per_packet)
+        record = self._get_record(frame_id)
+        group = record['groups'].get(y_start)
+        if group is None:
+            group = FECGroup(y_start, lines_per_packet, members, resolution, color_mode)
+            record['groups'][y_start] = group
+            for y in group.y_starts:
+                if y in record['payloads']:
+                    group.add(y, record['payloads'][y])
+        group.parity = parity
+        self._recover(record, group)
+
+    def _recover(self, record, group: FECGroup):
+        """组内只丢了一个包时用校验包恢复"""
+        recovered = group.try_recover()
+        if recovered is None:
+            return
+        y_start, payload = recovered
+        width = RESOLUTION_WIDTHS[group.resolution]
+        line_count = min(group.lines_per_packet, width - y_start)
+        if line_count <= 0:
+            return
+        payload = payload[:line_count * width * BYTES_PER_PIXEL[group.color_mode]]
+        self._write_rows(y_start, group.resolution, group.color_mode, line_count, payload)
+        record['received'].add(y_start)
+        record['payloads'][y_start] = payload
+        self.stats['bands_recovered'] += 1
+
+    def _write_rows(self, y_start, resolution, color_mode, line_count, payload):
+        width = RESOLUTION_WIDTHS[resolution]
+        row_bytes = width * BYTES_PER_PIXEL[color_mode]
+        if (self.framebuffer is None or self.resolution != resolution
+                or self.color_mode != color_mode):
+            self.framebuffer = np.zeros((width, row_bytes), dtype=np.uint8)
+            self.resolution = resolution
+            self.color_mode = color_mode
+
+        lines = min(line_count, width - y_start, len(payload) // row_bytes)
+        if lines <= 0:
+            return
+        rows = np.frombuffer(payload, dtype=np.uint8, count=lines * row_bytes)
+        self.framebuffer[y_start:y_start + lines] = rows.reshape(lines, row_bytes)
+
+    def _get_record(self, frame_id):
+        record = self._records.get(frame_id)
+        if record is not None:
+            return record
+
+        # 新的一帧开始，结束上一帧
+        if self._current_frame_id is not None:
+            self._finish_frame(self._current_frame_id)
+
+        self._current_frame_id = frame_id
+        record = {'received': set(), 'repaired': 0, 'payloads': {}, 'groups': {}}
+        self._records[frame_id] = record
+        self.stats['frames'] += 1
+        while len(self._records) > self.RECORD_HISTORY:
+            _, old = self._records.popitem(last=False)
+            self._tally(old)
+        return record
+
+    def _record_band(self, frame_id, y_start, line_count):
+        self.lines_per_packet = max(self.lines_per_packet, line_count)
+
+        record = self._get_record(frame_id)
+        if frame_id != self._current_frame_id and y_start not in record['received']:
+            # 已经结束的帧又收到了包，说明是重传
+            record['repaired'] += 1
+            self.stats['bands_repaired'] += 1
+        record['received'].add(y_start)
+        return record
+
+    def _expected_bands(self):
+        height = RESOLUTION_WIDTHS.get(self.resolution, 0)
+        if not self.lines_per_packet:
+            return []
+        return list(range(0, height, self.lines_per_packet))
+
+    def missing_bands(self, frame_id: int):
+        """某一帧丢失的y_start列表"""
+        record = self._records.get(frame_id)
+        if record is None:
+            return []
+        return [y for y in self._expected_bands() if y not in record['received']]
+
+    def _finish_frame(self, frame_id):
+        missing = self.missing_bands(frame_id)
+        if missing and self.nack and self.sender_address is not None:
+            self.sock.sendto(ESP32UDPHeader.make_nack(frame_id, missing), self.sender_address)
+            self.stats['nacks_sent'] += 1
+            self.stats['bands_requested'] += len(missing)
+
+    def _tally(self, record):
+        expected = self._expected_bands()
+        if all(y in record['received'] for y in expected):
+            self.stats['frames_complete'] += 1
+        else:
+            self.stats['frames_incomplete'] += 1
+
+    def finish(self):
+        """结束当前帧(发送端停止后调用，让最后一帧也能发出NACK)"""
+        with self._lock:
+            if self._current_frame_id is not None:
+                self._finish_frame(self._current_frame_id)
+                self._current_frame_id = None
+
+    # ========== 接收循环 ==========
+
+    def poll(self, timeout: float = 0.0) -> int:
+        """处理所有已到达的数据包，返回处理的包数"""
+        count = 0
+        while True:
+            readable, _, _ = select.select([self.sock], [], [], timeout if count == 0 else 0)
+            if not readable:
+                return count
+            try:
+                data, addr = self.sock.recvfrom(2048)
+            except OSError:
+                return count
+            with self._lock:
+                self.handle_packet(data, addr)
+            count += 1
+
+    def _receive_loop(self):
+        while self._running:
+            self.poll(timeout=0.05)
+
+    def start(self):
+        """在后台线程中接收"""
+        self._running = True
+        self._thread = threading.Thread(target=self._receive_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def close(self):
+        self.stop()
+        self.sock.close()
+
+    # ========== 结果 ==========
+
+    def get_stats(self) -> Dict[str, Any]:
+        """统计信息，包含仍在记录中的帧"""
+        with self._lock:
+            stats = dict(self.stats)
+            for frame_id, record in self._records.items():
+                if frame_id == self._current_frame_id:
+                    continue
+                if all(y in record['received'] for y in self._expected_bands()):
+                    stats['frames_complete'] += 1
+                else:
+                    stats['frames_incomplete'] += 1
+        finished = stats['frames_complete'] + stats['frames_incomplete']
+        stats['completeness'] = stats['frames_complete'] / finished if finished else 0.0
+        return stats
+
+    def get_image(self) -> Optional[np.ndarray]:
+        """把帧缓冲转换回BGR图片，方便肉眼检查"""
+        if self.framebuffer is None:
+            return None
+        height = self.framebuffer.shape[0]
+        if self.color_mode == ESP32UDPHeader.COLOR_RGB565:
+            return cv2.cvtColor(self.framebuffer.reshape(height, height, 2), cv2.COLOR_BGR5652BGR)
+        rgb332 = self.framebuffer
+        r = ((rgb332 >> 5) & 0x07) << 5
+        g = ((rgb332 >> 2) & 0x07) << 5
+        b = (rgb332 & 0x03) << 6
+        return cv2.merge([b, g, r])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ESP32接收端替身")
+    parser.add_argument('--bind', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=8888)
+    parser.add_argument('--nack', action='store_true', help="向发送端报告丢失的行")
+    parser.add_argument('--fec', action='store_true', help="用校验包恢复丢失的包")
+    parser.add_argument('--group', default=None, help="加入组播组，例如239.1.2.3")
+    parser.add_argument('--interface', default="0.0.0.0", help="加入组播组使用的网卡地址")
+    args = parser.parse_args()
+
+    receiver = ESP32UDPReceiver(args.bind, args.port, nack=args.nack, fec=args.fec,
+                                multicast_group=args.group, interface=args.interface)
+    receiver.start()
+    print(f"接收端替身已启动: {receiver.address}" + (f" 组播组: {args.group}" if args.group else ""))
+    try:
+        while True:
+            time.sleep(2)
+            print(receiver.get_stats())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        receiver.close()
+
+
+if __name__ == '__main__':
+    # 本地接收端替身：python -m sender.receiver --nack，然后把main_ui的服务器IP设为127.0.0.1
+    main()
@@ -0,0 +1,375 @@
+import ipaddress
+import select
+import socket
+import time
+from collections import OrderedDict
+from typing import Optional, Callable, Dict, Any, List
+
+import numpy as np
+
+from esp32_udp_header import ESP32UDPHeader
+from sender.fec import compute_parity, make_parity_packet
+from sender.packetizer import PacketizedFrame, RESOLUTION_CODES, BYTES_PER_PIXEL, encode_frame, map_damage_rows
+from sender.realtime import JitterMeter, wait_until
+
+
+def resolve_host(host: str) -> str:
+    """主机名(如localhost、esp32.local)解析为IPv4地址，解析失败时原样返回，由发送时报错"""
+    try:
+        return str(ipaddress.ip_address(host))
+    except ValueError:
+        pass
+    try:
+        return socket.gethostbyname(host)
+    except (socket.gaierror, UnicodeError):
+        return host
+
+
+def is_multicast_address(host: str) -> bool:
+    """host(IP或主机名)是否为组播地址，无法解析的主机名按单播处理"""
+    try:
+        return ipaddress.ip_address(resolve_host(host)).is_multicast
+    except ValueError:
+        return False
+
+
+class FrameHistory:
+    """
+    最近N帧打包数据的环形缓存，用于响应NACK重传
+
+    同时记录每个行带(y_start)最后一次是由哪一帧发出的，
+    只有当被请求的行带仍然是"当前"的(之后没有更新的帧发过这一行)才重传，
+    否则接收端早已收到更新的内容，重传旧数据反而会把画面改回去。
+    """
+
+    def __init__(self, size: int = 8):
+        self.size = max(1, size)
+        self._frames = OrderedDict()  # frame_id -> PacketizedFrame
+        self._band_owner = {}  # y_start -> frame_id
+
+    def add(self, frame: PacketizedFrame):
+        self._frames[frame.frame_id] = frame
+        self._frames.move_to_end(frame.frame_id)
+        while len(self._frames) > self.size:
+            self._frames.popitem(last=False)
+
+    def mark_sent(self, frame_id: int, y_start: int):
+        self._band_owner[y_start] = frame_id
+
+    def lookup(self, frame_id: int, y_start: int) -> Optional[bytes]:
+        """返回仍然有效的重传包，已过期或不在缓存中返回None"""
+        if self._band_owner.get(y_start) != frame_id:
+            return None
+        frame = self._frames.get(frame_id)
+        if frame is None:
+            return None
+        i = frame.index_of(y_start)
+        if i is None:
+            return None
+        return frame.packet(i)
+
+    def clear(self):
+        self._frames.clear()
+        self._band_owner.clear()
+
+
+class ESP32UDPSender:
+    """
+    ESP32 UDP发送端
+
+    负责把图片缩放、转换颜色、按行打包，并按固定间隔发送到ESP32。
+    开启nack后会保留最近nack_history帧，接收端报告丢失的行带时只重传这些行。
+    fec_group大于0时每发fec_group个行包追加一个XOR校验包，接收端可以恢复组内任意一个丢失的包。
+    server_ip是组播地址或者broadcast为True时，一次发送即可驱动多个显示相同内容的设备。
+    开启dirty_rows后，图像源给出变化区域的帧只发送变化的行带，另外每帧轮流重发一部分行带，
+    refresh_frames帧内每个行带至少发送一次，弥补丢包。
+    """
+
+    def __init__(self, server_ip: str, server_port: int, width: int = 240,
+                 color_mode: int = ESP32UDPHeader.COLOR_RGB332,
+                 lines_per_packet: int = 3, udp_interval: float = 0.0002,
+                 nack: bool = False, nack_history: int = 8, fec_group: int = 0,
+                 broadcast: bool = False, multicast_ttl: int = 1, multicast_interface: str = None,
+                 multicast_loop: bool = True, phy_rate_mbps: float = None, spin_us: float = 0,
+                 dirty_rows: bool = False, refresh_frames: int = 30):
+        # 主机名只在这里解析一次，避免每个包sendto都查询一次DNS
+        self.address = (resolve_host(server_ip), server_port)
+        self.width = width
+        self.height = width
+        self.resolution = RESOLUTION_CODES.get(width, ESP32UDPHeader.RES_240)
+        self.color_mode = color_mode
+        self.lines_per_packet = min(max(1, lines_per_packet), 8)
+        self.udp_interval = udp_interval
+        # 每个包排期前的忙等时间，0表示只用sleep
+        self.spin = spin_us / 1e6
+        self.pacing = JitterMeter()
+
+        self.nack = nack
+        self.history = FrameHistory(nack_history) if nack else None
+        self._resend_queue = OrderedDict()  # (frame_id, y_start) -> packet
+
+        self.fec_group = max(0, fec_group)
+
+        self.dirty_rows = dirty_rows
+        self.refresh_frames = max(0, refresh_frames)
+        self._refresh_cursor = 0  # 下一个轮流重发的行带
+
+        self.frame_id = 0
+        self.stats = {
+            'frames': 0,
+            'packets': 0,
+            'nack_received': 0,
+            'retransmitted': 0,
+            'nack_stale': 0,
+            'parity_packets': 0,
+            'partial_frames': 0,
+            'bands_skipped': 0,
+        }
+
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # 由asyncio事件循环驱动时发送走transport，NACK由协议对象交给handle_nack
+        self.transport = None
+        self.multicast = is_multicast_address(self.address[0])
+        self.broadcast = broadcast
+        if self.multicast:
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, multicast_ttl)
+            self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1 if multicast_loop else 0)
+            if multicast_interface:
+                self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                                     socket.inet_aton(multicast_interface))
+        elif broadcast:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+        # Wi-Fi上组播/广播以很低的基础速率发送，按空口速率放慢节奏，避免AP队列溢出
+        self.phy_rate_mbps = phy_rate_mbps
+        if phy_rate_mbps:
+            self.udp_interval = max(self.udp_interval, self.packet_airtime(phy_rate_mbps))
+
+    def packet_airtime(self, phy_rate_mbps: float) -> float:
+        """一个满载行包(包头 + lines_per_packet行)在给定空口速率下的发送时间(秒)"""
+        row_bytes = self.width * BYTES_PER_PIXEL[self.color_mode]
+        size = ESP32UDPHeader.HEADER_SIZE + self.lines_per_packet * row_bytes
+        return size * 8 / (phy_rate_mbps * 1e6)
+
+    def packetize(self, image: np.ndarray) -> PacketizedFrame:
+        """编码并打包一帧，frame_id自增"""
+        return self.packetize_rows(encode_frame(image, self.width, self.height, self.color_mode))
+
+    def packetize_rows(self, rows: np.ndarray) -> PacketizedFrame:
+        """打包已经编码好的一帧(encode_frame的结果)，frame_id自增"""
+        self.frame_id = (self.frame_id + 1) & 0xFFFF
+        return PacketizedFrame(self.frame_id, rows, self.resolution,
+                               self.color_mode, self.lines_per_packet)
+
+    def send_frame(self, image: np.ndarray, should_continue: Callable[[], bool] = None) -> bool:
+        """
+        发送一帧图片
+
+        Args:
+            image: 任意大小的BGR图片
+            should_continue: 每发一个包检查一次，返回False时中止本帧
+
+        Returns:
+            bool: 整帧是否发送完毕
+        """
+        frame = self.packetize(image)
+        due = time.perf_counter()
+        for packet in self.frame_transmissions(frame, self.dirty_bands(image, frame)):
+            # 按排期时刻发送，sleep的误差不会逐包累积
+            wait_until(due, self.spin)
+            self._send(packet)
+            now = time.perf_counter()
+            self.pacing.record(now - due)
+            due = max(due, now) + self.udp_interval
+
+            # 检查是否应该停止
+            if should_continue is not None and not should_continue():
+                return False
+        return True
+
+    @property
+    def senders(self) -> List['ESP32UDPSender']:
+        return [self]
+
+    def frame_streams(self, image: np.ndarray) -> List:
+        """编码并打包一帧，返回与senders一一对应的包迭代器"""
+        frame = self.packetize(image)
+        return [self.frame_transmissions(frame, self.dirty_bands(image, frame))]
+
+    def dirty_bands(self, image: np.ndarray, frame: PacketizedFrame) -> Optional[List[int]]:
+        """
+        这一帧需要发送的包序号，None表示整帧发送
+
+        图像源给出的变化行映射到缩放后的行带，加上这一帧轮流重发的行带；
+        开启FEC时扩展到完整的校验组，接收端仍然可以用校验包恢复
+        """
+        if not self.dirty_rows:
+            return None
+        rows = map_damage_rows(image, frame.height)
+        if rows is None:
+            return None
+        lines = frame.lines_per_packet
+        bands = set()
+        for start, end in rows:
+            bands.update(range(start // lines, (end - 1) // lines + 1))
+        if self.refresh_frames:
+            for _ in range(-(-len(frame) // self.refresh_frames)):
+                bands.add(self._refresh_cursor % len(frame))
+                self._refresh_cursor = (self._refresh_cursor + 1) % len(frame)
+        if self.fec_group:
+            groups = {band // self.fec_group for band in bands}
+            bands = {i for group in groups
+                     for i in range(group * self.fec_group, min(len(frame), (group + 1) * self.fec_group))}
+        if len(bands) >= len(frame):
+            return None
+        self.stats['partial_frames'] += 1
+        self.stats['bands_skipped'] += len(frame) - len(bands)
+        return sorted(bands)
+
+    def frame_transmissions(self, frame: PacketizedFrame, bands: List[int] = None):
+        """
+        按发送顺序生成一帧实际要发送的包，包括校验包和插在新包之间的重传包
+
+        每个包占用一个发送间隔，由调用方负责发送和节奏控制(单设备时是send_frame，多设备时是FanoutSender)。
+        bands为只发送的包序号(dirty_bands的结果)，没有发送的行带在FrameHistory中仍然属于之前的帧
+        """
+        if self.history is not None:
+            self.history.add(frame)
+
+        for y_start, packet in self.packet_sequence(frame, bands):
+            yield packet
+
+            if y_start is None:
+                self.stats['parity_packets'] += 1
+            elif self.history is not None:
+                self.history.mark_sent(frame.frame_id, y_start)
+                # 重传包插在新包之间，同样占用一个发送间隔
+                self.service_nacks()
+                resend = self._pop_resend()
+                if resend is not None:
+                    yield resend
+
+        self.stats['frames'] += 1
+
+        # 帧与帧之间把积压的重传包发完
+        while self.history is not None:
+            self.service_nacks()
+            resend = self._pop_resend()
+            if resend is None:
+                break
+            yield resend
+
+    def packet_sequence(self, frame: PacketizedFrame, bands: List[int] = None):
+        """
+        按发送顺序生成一帧的所有包(或bands中的包)
+
+        Yields:
+            (y_start, packet)，校验包的y_start为None
+        """
+        parity = compute_parity(frame.payload, self.fec_group) if self.fec_group else None
+        for i in (range(len(frame)) if bands is None else bands):
+            yield frame.y_starts[i], frame.packet(i)
+            # 每组最后一个包之后发送该组的校验包
+            if parity is not None and ((i + 1) % self.fec_group == 0 or i == len(frame) - 1):
+                group = i // self.fec_group
+                yield None, make_parity_packet(frame, group, self.fec_group, parity[group])
+
+    def send_packet(self, packet: bytes):
+        """立即发送一个包(不做节奏控制)"""
+        self._send(packet)
+
+    def _send(self, packet: bytes):
+        if self.transport is not None:
+            self.transport.sendto(packet, self.address)
+        else:
+            self.sock.sendto(packet, self.address)
+        self.stats['packets'] += 1
+
+    def service_nacks(self):
+        """非阻塞地读取所有已到达的NACK，把仍然有效的行带放入重传队列"""
+        if self.history is None or self.transport is not None:
+            return
+        while True:
+            try:
+                readable, _, _ = select.select([self.sock], [], [], 0)
+                if not readable:
+                    return
+                data, _ = self.sock.recvfrom(2048)
+            except OSError:
+                # Windows下对端端口不可达时recvfrom会抛ConnectionResetError，忽略即可
+                return
+            self.handle_nack(data)
+
+    def handle_nack(self, data: bytes):
+        """处理一个收到的NACK包"""
+        if self.history is None:
+            return
+        nack = ESP32UDPHeader.parse_nack(data)
+        if nack is None:
+            return
+        frame_id, y_starts = nack
+        self.stats['nack_received'] += 1
+        for y_start in y_starts:
+            key = (frame_id, y_start)
+            if key in self._resend_queue:
+                continue
+            packet = self.history.lookup(frame_id, y_start)
+            if packet is None:
+                self.stats['nack_stale'] += 1
+            else:
+                self._resend_queue[key] = packet
+
+    def _pop_resend(self) -> Optional[bytes]:
+        if not self._resend_queue:
+            return None
+        _, packet = self._resend_queue.popitem(last=False)
+        self.stats['retransmitted'] += 1
+        return packet
+
+    def flush_resends(self, should_continue: Callable[[], bool] = None):
+        """把积压的重传包按发送间隔发完"""
+        if self.history is None:
+            return
+        while True:
+            self.service_nacks()
+            packet = self._pop_resend()
+            if packet is None:
+                return
+            self._send(packet)
+            time.sleep(self.udp_interval)
+            if should_continue is not None and not should_continue():
+                return
+
+    def describe(self) -> str:
+        """用于日志的简要描述"""
+        text = (f"{self.address[0]}:{self.address[1]} {self.width}x{self.height} "
+                f"颜色代码={self.color_mode} 每包行数={self.lines_per_packet} 间隔={self.udp_interval}")
+        if self.nack:
+            text += f" 丢包重传(缓存{self.history.size}帧)"
+        if self.fec_group:
+            text += f" 前向纠错(K={self.fec_group})"
+        if self.multicast:
+            text += " 组播"
+        elif self.broadcast:
+            text += " 广播"
+        if self.spin:
+            text += f" 忙等{self.spin * 1e6:.0f}us"
+        if self.dirty_rows:
+            text += f" 只发变化行(每{self.refresh_frames}帧轮流刷新)"
+        return text
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['pacing'] = self.pacing.summary()
+        return stats
+
+    def close(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+        if self.history is not None:
+            self.history.clear()
+        self._resend_queue.clear()
@@ -0,0 +1,96 @@
+from typing import List, Dict, Any, Callable
+
+import cv2
+import numpy as np
+
+from sender.fanout import FanoutSender, interleave_send
+from sender.packetizer import encode_frame
+from sender.udp_sender import ESP32UDPSender
+
+
+class VideoWallSender(FanoutSender):
+    """
+    多屏拼接(电视墙)
+
+    一次采集缩放到整面墙的画布大小(预分配缓冲区)，再按行列切成零拷贝的切片分给每块屏幕，
+    每块只编码一次。所有屏幕使用相同的frame_id，包在同一条时间线上交错发送，
+    第N帧的所有切片在同一个发送窗口内发完，各屏幕之间不会错帧。
+    """
+
+    def __init__(self, senders: List[ESP32UDPSender], columns: int, rows: int, fit: str = 'stretch'):
+        """
+        Args:
+            senders: 按行优先顺序排列的每块屏幕的发送端，分辨率必须相同
+            columns: 列数
+            rows: 行数
+            fit: 'stretch'拉伸到整面墙，'crop'保持比例居中裁剪
+        """
+        super().__init__(senders)
+        if len(senders) != columns * rows:
+            raise ValueError(f"Video wall {columns}x{rows} needs {columns * rows} devices, got {len(senders)}")
+        tile = senders[0].width
+        if any(sender.width != tile for sender in senders):
+            raise ValueError("All video wall devices must use the same resolution")
+
+        self.columns = columns
+        self.rows = rows
+        self.fit = fit
+        self.tile_size = tile
+        self._canvas = np.zeros((rows * tile, columns * tile, 3), dtype=np.uint8)
+        # 画布上每块屏幕的视图，只创建一次
+        self._tiles = [self._canvas[r * tile:(r + 1) * tile, c * tile:(c + 1) * tile]
+                       for r in range(rows) for c in range(columns)]
+        self._frame_id = 0
+        self.encodes = 0
+
+    def _crop_to_canvas_aspect(self, image: np.ndarray) -> np.ndarray:
+        """居中裁剪成画布的宽高比(返回视图，不拷贝)"""
+        height, width = image.shape[:2]
+        canvas_h, canvas_w = self._canvas.shape[:2]
+        if width * canvas_h > height * canvas_w:
+            crop = height * canvas_w // canvas_h
+            x0 = (width - crop) // 2
+            return image[:, x0:x0 + crop]
+        crop = width * canvas_h // canvas_w
+        y0 = (height - crop) // 2
+        return image[y0:y0 + crop, :]
+
+    def split(self, image: np.ndarray) -> List[np.ndarray]:
+        """把一帧缩放到画布并返回每块屏幕的视图"""
+        if self.fit == 'crop':
+            image = self._crop_to_canvas_aspect(image)
+        canvas_h, canvas_w = self._canvas.shape[:2]
+        if image.shape[:2] == (canvas_h, canvas_w):
+            self._canvas[...] = image
+        else:
+            cv2.resize(image, (canvas_w, canvas_h), dst=self._canvas)
+        return self._tiles
+
+    def frame_streams(self, image: np.ndarray) -> List:
+        """把一帧切开，返回每块屏幕的包迭代器"""
+        tiles = self.split(image)
+        self._frame_id = (self._frame_id + 1) & 0xFFFF
+        streams = []
+        for sender, tile in zip(self.senders, tiles):
+            rows = encode_frame(tile, self.tile_size, self.tile_size, sender.color_mode)
+            self.encodes += 1
+            # 所有屏幕用同一个frame_id(packetize_rows会先自增)
+            sender.frame_id = (self._frame_id - 1) & 0xFFFF
+            streams.append(sender.frame_transmissions(sender.packetize_rows(rows)))
+        return streams
+
+    def send_frame(self, image: np.ndarray, should_continue: Callable[[], bool] = None) -> bool:
+        """把一帧切开发送给整面墙"""
+        return interleave_send(self.senders, self.frame_streams(image), should_continue)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'encodes': self.encodes,
+            'devices': [sender.get_stats() for sender in self.senders],
+        }
+
+    def describe(self) -> str:
+        lines = [f"拼接屏: {self.columns}x{self.rows}, 画布{self._canvas.shape[1]}x{self._canvas.shape[0]}, 适配方式={self.fit}"]
+        lines += [f"  第{i // self.columns + 1}行第{i % self.columns + 1}列: {sender.describe()}"
+                  for i, sender in enumerate(self.senders)]
+        return "\n".join(lines)